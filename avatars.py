@@ -0,0 +1,192 @@
+"""Avatar cache in the per-user cache folder.
+
+Avatars are stored as ``<avatar hash>.jpg`` with a small ``.json`` sidecar
+holding the HTTP validators (ETag / Last-Modified) and when the file was
+last confirmed. A cached avatar is returned immediately; once it is older
+than the TTL it is revalidated in the background with a conditional GET,
+so an unchanged avatar costs a 304 and no download. All requests share one
+pooled ``requests.Session``. The cache is kept under ``max_bytes`` by
+dropping the least recently used avatars. Use is tracked in the file's
+access time; its modification time stays that of the download, which is
+what ``thumbnails`` compares against.
+"""
+import os
+import json
+import time
+import queue
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from engine import user_cache_dir, print_log
+from tracing import span
+
+AVATAR_URL = "https://avatars.cloudflare.steamstatic.com/{}_full.jpg"
+
+
+class AvatarCache:
+    def __init__(self, cache_dir: Optional[str] = None, ttl=24 * 3600, max_bytes=32 * 1024 * 1024,
+                 pool_size=8, timeout=5, log=None):
+        self.cache_dir = cache_dir or os.path.join(user_cache_dir(), "avatars")
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.log = log or print_log
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._refresh_queue = queue.Queue()
+        self._refresh_thread = None
+
+    def _paths(self, avatar_hash):
+        base = os.path.join(self.cache_dir, avatar_hash)
+        return base + ".jpg", base + ".json"
+
+    def get(self, avatar_hash, url=None, on_refresh=None) -> Optional[str]:
+        """Path of the avatar image, downloading it first if it is not cached.
+
+        A stale cached file is returned as is and refreshed in the background;
+        ``on_refresh(path)`` is called from the refresh thread if the image
+        actually changed. Returns None if the avatar cannot be obtained.
+        """
+        if not avatar_hash or not all(c.isalnum() for c in avatar_hash):
+            return None
+        url = url or AVATAR_URL.format(avatar_hash)
+        image_path, meta_path = self._paths(avatar_hash)
+        meta = self._read_meta(meta_path)
+
+        try:
+            mtime_ns = os.stat(image_path).st_mtime_ns if meta is not None else None
+        except OSError:
+            mtime_ns = None
+        if mtime_ns is not None:
+            now = time.time()
+            os.utime(image_path, ns=(time.time_ns(), mtime_ns))  # LRU order for eviction, mtime untouched
+            if now - meta.get('checked', 0) > self.ttl:
+                self._schedule_refresh(avatar_hash, url, on_refresh)
+            return image_path
+
+        try:
+            if self._fetch(avatar_hash, url, {}):
+                self.evict()
+                return image_path
+        except Exception as e:
+            self.log(f"Error downloading avatar {avatar_hash}: {e}", is_error=True, console_only=True)
+        return None
+
+    def _fetch(self, avatar_hash, url, meta) -> bool:
+        """Downloads or revalidates one avatar; returns True if the image file changed."""
+        image_path, meta_path = self._paths(avatar_hash)
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        with span("avatar.fetch", hash=avatar_hash), \
+                self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                meta['checked'] = time.time()
+                self._write_meta(meta_path, meta)
+                return False
+            response.raise_for_status()
+
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{image_path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        f.write(chunk)
+                os.replace(tmp_path, image_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            self._write_meta(meta_path, {
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'checked': time.time(),
+            })
+        return True
+
+    def _schedule_refresh(self, avatar_hash, url, on_refresh):
+        with self._lock:
+            if avatar_hash in self._refreshing:
+                return
+            self._refreshing.add(avatar_hash)
+            if self._refresh_thread is None:
+                self._refresh_thread = threading.Thread(target=self._refresh_loop, daemon=True,
+                                                        name="cbd2-avatar-refresh")
+                self._refresh_thread.start()
+        self._refresh_queue.put((avatar_hash, url, on_refresh))
+
+    def _refresh_loop(self):
+        while True:
+            avatar_hash, url, on_refresh = self._refresh_queue.get()
+            try:
+                meta = self._read_meta(self._paths(avatar_hash)[1]) or {}
+                if self._fetch(avatar_hash, url, meta):
+                    self.evict()
+                    if on_refresh:
+                        on_refresh(self._paths(avatar_hash)[0])
+            except Exception as e:
+                self.log(f"Error refreshing avatar {avatar_hash}: {e}", is_error=True, console_only=True)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(avatar_hash)
+
+    @staticmethod
+    def _read_meta(meta_path):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_meta(meta_path, meta):
+        tmp_path = f"{meta_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def evict(self):
+        """Deletes least recently used avatars until the cache fits in ``max_bytes``."""
+        with self._lock:
+            try:
+                names = os.listdir(self.cache_dir)
+            except OSError:
+                return
+            images = []
+            total = 0
+            for name in names:
+                if not name.endswith(".jpg"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                images.append((max(st.st_atime, st.st_mtime), st.st_size, name[:-len(".jpg")]))
+                total += st.st_size
+
+            images.sort()
+            for _, size, avatar_hash in images:
+                if total <= self.max_bytes:
+                    break
+                for path in self._paths(avatar_hash):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+
+    def close(self):
+        self.session.close()
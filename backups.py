@@ -0,0 +1,253 @@
+"""Automatic backups of an account's cfg folders, taken before every import.
+
+A backup is a copy of ``cfg``, ``local/cfg`` and ``remote/cfg`` under
+``<dota>/.cbd2/backups/<id>``, on the same drive as the account, so files
+are cloned instead of copied where possible: a copy-on-write reflink
+(``FICLONE`` on Linux, ``clonefile`` on macOS), else a hardlink, else a
+plain copy. Only the files the import replaces or deletes may be
+hardlinked, as the live folder stops sharing them; the files it keeps
+stay live and the game rewrites some of them in place, which would
+change a hardlinked backup too, so they are copied unless reflinked.
+
+``restore`` (undo) swaps folders by renaming, so it costs the same for
+any config size. It goes through the import journal (see
+``StagedImport``), so a crash midway is completed by the next recovery.
+The state it replaces becomes a backup itself, so the undo can be undone
+too.
+"""
+import os
+import sys
+import json
+import time
+import errno
+import shutil
+import ctypes
+from typing import Dict, List, Optional
+
+from engine import (
+    CFG_DIRS, STATE_DIR, AccountLock, finish_import, remove_import_leftovers, scan_account, write_import_journal
+)
+
+BACKUP_DIR = "backups"
+MANIFEST_NAME = "backup.json"
+# Backups kept per account; older ones are deleted when a new one is made.
+DEFAULT_KEEP = 5
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# Errors meaning "this drive (or OS) cannot clone/link files", as opposed to a real I/O failure.
+UNSUPPORTED_ERRNOS = {errno.EOPNOTSUPP, errno.ENOTSUP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.EPERM,
+                      errno.EMLINK, errno.ENOSYS}
+
+
+def reflink(src, dst):
+    """Clones ``src`` to ``dst`` sharing its data blocks (copy-on-write); raises OSError if unsupported."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(src, 'rb') as source, open(dst, 'wb') as target:
+            try:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            except OSError:
+                target.close()
+                os.remove(dst)
+                raise
+    elif sys.platform == "darwin":
+        libc = ctypes.CDLL(None, use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            raise OSError(ctypes.get_errno(), "clonefile failed", src)
+    else:
+        raise OSError(errno.ENOTSUP, "Reflinks are not supported on this platform", src)
+    shutil.copystat(src, dst)
+
+
+def _copy(src, dst):
+    shutil.copy2(src, dst)
+
+
+class FileCloner:
+    """Clones files by the cheapest method that works, remembering which ones the drive rejected."""
+
+    def __init__(self):
+        self.methods = [("reflink", reflink), ("hardlink", os.link), ("copy", _copy)]
+        self.used: Dict[str, int] = {}
+
+    def clone(self, src, dst, link=True):
+        """Clones ``src`` to ``dst``; returns the method used. Without ``link`` it never hardlinks."""
+        while True:
+            methods = [entry for entry in self.methods if link or entry[0] != "hardlink"]
+            name, method = methods[0]
+            try:
+                method(src, dst)
+            except OSError as e:
+                if len(methods) == 1 or e.errno not in UNSUPPORTED_ERRNOS:
+                    raise
+                self.methods.remove((name, method))
+                continue
+            self.used[name] = self.used.get(name, 0) + 1
+            return name
+
+
+class BackupStore:
+    def __init__(self, account_path, keep=DEFAULT_KEEP):
+        self.account_path = account_path
+        self.keep = keep
+        self.root = os.path.join(account_path, STATE_DIR, BACKUP_DIR)
+
+    def backup_path(self, backup_id):
+        if not backup_id or os.path.basename(backup_id) != backup_id or backup_id in (".", ".."):
+            raise ValueError(f"Invalid backup id: {backup_id}")
+        return os.path.join(self.root, backup_id)
+
+    def _new_id(self):
+        now = time.time()
+        base = time.strftime("%Y%m%d-%H%M%S", time.localtime(now)) + f"-{int(now * 1000) % 1000:03}"
+        backup_id, n = base, 1
+        while os.path.exists(self.backup_path(backup_id)) or os.path.exists(self.backup_path(backup_id) + ".partial"):
+            n += 1
+            backup_id = f"{base}-{n}"
+        return backup_id
+
+    def create(self, tree: Optional[Dict[str, Dict]] = None, reason="import", prune=True, link=()) -> Dict:
+        """Backs up the account's cfg folders; returns the backup's manifest.
+
+        ``tree`` is the account's ``scan_account`` result when the caller
+        already has it. Only the names in ``link`` (files the import will
+        replace or delete) may be hardlinked. The backup is assembled under
+        a ``.partial`` name and renamed into place when complete, then
+        (with ``prune``) old backups beyond ``keep`` are deleted.
+        """
+        if tree is None:
+            tree = scan_account(self.account_path)
+        backup_id = self._new_id()
+        partial = self.backup_path(backup_id) + ".partial"
+        cloner = FileCloner()
+        try:
+            for cfg_dir in CFG_DIRS:
+                os.makedirs(os.path.join(partial, cfg_dir))
+            for name, entry in sorted(tree.items()):
+                dst = os.path.join(partial, *name.split("/"))
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+                cloner.clone(entry['path'], dst, link=name in link)
+            manifest = {
+                'id': backup_id,
+                'created': time.time(),
+                'reason': reason,
+                'methods': cloner.used,
+                'files': {name: {'size': entry['size'], 'mtime': entry['mtime']} for name, entry in tree.items()},
+            }
+            with open(os.path.join(partial, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1)
+            os.replace(partial, self.backup_path(backup_id))
+        except BaseException:
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+        if prune:
+            self.prune()
+        return manifest
+
+    def load(self, backup_id) -> Dict:
+        try:
+            with open(os.path.join(self.backup_path(backup_id), MANIFEST_NAME), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Backup not found: {backup_id}")
+
+    def list(self) -> List[Dict]:
+        """Manifests of the complete backups, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        manifests = []
+        for name in os.listdir(self.root):
+            if name.endswith(".partial"):
+                continue
+            try:
+                manifests.append(self.load(name))
+            except (FileNotFoundError, ValueError):
+                continue
+        return sorted(manifests, key=lambda manifest: manifest['id'], reverse=True)
+
+    def restore(self, backup_id=None) -> Dict:
+        """Puts a backup (the newest by default) back in place of the account's cfg folders.
+
+        Each cfg folder is swapped by renaming: the live one moves into a
+        new backup (reason ``undo``) and the backed-up one moves into the
+        account, so the restored backup is used up. The swap is journaled
+        like an import's and holds the account's ``AccountLock``. Returns
+        the manifest of the new backup holding the replaced state.
+        """
+        if backup_id is None:
+            backups = self.list()
+            if not backups:
+                raise FileNotFoundError("No backups for this account")
+            backup_id = backups[0]['id']
+        restored = self.load(backup_id)
+        lock = AccountLock(self.account_path)
+        if not lock.acquire():
+            raise ValueError("Another import into this account is still running")
+        try:
+            finish_import(self.account_path)
+            remove_import_leftovers(self.account_path)
+            # The manifest goes in first: prune keeps (and completes) a .partial with a manifest and cfg folders.
+            tree = scan_account(self.account_path)
+            undo_id = self._new_id()
+            partial = self.backup_path(undo_id) + ".partial"
+            os.makedirs(partial)
+            manifest = {
+                'id': undo_id,
+                'created': time.time(),
+                'reason': "undo",
+                'undoes': restored['id'],
+                'methods': {"rename": len(tree)},
+                'files': {name: {'size': entry['size'], 'mtime': entry['mtime']} for name, entry in tree.items()},
+            }
+            with open(os.path.join(partial, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=1)
+            # Out of list() while it is being used up; prune puts it back if the journal is never written.
+            source = self.backup_path(backup_id) + ".partial"
+            os.replace(self.backup_path(backup_id), source)
+            for cfg_dir in CFG_DIRS:
+                os.makedirs(os.path.join(source, cfg_dir), exist_ok=True)
+            write_import_journal(self.account_path, CFG_DIRS, staging=f"{BACKUP_DIR}/{backup_id}.partial",
+                                 previous=f"{BACKUP_DIR}/{undo_id}.partial")
+            finish_import(self.account_path)
+            os.replace(partial, self.backup_path(undo_id))
+            shutil.rmtree(source)
+        finally:
+            lock.release()
+        return manifest
+
+    def delete(self, backup_id):
+        shutil.rmtree(self.backup_path(backup_id))
+
+    def prune(self) -> List[str]:
+        """Deletes backups beyond the newest ``keep`` and leftovers of interrupted ones; returns their ids.
+
+        A ``.partial`` folder with a manifest and cfg folders is a complete
+        backup whose last rename was interrupted (by a crash during
+        ``create`` or ``restore``) and is renamed into place instead. Does
+        nothing while an import holds the account's ``AccountLock``.
+        """
+        lock = AccountLock(self.account_path)
+        if not lock.acquire():
+            return []
+        deleted = []
+        try:
+            if finish_import(self.account_path) is not None:
+                remove_import_leftovers(self.account_path)
+            if os.path.isdir(self.root):
+                for name in os.listdir(self.root):
+                    if not name.endswith(".partial"):
+                        continue
+                    path = self.backup_path(name)
+                    complete = os.path.exists(os.path.join(path, MANIFEST_NAME)) and any(
+                        os.path.isdir(os.path.join(path, cfg_dir)) for cfg_dir in CFG_DIRS)
+                    if complete and not os.path.exists(path[:-len(".partial")]):
+                        os.replace(path, path[:-len(".partial")])
+                    else:
+                        shutil.rmtree(path, ignore_errors=True)
+            for manifest in self.list()[self.keep:]:
+                self.delete(manifest['id'])
+                deleted.append(manifest['id'])
+        finally:
+            lock.release()
+        return deleted
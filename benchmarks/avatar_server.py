@@ -0,0 +1,85 @@
+"""Local HTTP stand-in for the Steam avatar CDN.
+
+Serves ``/<hash>_full.jpg`` as a small generated JPEG with an ETag and
+answers ``If-None-Match`` with 304, like the real CDN. ``latency`` adds a
+fixed delay per request to imitate a remote server.
+"""
+import io
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+
+def _jpeg(avatar_hash, size=184):
+    color = tuple(int(avatar_hash[i:i + 2] or "80", 16) for i in (0, 2, 4))
+    buffer = io.BytesIO()
+    Image.new("RGB", (size, size), color).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+class AvatarServer:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self.not_modified = 0
+        self._images = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def avatar_url(self, avatar_hash):
+        return f"{self.url}/{avatar_hash}_full.jpg"
+
+    def _image(self, avatar_hash):
+        with self._lock:
+            if avatar_hash not in self._images:
+                self._images[avatar_hash] = _jpeg(avatar_hash)
+            return self._images[avatar_hash]
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                avatar_hash = self.path.strip("/").split("_")[0]
+                etag = f'"{avatar_hash}"'
+                with server._lock:
+                    server.requests += 1
+                if self.headers.get("If-None-Match") == etag:
+                    with server._lock:
+                        server.not_modified += 1
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = server._image(avatar_hash)
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("ETag", etag)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True,
+                                        name="bench-avatar-server")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,103 @@
+"""Compares the export compression profiles on one cfg tree.
+
+For every profile in ``engine.COMPRESSION_PROFILES`` this times an export
+and a full import of the resulting archive and records the archive size.
+Point ``--account`` at a real account's Dota 2 folder
+(``userdata/<id>/570``) to measure real configs; without it a generated
+account is used.
+
+    python benchmarks/compression.py --account "C:/Program Files (x86)/Steam/userdata/123/570"
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import (  # noqa: E402
+    COMPRESSION_PROFILES, DEFAULT_COMPRESSION, EXPORT_WORKERS, AccountIndex, ConfigEngine, compression_settings,
+    iter_config_files, make_metadata
+)
+
+from gen_userdata import generate_userdata  # noqa: E402
+from run import RESULTS_DIR, git_revision, measure, quiet_log  # noqa: E402
+
+
+def bench_profile(config_engine, account_path, workdir, profile, repeat):
+    archive = os.path.join(workdir, f"{profile}.cbd2")
+    metadata = make_metadata("Benchmark", "0")
+    export = measure(lambda _: config_engine.export_config(account_path, archive, metadata, compression=profile),
+                     repeat)
+    target = os.path.join(workdir, f"import-{profile}")
+    os.makedirs(target)
+    imported = measure(lambda _: config_engine.import_config(target, archive, incremental=False, backup=False),
+                       repeat)
+    return {'size': os.path.getsize(archive), 'export': export, 'import': imported}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and size each export compression profile.")
+    parser.add_argument("--account", help="Dota 2 folder of a real account (generated when omitted)")
+    parser.add_argument("--files-per-dir", type=int, default=40)
+    parser.add_argument("--file-size", type=int, default=8192, help="average cfg file size in bytes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help=f"result file (default: {RESULTS_DIR}/compression-<date>.json)")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cbd2-compression-")
+    try:
+        if args.account:
+            account_path = args.account
+        else:
+            userdata = os.path.join(workdir, "userdata")
+            steam_id = generate_userdata(userdata, 1, args.files_per_dir, args.file_size, vdf_mb=0.01)[0]
+            account_path = os.path.join(userdata, steam_id, "570")
+        files = list(iter_config_files(account_path))
+        raw_size = sum(os.path.getsize(file_path) for _, file_path in files)
+        print(f"{len(files)} files, {raw_size / 1024:.0f} KiB in {account_path}")
+
+        config_engine = ConfigEngine(os.path.dirname(os.path.dirname(account_path)), log=quiet_log,
+                                     index=AccountIndex())
+        results = {}
+        for profile in COMPRESSION_PROFILES:
+            try:
+                compression_settings(profile)
+            except ValueError as e:
+                print(f"  {profile:<13} skipped: {e}")
+                results[profile] = {'skipped': str(e)}
+                continue
+            result = bench_profile(config_engine, account_path, workdir, profile, args.repeat)
+            results[profile] = result
+            default = " (default)" if profile == DEFAULT_COMPRESSION else ""
+            print(f"  {profile:<13} {result['size'] / 1024:8.1f} KiB ({result['size'] / raw_size:6.1%})"
+                  f"  export {result['export']['median'] * 1000:7.1f} ms"
+                  f"  import {result['import']['median'] * 1000:7.1f} ms{default}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'git_revision': git_revision(),
+            'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'account': args.account,
+            'files': len(files),
+            'raw_size': raw_size,
+            'repeat': args.repeat,
+            'cpu_count': os.cpu_count(),
+            'export_workers': EXPORT_WORKERS,
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"compression-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+
+if __name__ == "__main__":
+    main()
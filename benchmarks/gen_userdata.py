@@ -0,0 +1,126 @@
+"""Fabricates a Steam ``userdata`` tree for benchmarks.
+
+Every account gets ``config/localconfig.vdf`` padded to a realistic size
+(long-lived accounts reach several MB: app settings, friend lists, web
+storage) and Dota 2 cfg files under ``570/cfg``, ``570/local/cfg`` and
+``570/remote/cfg``. Output is deterministic for a given seed.
+
+    python benchmarks/gen_userdata.py OUT --accounts 20 --vdf-mb 4
+"""
+import os
+import random
+import argparse
+
+FIRST_ACCOUNT_ID = 100000001
+CFG_DIRS = ("cfg", os.path.join("local", "cfg"), os.path.join("remote", "cfg"))
+KEYS = "abcdefghijklmnopqrstuvwxyz1234567890"
+
+
+def _bind_lines(rng):
+    while True:
+        key = rng.choice(KEYS)
+        yield f'bind "{key}" "dota_ability_execute {rng.randint(0, 5)}; say_team {rng.random():.6f}"\n'
+
+
+def write_cfg_file(path, size, rng):
+    """Writes roughly ``size`` bytes of cfg-looking text."""
+    lines, total = [], 0
+    for line in _bind_lines(rng):
+        if total >= size:
+            break
+        lines.append(line)
+        total += len(line)
+    with open(path, 'w', encoding='utf-8', newline="\n") as f:
+        f.write("".join(lines))
+
+
+def _friend_block(friend_id, rng, indent="\t\t"):
+    name = f"Friend {friend_id}"
+    return (f'{indent}"{friend_id}"\n{indent}{{\n'
+            f'{indent}\t"avatar"\t\t"{rng.getrandbits(160):040x}"\n'
+            f'{indent}\t"name"\t\t"{name}"\n'
+            f'{indent}\t"NameHistory"\n{indent}\t{{\n{indent}\t\t"0"\t\t"{name}"\n{indent}\t}}\n'
+            f'{indent}}}\n')
+
+
+def localconfig_text(steam_id, persona_name, avatar_hash, target_bytes, rng):
+    """A localconfig.vdf of about ``target_bytes`` with the account's entry inside ``friends``.
+
+    Padding goes into app settings before ``friends`` and web storage after
+    it, like in real files, so scanners cannot just stop at the top.
+    """
+    parts = ['"UserLocalConfigStore"\n{\n', '\t"Software"\n\t{\n\t\t"Valve"\n\t\t{\n\t\t\t"Steam"\n\t\t\t{\n'
+             '\t\t\t\t"apps"\n\t\t\t\t{\n']
+    size = sum(map(len, parts))
+    app_id = 10
+    while size < target_bytes * 0.6:
+        block = (f'\t\t\t\t\t"{app_id}"\n\t\t\t\t\t{{\n'
+                 f'\t\t\t\t\t\t"LastPlayed"\t\t"{rng.randint(1_400_000_000, 1_700_000_000)}"\n'
+                 f'\t\t\t\t\t\t"Playtime"\t\t"{rng.randint(0, 100000)}"\n'
+                 f'\t\t\t\t\t\t"cloud"\n\t\t\t\t\t\t{{\n\t\t\t\t\t\t\t"last_sync_state"\t\t"synchronized"\n'
+                 f'\t\t\t\t\t\t}}\n\t\t\t\t\t\t"LaunchOptions"\t\t"-novid -console // {{not a brace}}"\n'
+                 f'\t\t\t\t\t}}\n')
+        parts.append(block)
+        size += len(block)
+        app_id += 10
+    parts.append('\t\t\t\t}\n\t\t\t}\n\t\t}\n\t}\n')
+
+    friends = ['\t"friends"\n\t{\n']
+    for _ in range(rng.randint(50, 150)):
+        friends.append(_friend_block(rng.randint(FIRST_ACCOUNT_ID, FIRST_ACCOUNT_ID * 9), rng))
+    friends.append(f'\t\t"{steam_id}"\n\t\t{{\n\t\t\t"avatar"\t\t"{avatar_hash}"\n'
+                   f'\t\t\t"name"\t\t"{persona_name}"\n\t\t}}\n')
+    friends.append(f'\t\t"PersonaName"\t\t"{persona_name}"\n\t}}\n')
+    parts.extend(friends)
+    size += sum(map(len, friends))
+
+    parts.append('\t"WebStorage"\n\t{\n')
+    n = 0
+    while size < target_bytes:
+        line = f'\t\t"key_{n}"\t\t"{{\\"value\\":\\"{rng.getrandbits(256):064x}\\"}}"\n'
+        parts.append(line)
+        size += len(line)
+        n += 1
+    parts.append('\t}\n}\n')
+    return "".join(parts)
+
+
+def generate_userdata(root, accounts=10, files_per_dir=20, file_size=4096, vdf_mb=2.0, seed=1):
+    """Creates ``accounts`` accounts under ``root``; returns their steam ids (as strings)."""
+    rng = random.Random(seed)
+    steam_ids = []
+    for n in range(accounts):
+        steam_id = str(FIRST_ACCOUNT_ID + n)
+        steam_ids.append(steam_id)
+        account_folder = os.path.join(root, steam_id)
+        os.makedirs(os.path.join(account_folder, "config"), exist_ok=True)
+        avatar_hash = f"{rng.getrandbits(160):040x}"
+        with open(os.path.join(account_folder, "config", "localconfig.vdf"), 'w', encoding='utf-8',
+                  newline="\n") as f:
+            f.write(localconfig_text(steam_id, f"Player {n}", avatar_hash, int(vdf_mb * 1024 * 1024), rng))
+
+        for cfg_dir in CFG_DIRS:
+            cfg_path = os.path.join(account_folder, "570", cfg_dir)
+            os.makedirs(cfg_path, exist_ok=True)
+            for k in range(files_per_dir):
+                # Sizes vary around file_size so equal-size comparisons do not dominate.
+                write_cfg_file(os.path.join(cfg_path, f"file_{k:03}.cfg"),
+                               max(1, int(file_size * rng.uniform(0.5, 1.5))), rng)
+    return steam_ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Steam userdata tree.")
+    parser.add_argument("root", help="output folder (created if missing)")
+    parser.add_argument("--accounts", type=int, default=10)
+    parser.add_argument("--files-per-dir", type=int, default=20, help="cfg files in each of the three cfg folders")
+    parser.add_argument("--file-size", type=int, default=4096, help="average cfg file size in bytes")
+    parser.add_argument("--vdf-mb", type=float, default=2.0, help="size of each localconfig.vdf in MB")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    ids = generate_userdata(args.root, args.accounts, args.files_per_dir, args.file_size, args.vdf_mb, args.seed)
+    print(f"Generated {len(ids)} accounts in {args.root}")
+
+
+if __name__ == "__main__":
+    main()
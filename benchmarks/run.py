@@ -0,0 +1,255 @@
+"""ConfigBridge benchmark suite.
+
+Generates a synthetic userdata tree (see ``gen_userdata.py``), serves
+avatars from a local stand-in for the Steam CDN and times the main
+operations. Results are written as JSON so runs can be compared across
+versions:
+
+    python benchmarks/run.py --accounts 20 --vdf-mb 4 --output before.json
+    python benchmarks/run.py --accounts 20 --vdf-mb 4 --compare before.json
+
+Each benchmark reports the min/median/mean of ``--repeat`` runs in seconds.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import EXPORTER_VERSION, AccountIndex, ConfigEngine, make_metadata  # noqa: E402
+from avatars import AvatarCache  # noqa: E402
+
+from avatar_server import AvatarServer  # noqa: E402
+from gen_userdata import generate_userdata  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def quiet_log(message, is_error=False, console_only=False):
+    pass
+
+
+def measure(func, repeat, setup=None):
+    """Runs ``func(setup())`` ``repeat`` times; only ``func`` is timed."""
+    runs = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        func(arg)
+        runs.append(time.perf_counter() - start)
+    return {'min': min(runs), 'median': statistics.median(runs), 'mean': statistics.mean(runs), 'runs': runs}
+
+
+class Suite:
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.userdata = os.path.join(workdir, "userdata")
+        self.steam_ids = generate_userdata(self.userdata, args.accounts, args.files_per_dir, args.file_size,
+                                           args.vdf_mb, args.seed)
+        self.server = AvatarServer(latency=args.avatar_latency).start()
+        self.results = {}
+        self._counter = 0
+
+    def tmp_path(self, name):
+        self._counter += 1
+        return os.path.join(self.workdir, f"{self._counter}-{name}")
+
+    def engine(self, index=None):
+        return ConfigEngine(self.userdata, log=quiet_log, index=index if index is not None else AccountIndex())
+
+    def account_path(self, n):
+        return os.path.join(self.userdata, self.steam_ids[n], "570")
+
+    def avatar_cache(self, cache_dir):
+        return AvatarCache(cache_dir=cache_dir, pool_size=8, log=quiet_log)
+
+    def fetcher(self, cache):
+        return lambda account: cache.get(account['avatar_hash'], self.server.avatar_url(account['avatar_hash']))
+
+    def run(self, name, func, setup=None):
+        print(f"  {name} ...", end="", flush=True)
+        result = measure(func, self.args.repeat, setup)
+        self.results[name] = result
+        print(f" median {result['median'] * 1000:.1f} ms")
+
+    def skip(self, name, reason):
+        print(f"  {name} skipped: {reason}")
+        self.results[name] = {'skipped': reason}
+
+    # --- benchmarks ---
+    def discovery(self):
+        self.run("get_account_folders (cold index)", lambda engine: engine.get_account_folders(),
+                 setup=self.engine)
+
+        warm = self.engine()
+        warm.get_account_folders()
+        self.run("get_account_folders (warm index)", lambda _: warm.get_account_folders())
+
+        def all_info(engine):
+            for steam_id in self.steam_ids:
+                engine.get_steam_account_info(steam_id, os.path.join(self.userdata, steam_id, "570"))
+
+        self.run("get_steam_account_info (all accounts, cold)", all_info, setup=self.engine)
+
+    def loading(self):
+        def cold():
+            cache = self.avatar_cache(self.tmp_path("avatars"))
+            return self.engine(), cache
+
+        def load(arg):
+            engine, cache = arg
+            engine.load_accounts(fetch_avatar=self.fetcher(cache))
+            cache.close()
+
+        self.run("load_accounts (cold index and avatar cache)", load, setup=cold)
+
+        warm_index, warm_cache = AccountIndex(), self.avatar_cache(self.tmp_path("avatars"))
+        self.engine(warm_index).load_accounts(fetch_avatar=self.fetcher(warm_cache))
+        self.run("load_accounts (warm)", lambda _: self.engine(warm_index).load_accounts(
+            fetch_avatar=self.fetcher(warm_cache)))
+        warm_cache.close()
+
+    def transfer(self):
+        engine = self.engine()
+        metadata = make_metadata("Player 0", self.steam_ids[0])
+        self.run("export_config", lambda save_path: engine.export_config(self.account_path(0), save_path, metadata),
+                 setup=lambda: self.tmp_path("export.cbd2"))
+
+        archive = self.tmp_path("source.cbd2")
+        engine.export_config(self.account_path(0), archive, metadata)
+        sources = [archive, self.account_path(1)]
+        target = self.account_path(2)
+        turn = iter(range(10 ** 9))
+        self.run("import_config (every file changed)",
+                 lambda source: engine.import_config(target, source),
+                 setup=lambda: sources[next(turn) % 2])
+
+        engine.import_config(target, archive)
+        self.run("plan_import (archive, nothing changed)", lambda _: engine.plan_import(target, archive))
+        self.run("plan_import (account, every file changed)",
+                 lambda _: engine.plan_import(target, self.account_path(1)))
+        self.run("import_config (nothing changed)", lambda _: engine.import_config(target, archive))
+        self.run("import_config (full copy)", lambda _: engine.import_config(target, archive, incremental=False))
+        self.run("BackupStore.create (pre-import backup)", lambda _: engine.backup_store(target).create())
+
+    def rendering(self):
+        name = "AccountCard rendering (all accounts)"
+        list_name = "VirtualAccountList build (all accounts)"
+        try:
+            import tkinter
+            import main
+            root = main.ctk.CTk()
+        except (ImportError, tkinter.TclError) as e:
+            self.skip(name, str(e).splitlines()[0] if str(e) else type(e).__name__)
+            self.skip(list_name, "no display")
+            return
+
+        root.withdraw()
+        thumbnails = main.ThumbnailCache(cache_dir=self.tmp_path("thumbnails"))
+        cache = self.avatar_cache(self.tmp_path("avatars"))
+        accounts = self.engine().load_accounts(fetch_avatar=self.fetcher(cache))
+        for account in accounts:
+            if account['avatar']:
+                thumbnails.render(account['avatar_hash'], account['avatar'])
+        cache.close()
+
+        def cards(frame):
+            for account in accounts:
+                main.AccountCard(frame, account=account, on_select=lambda a: None, lang_code="EN",
+                                 thumbnails=thumbnails).pack(fill="x")
+            root.update_idletasks()
+            frame.destroy()
+
+        def virtual_list(frame):
+            main.VirtualAccountList(frame, accounts, on_select=lambda a: None, lang_code="EN",
+                                    thumbnails=thumbnails).pack(fill="both", expand=True)
+            root.update_idletasks()
+            frame.destroy()
+
+        new_frame = lambda: main.ctk.CTkFrame(root)  # noqa: E731
+        self.run(name, cards, setup=new_frame)
+        self.run(list_name, virtual_list, setup=new_frame)
+        root.destroy()
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(baseline_path, results):
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('git_revision') or 'unknown revision'}):")
+    for name, result in results.items():
+        old = baseline['results'].get(name)
+        if not old or 'median' not in old or 'median' not in result:
+            continue
+        ratio = result['median'] / old['median'] if old['median'] else float('inf')
+        print(f"  {name:<48} {old['median'] * 1000:9.1f} ms -> {result['median'] * 1000:9.1f} ms  ({ratio:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time ConfigBridge operations on a synthetic userdata tree.")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--files-per-dir", type=int, default=40)
+    parser.add_argument("--file-size", type=int, default=8192, help="average cfg file size in bytes")
+    parser.add_argument("--vdf-mb", type=float, default=4.0, help="size of each localconfig.vdf in MB")
+    parser.add_argument("--avatar-latency", type=float, default=0.05, help="seconds per avatar request")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--only", action="append", choices=["discovery", "loading", "transfer", "rendering"],
+                        help="run only these groups (repeatable)")
+    parser.add_argument("--output", help=f"result file (default: {RESULTS_DIR}/<date>.json)")
+    parser.add_argument("--compare", metavar="BASELINE", help="earlier result file to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the generated work folder")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="cbd2-bench-")
+    print(f"Generating {args.accounts} accounts in {workdir} ...")
+    suite = Suite(args, workdir)
+    try:
+        for group in args.only or ["discovery", "loading", "transfer", "rendering"]:
+            print(f"{group}:")
+            getattr(suite, group)()
+    finally:
+        suite.server.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'exporter_version': EXPORTER_VERSION,
+            'git_revision': git_revision(),
+            'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'parameters': {key: value for key, value in vars(args).items()
+                           if key not in ("output", "compare", "keep")},
+        },
+        'results': suite.results,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(args.compare, suite.results)
+
+
+if __name__ == "__main__":
+    main()
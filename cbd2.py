@@ -0,0 +1,353 @@
+"""Headless ConfigBridge command line.
+
+    python cbd2.py list
+    python cbd2.py export <account> <file.cbd2> [--compression PROFILE]
+    python cbd2.py import <account> <file.cbd2 | account | directory> [--only PATH ...] [--dry-run] [--no-backup]
+    python cbd2.py backups <account>
+    python cbd2.py undo <account> [<backup id>]
+    python cbd2.py verify <file.cbd2>
+    python cbd2.py inspect <file.cbd2 | account | directory | snapshot:<id>> [--files]
+    python cbd2.py diff <old source> <new source>
+    python cbd2.py clone <source account> <target account> [<target account> ...]
+    python cbd2.py snapshot save|list|restore|export|prune|gc ...
+
+Accounts can be given as a Steam account id (the ``userdata`` folder name)
+or as a persona name. ``import`` also accepts ``snapshot:<id>`` as source.
+Only ``engine`` (and ``snapshots``) are imported, never Tk, customtkinter
+or PIL, so a run finishes in well under a second.
+"""
+import os
+import sys
+import json
+import argparse
+
+import engine
+from tracing import TRACER
+
+
+class CliError(Exception):
+    pass
+
+
+def resolve_account(config_engine, name_or_id, accounts_cache):
+    """Returns ``(account_id, dota_config_path, personaname)`` for an account argument."""
+    if name_or_id.isdigit() and config_engine.steam_userdata_path:
+        dota_path = os.path.join(config_engine.steam_userdata_path, name_or_id, engine.DOTA_APP_ID)
+        if os.path.isdir(dota_path):
+            return name_or_id, dota_path, None
+
+    if not accounts_cache:
+        accounts_cache.extend(config_engine.load_accounts())
+    matches = [a for a in accounts_cache if name_or_id in (a['account_id'], a['personaname'])]
+    if not matches:
+        raise CliError(f"Account not found: {name_or_id}")
+    if len(matches) > 1:
+        ids = ", ".join(a['account_id'] for a in matches)
+        raise CliError(f"Account name '{name_or_id}' is ambiguous ({ids}); use the account id")
+    account = matches[0]
+    return account['account_id'], account['path'], account['personaname']
+
+
+def cmd_list(config_engine, args, accounts_cache):
+    accounts = config_engine.load_accounts()
+    if args.json:
+        print(json.dumps(accounts, indent=2, ensure_ascii=False))
+        return 0
+    if not accounts:
+        print("No accounts found")
+        return 0
+    for account in accounts:
+        print(f"{account['account_id']:>12}  {account['personaname']}")
+    return 0
+
+
+def cmd_export(config_engine, args, accounts_cache):
+    account_id, account_path, personaname = resolve_account(config_engine, args.account, accounts_cache)
+    if personaname is None:
+        personaname = config_engine.get_steam_account_info(account_id, account_path)['personaname']
+    metadata = engine.make_metadata(personaname, account_id)
+    config_engine.export_config(account_path, args.output, metadata, compression=args.compression)
+    return 0
+
+
+def source_path_for(config_engine, source, accounts_cache):
+    if os.path.exists(source) or source.startswith(engine.SNAPSHOT_PREFIX):
+        return source
+    return resolve_account(config_engine, source, accounts_cache)[1]
+
+
+def cmd_import(config_engine, args, accounts_cache):
+    _, target_path, _ = resolve_account(config_engine, args.account, accounts_cache)
+    source_path = source_path_for(config_engine, args.source, accounts_cache)
+    if not args.dry_run:
+        config_engine.import_config(target_path, source_path, incremental=not args.full, paths=args.only,
+                                    backup=not args.no_backup)
+        return 0
+
+    plan = config_engine.plan_import(target_path, source_path, incremental=not args.full, paths=args.only)
+    markers = {'create': "+", 'replace': "~", 'delete': "-"}
+    for operation in plan.operations:
+        print(f"{markers[operation['op']]} {operation['name']}")
+    counts = plan.counts()
+    print(f"{counts['create']} to create, {counts['replace']} to replace, {counts['delete']} to delete, "
+          f"{counts['unchanged']} unchanged; {engine.format_size(plan.bytes_to_write)} to write"
+          + (f", {engine.format_size(plan.free_space)} free" if plan.free_space is not None else ""))
+    if not plan.fits:
+        raise CliError("Not enough free disk space for this import")
+    return 0
+
+
+def cmd_backups(config_engine, args, accounts_cache):
+    _, account_path, _ = resolve_account(config_engine, args.account, accounts_cache)
+    for manifest in config_engine.backup_store(account_path).list():
+        size = sum(entry['size'] for entry in manifest['files'].values())
+        print(f"{manifest['id']:<24} {len(manifest['files']):>5} files {size:>10} bytes  {manifest['reason']}")
+    return 0
+
+
+def cmd_undo(config_engine, args, accounts_cache):
+    _, account_path, _ = resolve_account(config_engine, args.account, accounts_cache)
+    config_engine.undo_import(account_path, args.backup_id)
+    return 0
+
+
+def cmd_verify(config_engine, args, accounts_cache):
+    result = config_engine.verify_archive(args.archive)
+    for name in result['damaged']:
+        config_engine.log(f"Damaged: {name}", is_error=True)
+    checked = "manifest hashes" if result['format'] >= 2 else "CRCs only, format 1 archive"
+    config_engine.log(f"{result['files'] - len(result['damaged'])} of {result['files']} files intact ({checked})")
+    return 1 if result['damaged'] else 0
+
+
+def cmd_inspect(config_engine, args, accounts_cache):
+    description = config_engine.inspect_source(source_path_for(config_engine, args.source, accounts_cache))
+    files = {name: {key: entry[key] for key in ('size', 'mtime', 'hash') if key in entry}
+             for name, entry in sorted(description['files'].items())}
+    if args.json:
+        print(json.dumps(dict(description, files=files), indent=2, ensure_ascii=False))
+        return 0
+    print(f"{description['kind']}" + (f", format {description['format']}" if description['format'] else ""))
+    for key, value in (description['metadata'] or {}).items():
+        print(f"  {key}: {value}")
+    print(f"{len(files)} files, {description['size']} bytes ({description['stored_size']} stored)")
+    if description['digest']:
+        print(f"digest {description['digest']}")
+    if description['pending_import']:
+        print("an interrupted import is pending; it completes the next time the account is loaded or imported into")
+    if args.files:
+        for name, entry in files.items():
+            print(f"{entry['size']:>10}  {name}")
+    return 0
+
+
+def cmd_diff(config_engine, args, accounts_cache):
+    diff = config_engine.diff_sources(source_path_for(config_engine, args.old, accounts_cache),
+                                      source_path_for(config_engine, args.new, accounts_cache))
+    if args.json:
+        print(json.dumps(diff, indent=2, ensure_ascii=False))
+        return 0
+    for marker, key in (("+", 'added'), ("-", 'removed'), ("~", 'changed')):
+        for name in diff[key]:
+            print(f"{marker} {name}")
+    print(f"{len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed, "
+          f"{len(diff['unchanged'])} unchanged")
+    return 0
+
+
+def cmd_clone(config_engine, args, accounts_cache):
+    source_id, source_path, _ = resolve_account(config_engine, args.source, accounts_cache)
+    failed = 0
+    for target in args.targets:
+        try:
+            target_id, target_path, _ = resolve_account(config_engine, target, accounts_cache)
+            if target_id == source_id:
+                config_engine.log(f"Skipping {target}: same account as source")
+                continue
+            config_engine.import_config(target_path, source_path, incremental=not args.full)
+        except (CliError, OSError, ValueError) as e:
+            config_engine.log(f"{target}: {e}", is_error=True)
+            failed += 1
+    return 1 if failed else 0
+
+
+def cmd_snapshot_save(config_engine, args, accounts_cache):
+    account_id, account_path, personaname = resolve_account(config_engine, args.account, accounts_cache)
+    if personaname is None:
+        personaname = config_engine.get_steam_account_info(account_id, account_path)['personaname']
+    snapshot_id = config_engine.export_snapshot(account_path, engine.make_metadata(personaname, account_id))
+    print(snapshot_id)
+    return 0
+
+
+def cmd_snapshot_list(config_engine, args, accounts_cache):
+    account_id = resolve_account(config_engine, args.account, accounts_cache)[0] if args.account else None
+    for manifest in config_engine.snapshot_store.list(account_id):
+        size = sum(entry['size'] for entry in manifest['files'].values())
+        print(f"{manifest['id']:<32} {manifest['metadata'].get('exported_by', '')!s:<24} "
+              f"{len(manifest['files']):>5} files {size:>10} bytes")
+    return 0
+
+
+def cmd_snapshot_restore(config_engine, args, accounts_cache):
+    _, target_path, _ = resolve_account(config_engine, args.account, accounts_cache)
+    config_engine.import_config(target_path, engine.SNAPSHOT_PREFIX + args.snapshot_id)
+    return 0
+
+
+def cmd_snapshot_export(config_engine, args, accounts_cache):
+    config_engine.snapshot_store.export_archive(args.snapshot_id, args.output, args.compression)
+    config_engine.log(f"Snapshot {args.snapshot_id} exported to {args.output}")
+    return 0
+
+
+def cmd_snapshot_prune(config_engine, args, accounts_cache):
+    store = config_engine.snapshot_store
+    for snapshot_id in store.prune(keep_last=args.keep, max_age_days=args.max_age_days):
+        config_engine.log(f"Deleted snapshot {snapshot_id}")
+    return cmd_snapshot_gc(config_engine, args, accounts_cache)
+
+
+def cmd_snapshot_gc(config_engine, args, accounts_cache):
+    result = config_engine.snapshot_store.gc()
+    config_engine.log(f"Removed {result['removed']} unreferenced blobs ({result['bytes_freed']} bytes)")
+    return 0
+
+
+def add_compression_argument(parser):
+    parser.add_argument("--compression", choices=list(engine.COMPRESSION_PROFILES), default=engine.DEFAULT_COMPRESSION,
+                        help=f"archive compression (default: {engine.DEFAULT_COMPRESSION}); "
+                             "store is fastest, bzip2 and lzma smallest")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cbd2", description="ConfigBridge Dota 2 (headless)")
+    parser.add_argument("--userdata", help="Steam userdata folder (detected automatically by default)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print errors")
+    parser.add_argument("--no-index", action="store_true", help="ignore the cached account index")
+    parser.add_argument("-v", "--verbose", action="store_true", help="also print diagnostic messages")
+    parser.add_argument("--trace", metavar="FILE", help="write timing spans to FILE (Chrome trace format)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("list", help="list accounts with Dota 2 configs")
+    p.add_argument("--json", action="store_true", help="machine-readable output")
+    p.set_defaults(func=cmd_list)
+
+    p = sub.add_parser("export", help="export an account's config to a .cbd2 file")
+    p.add_argument("account")
+    p.add_argument("output")
+    add_compression_argument(p)
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("import", help="import a .cbd2/.zip file, account or directory into an account")
+    p.add_argument("account")
+    p.add_argument("source")
+    p.add_argument("--full", action="store_true", help="rewrite every file instead of only the changed ones")
+    p.add_argument("--only", action="append", metavar="PATH",
+                   help="import only this file or folder, e.g. remote/cfg (repeatable)")
+    p.add_argument("-n", "--dry-run", action="store_true", help="only show what the import would change")
+    p.add_argument("--no-backup", action="store_true", help="do not back up the account first (no undo)")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("backups", help="list an account's pre-import backups, newest first")
+    p.add_argument("account")
+    p.set_defaults(func=cmd_backups)
+
+    p = sub.add_parser("undo", help="restore an account's newest (or the given) backup")
+    p.add_argument("account")
+    p.add_argument("backup_id", nargs="?")
+    p.set_defaults(func=cmd_undo)
+
+    p = sub.add_parser("verify", help="check a .cbd2 file against its manifest")
+    p.add_argument("archive")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("inspect", help="describe a .cbd2 file, account, directory or snapshot without extracting")
+    p.add_argument("source")
+    p.add_argument("--files", action="store_true", help="also list every file")
+    p.add_argument("--json", action="store_true", help="machine-readable output")
+    p.set_defaults(func=cmd_inspect)
+
+    p = sub.add_parser("diff", help="list files added, removed or changed between two sources")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--json", action="store_true", help="machine-readable output")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("clone", help="copy one account's config onto other accounts")
+    p.add_argument("source")
+    p.add_argument("targets", nargs="+")
+    p.add_argument("--full", action="store_true", help="rewrite every file instead of only the changed ones")
+    p.set_defaults(func=cmd_clone)
+
+    p = sub.add_parser("snapshot", help="manage the deduplicated snapshot store")
+    p.add_argument("--store", help="snapshot store folder (per-user data folder by default)")
+    snap = p.add_subparsers(dest="snapshot_command", required=True)
+
+    sp = snap.add_parser("save", help="store an account's config as a snapshot")
+    sp.add_argument("account")
+    sp.set_defaults(func=cmd_snapshot_save)
+
+    sp = snap.add_parser("list", help="list snapshots, newest first")
+    sp.add_argument("account", nargs="?")
+    sp.set_defaults(func=cmd_snapshot_list)
+
+    sp = snap.add_parser("restore", help="apply a snapshot to an account")
+    sp.add_argument("snapshot_id")
+    sp.add_argument("account")
+    sp.set_defaults(func=cmd_snapshot_restore)
+
+    sp = snap.add_parser("export", help="write a snapshot to a .cbd2 file")
+    sp.add_argument("snapshot_id")
+    sp.add_argument("output")
+    add_compression_argument(sp)
+    sp.set_defaults(func=cmd_snapshot_export)
+
+    sp = snap.add_parser("prune", help="delete old snapshots and unreferenced blobs")
+    sp.add_argument("--keep", type=int, help="snapshots to keep per account")
+    sp.add_argument("--max-age-days", type=float, help="delete snapshots older than this (newest is kept)")
+    sp.set_defaults(func=cmd_snapshot_prune)
+
+    sp = snap.add_parser("gc", help="delete blobs no snapshot references")
+    sp.set_defaults(func=cmd_snapshot_gc)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    def log(message, is_error=False, console_only=False):
+        if console_only and not args.verbose:
+            return
+        if is_error:
+            print(f"Error: {message}", file=sys.stderr)
+        elif not args.quiet:
+            print(message, file=sys.stderr)
+
+    userdata = args.userdata or engine.find_steam_userdata_path()
+    if not userdata or not os.path.isdir(userdata):
+        log("Steam folder not found", is_error=True)
+        return 1
+
+    snapshot_store = None
+    if getattr(args, "store", None):
+        from snapshots import SnapshotStore
+        snapshot_store = SnapshotStore(args.store)
+
+    index = engine.AccountIndex() if args.no_index else None
+    config_engine = engine.ConfigEngine(userdata, log=log, snapshot_store=snapshot_store, index=index)
+    try:
+        return args.func(config_engine, args, [])
+    except (CliError, OSError, ValueError) as e:
+        log(str(e), is_error=True)
+        return 1
+    finally:
+        log(TRACER.format_summary(args.command.capitalize()), console_only=True)
+        if args.trace:
+            TRACER.write_chrome_trace(args.trace)
+            log(f"Trace written to {args.trace}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1838 @@
+"""Core ConfigBridge operations that do not depend on Tk.
+
+Everything that touches Steam userdata lives here so that the GUI, the
+``cbd2`` command line and ad-hoc scripts all share one implementation.
+Nothing in this module may import customtkinter or PIL.
+"""
+import os
+import json
+import time
+import shutil
+import zipfile
+import zlib
+import hashlib
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Set, Tuple
+
+import vdf
+
+try:
+    import bz2
+except ImportError:  # Python built without bz2
+    bz2 = None
+try:
+    import lzma
+except ImportError:  # Python built without lzma
+    lzma = None
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # not Windows
+    msvcrt = None
+
+from tracing import span
+from vdfscan import VdfScanError, scan_localconfig
+
+# Steam paths
+STEAM_PATHS = [
+    "C:/Program Files (x86)/Steam/userdata",
+    "C:/Program Files/Steam/userdata",
+    "D:/Steam/userdata",
+    os.path.expanduser("~/Steam/userdata")
+]
+DOTA_APP_ID = "570"
+CONFIG_DIR = "cfg"
+LOCAL_CFG_DIR = os.path.join("local", "cfg")
+REMOTE_CFG_DIR = os.path.join("remote", "cfg")
+CFG_DIRS = [CONFIG_DIR, LOCAL_CFG_DIR, REMOTE_CFG_DIR]
+
+EXPORTER_VERSION = "2.1.0"
+
+# Layout of the .cbd2 archives export writes. Format 2 adds MANIFEST_NAME, listing every cfg
+# member's size, mtime and content hash plus a digest over them; archives without it are format 1.
+ARCHIVE_FORMAT = 2
+MANIFEST_NAME = "manifest.json"
+
+# import_config source prefix that selects a snapshot from the snapshot store.
+SNAPSHOT_PREFIX = "snapshot:"
+
+# Read/write chunk size when streaming archive members; keeps memory flat for large files.
+COPY_BUFSIZE = 1024 * 1024
+# Digest size in bytes of the BLAKE2b content hash used to compare files.
+HASH_SIZE = 16
+HASH_NAME = f"blake2b-{HASH_SIZE * 8}"
+# Disk space an import leaves free on the target drive beyond the bytes it writes.
+FREE_SPACE_MARGIN = 16 * 1024 * 1024
+# ConfigBridge's own bookkeeping folder inside an account's Dota 2 folder (never a cfg folder).
+STATE_DIR = ".cbd2"
+# Written inside STATE_DIR once an import's staged folders are complete; see StagedImport.
+IMPORT_JOURNAL = "import.journal"
+# Locked (not just present) inside STATE_DIR while an import stages or recovers; see AccountLock.
+IMPORT_LOCK = "import.lock"
+
+# Export compression profiles: name -> (zip method, level). A level of None uses the
+# method's default; zipfile has no level setting for LZMA.
+COMPRESSION_PROFILES = {
+    "store": (zipfile.ZIP_STORED, None),
+    "deflate-fast": (zipfile.ZIP_DEFLATED, 1),
+    "deflate": (zipfile.ZIP_DEFLATED, 6),
+    "deflate-best": (zipfile.ZIP_DEFLATED, 9),
+    "bzip2": (zipfile.ZIP_BZIP2, 9),
+    "lzma": (zipfile.ZIP_LZMA, None),
+}
+DEFAULT_COMPRESSION = "deflate"
+# Threads compressing archive members during export; zlib, bz2 and lzma release the GIL.
+EXPORT_WORKERS = min(8, os.cpu_count() or 1)
+# Members larger than this are streamed into the archive instead of compressed in memory.
+PARALLEL_MEMBER_LIMIT = 32 * 1024 * 1024
+# Errors reading a damaged archive member raises (CRC or manifest hash mismatch, corrupt stream).
+DAMAGED_MEMBER_ERRORS = (ValueError, zipfile.BadZipFile, zlib.error, EOFError, OSError) + \
+    ((lzma.LZMAError,) if lzma else ())
+ZIP_METHOD_NAMES = {zipfile.ZIP_STORED: "store", zipfile.ZIP_DEFLATED: "deflate", zipfile.ZIP_BZIP2: "bzip2",
+                    zipfile.ZIP_LZMA: "lzma"}
+
+
+def find_steam_userdata_path():
+    for path in STEAM_PATHS:
+        if os.path.exists(path) and os.path.isdir(path):
+            return path
+    return None
+
+
+def user_data_dir():
+    """Per-user folder for ConfigBridge's own data (snapshots)."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/AppData/Local")
+    else:
+        base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share")
+    return os.path.join(base, "cbd2")
+
+
+def user_cache_dir():
+    """Per-user folder for data ConfigBridge can rebuild (account index, avatars)."""
+    if os.name == "nt":
+        base = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/AppData/Local"), "cbd2")
+        return os.path.join(base, "cache")
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "cbd2")
+
+
+def print_log(message, is_error=False, console_only=False):
+    """Default log sink: same line format as the GUI console window."""
+    timestamp = time.strftime("%H:%M:%S")
+    print(f"[{timestamp}] {'Error' if is_error else 'Info'}: {message}")
+
+
+class TaskCancelled(Exception):
+    """Raised inside an operation whose ``TaskControl`` was cancelled."""
+
+
+class TaskControl:
+    """Progress reporting and cancellation for one long-running operation.
+
+    The operation calls ``begin`` once it knows how much work there is and
+    ``advance`` as it goes; both raise TaskCancelled once ``cancel`` has
+    been called (from any thread). ``on_progress(progress)`` is called from
+    the working thread with the ``progress()`` dict, at most every
+    ``interval`` seconds plus once at the start and at the end.
+    """
+
+    def __init__(self, on_progress=None, interval=0.1):
+        self.on_progress = on_progress
+        self.interval = interval
+        self.files_done = self.files_total = 0
+        self.bytes_done = self.bytes_total = 0
+        self._cancelled = threading.Event()
+        self._last_report = 0.0
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise TaskCancelled("Cancelled")
+
+    def begin(self, files_total, bytes_total):
+        self.files_done, self.files_total = 0, files_total
+        self.bytes_done, self.bytes_total = 0, bytes_total
+        self._report(force=True)
+        self.check()
+
+    def advance(self, files=0, nbytes=0):
+        self.files_done += files
+        self.bytes_done += nbytes
+        self._report(force=files > 0 and self.files_done >= self.files_total)
+        self.check()
+
+    def progress(self) -> Dict:
+        return {'files_done': self.files_done, 'files_total': self.files_total,
+                'bytes_done': self.bytes_done, 'bytes_total': self.bytes_total}
+
+    def _report(self, force=False):
+        if self.on_progress is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_report >= self.interval:
+            self._last_report = now
+            self.on_progress(self.progress())
+
+
+class ImportPlan:
+    """What an import will do, from ``ConfigEngine.plan_import``; run it with ``execute_plan``.
+
+    ``operations`` holds one dict per file that changes: ``op``
+    (``create``, ``replace`` or ``delete``), archive ``name``, ``size``
+    (bytes to write, 0 for deletes) and the ``source``/``target`` tree
+    entries. A full import also lists the cfg folders it replaces whole in
+    ``replace_dirs``.
+    """
+
+    def __init__(self, target_path, source_path, kind, incremental=True, paths=None):
+        self.target_path = target_path
+        self.source_path = source_path
+        self.kind = kind  # 'archive', 'account' or 'snapshot'
+        self.incremental = incremental
+        self.paths = paths
+        self.target_tree: Dict[str, Dict] = {}  # every cfg file of the target, as planned
+        self.target_dirs: Dict[str, Optional[int]] = {}  # see dirs_stat
+        self.operations: List[Dict] = []
+        self.replace_dirs: List[str] = []
+        self.touch: List[Tuple[str, float]] = []  # (path, mtime) of unchanged files whose mtime is aligned
+        self.unchanged = 0
+        self.bytes_to_write = 0
+        self.free_space: Optional[int] = None
+        self.source_stamp = None  # archive sources: file_stamp, rechecked before executing
+
+    def add(self, op, name, source_entry, target_entry):
+        size = source_entry['size'] if source_entry else 0
+        self.operations.append({'op': op, 'name': name, 'size': size, 'source': source_entry,
+                                'target': target_entry})
+        self.bytes_to_write += size
+
+    def counts(self) -> Dict[str, int]:
+        counts = {'create': 0, 'replace': 0, 'delete': 0, 'unchanged': self.unchanged}
+        for operation in self.operations:
+            counts[operation['op']] += 1
+        return counts
+
+    @property
+    def fits(self) -> bool:
+        """Whether the target disk has room for the files to write (as of ``free_space``).
+
+        Leaves out ``clone_bytes``, which ``execute_plan`` checks as well
+        once it knows whether the drive can link files.
+        """
+        return self.free_space is None or self.bytes_to_write + FREE_SPACE_MARGIN <= self.free_space
+
+    def replaced_names(self) -> Set[str]:
+        """Names of the target's files that the import replaces or deletes."""
+        changed = {operation['name'] for operation in self.operations}
+        return {name for name in self.target_tree if name in changed or cfg_dir_of(name) in self.replace_dirs}
+
+    def clone_bytes(self, backup=True, links=True) -> int:
+        """Bytes the import copies from the target besides ``bytes_to_write``.
+
+        The backup copies the files the import keeps where the drive has
+        no reflinks (see ``BackupStore.create``); they are counted either
+        way. Without hardlinks (``links``), the backup's replaced files and
+        the kept files of staged cfg folders are copied too.
+        """
+        if not self.operations:
+            return 0
+        replaced = self.replaced_names()
+        staged_dirs = {cfg_dir_of(operation['name']) for operation in self.operations} - set(self.replace_dirs)
+        total = 0
+        for name, entry in self.target_tree.items():
+            if backup and (name not in replaced or not links):
+                total += entry['size']
+            if not links and name not in replaced and cfg_dir_of(name) in staged_dirs:
+                total += entry['size']
+        return total
+
+
+class FileLock:
+    """Exclusive OS lock on a file (``flock``, ``msvcrt.locking`` on Windows).
+
+    It keeps out other threads and other processes (the GUI and
+    ``cbd2.py``) alike, and goes away with a process that dies holding
+    it. As a context manager it waits for the lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def acquire(self, blocking=False) -> bool:
+        """Takes the lock; returns False if it is held elsewhere, or waits for it with ``blocking``."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        while True:
+            f = open(self.path, 'a+b')
+            try:
+                if msvcrt:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                else:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                f.close()
+                if not blocking:
+                    return False
+                time.sleep(0.05)
+                continue
+            self._file = f
+            return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if msvcrt:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()  # also drops an flock
+            self._file = None
+
+    def __enter__(self):
+        self.acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AccountLock(FileLock):
+    """Lock on an account's ``STATE_DIR``, held while an import stages into it or is recovered."""
+
+    def __init__(self, account_path):
+        super().__init__(os.path.join(account_path, STATE_DIR, IMPORT_LOCK))
+
+
+class StagedImport:
+    """Builds an import's new cfg folders next to the live ones and swaps them in.
+
+    Every cfg folder the import changes is assembled under
+    ``.cbd2/staging``: files it keeps are cloned from the live folder (see
+    ``backups.FileCloner``) and new ones are written and fsynced.
+    ``commit`` records the folders in a journal and swaps each one in with
+    two renames, so it takes the same time for any config size;
+    ``discard`` drops the staging area and the account is untouched. If
+    the process dies in between, ``recover_import`` finishes the swap when
+    the journal was written and discards the staging area otherwise.
+
+    The account's ``AccountLock`` is held from creation until ``commit``
+    or ``discard`` returns; ValueError is raised if another import holds it.
+    """
+
+    def __init__(self, account_path):
+        self.account_path = account_path
+        self.staging = os.path.join(account_path, STATE_DIR, "staging")
+        self.journal = os.path.join(account_path, STATE_DIR, IMPORT_JOURNAL)
+        self.dirs: List[str] = []
+        self._cloner = None
+        self._lock = AccountLock(account_path)
+        if not self._lock.acquire():
+            raise ValueError("Another import into this account is still running")
+        try:
+            finish_import(account_path)
+            remove_import_leftovers(account_path)
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def stage_dir(self, cfg_dir, keep: Optional[Dict[str, Dict]] = None) -> str:
+        """Creates the staged copy of ``cfg_dir``; returns its path.
+
+        ``keep`` maps the archive names of the live files to carry over to
+        their entries as planned (see ``scan_account``); each is checked
+        with a stat and cloned, without listing the live folder.
+        """
+        if self._cloner is None:
+            from backups import FileCloner
+            self._cloner = FileCloner()
+        staged = os.path.join(self.staging, *cfg_dir.split("/"))
+        os.makedirs(staged)
+        self.dirs.append(cfg_dir)
+        for name, entry in sorted((keep or {}).items()):
+            check_planned_file(self.account_path, name, entry)
+            path = self.staged_path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if self._cloner.clone(entry['path'], path) != "hardlink":
+                fsync_file(path)
+        return staged
+
+    def staged_path(self, name):
+        return os.path.join(self.staging, *name.split("/"))
+
+    def flush(self):
+        """Flushes the staged folders' entries to disk (file data is flushed as it is written)."""
+        for root, _, _ in os.walk(self.staging):
+            fsync_dir(root)
+
+    def commit(self):
+        """Swaps every staged folder into the account; call ``flush`` first.
+
+        If a swap fails (a folder still open on Windows), the journal stays
+        and the next ``recover_import`` completes it.
+        """
+        try:
+            if self.dirs:
+                with span("import.commit", dirs=len(self.dirs)):
+                    write_import_journal(self.account_path, self.dirs)
+                    finish_import(self.account_path)
+            with span("import.cleanup"):
+                remove_import_leftovers(self.account_path)
+        finally:
+            self.dirs = []
+            self._lock.release()
+
+    def discard(self):
+        try:
+            if not os.path.exists(self.journal):  # once committed, only recovery may touch the staging area
+                remove_import_leftovers(self.account_path)
+        finally:
+            self.dirs = []
+            self._lock.release()
+
+
+def recover_import(account_path) -> Optional[str]:
+    """Completes or drops a ``StagedImport`` left unfinished in ``account_path`` by a crash.
+
+    With a journal every staged cfg folder is swapped in (``'forward'``);
+    a staging area without one is deleted (``'back'``). Returns None if
+    there was nothing to recover or an import holds the account's
+    ``AccountLock`` right now.
+    """
+    state_dir = os.path.join(account_path, STATE_DIR)
+    if not any(os.path.exists(os.path.join(state_dir, name)) for name in IMPORT_LEFTOVERS + (IMPORT_JOURNAL,)):
+        return None
+    lock = AccountLock(account_path)
+    if not lock.acquire():
+        return None
+    try:
+        result = finish_import(account_path)
+        remove_import_leftovers(account_path)
+    finally:
+        lock.release()
+    return result
+
+
+def write_import_journal(account_path, cfg_dirs, staging="staging", previous="previous"):
+    """Durably records that ``cfg_dirs`` are to be swapped in; from then on recovery completes the import.
+
+    ``staging`` and ``previous`` are folders under ``STATE_DIR`` holding
+    the new cfg folders and receiving the replaced ones (``BackupStore``
+    swaps a backup in this way). Needs the ``AccountLock``.
+    """
+    journal = os.path.join(account_path, STATE_DIR, IMPORT_JOURNAL)
+    with open(journal + ".cbd2tmp", 'w', encoding='utf-8') as f:
+        json.dump({'dirs': cfg_dirs, 'staging': staging, 'previous': previous}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(journal + ".cbd2tmp", journal)
+    fsync_dir(os.path.dirname(journal))
+
+
+def finish_import(account_path) -> Optional[str]:
+    """The swap step of ``recover_import``; safe to repeat after a crash at any point. Needs the ``AccountLock``."""
+    state_dir = os.path.join(account_path, STATE_DIR)
+    journal = os.path.join(state_dir, IMPORT_JOURNAL)
+    if not os.path.exists(journal):
+        return 'back' if os.path.exists(os.path.join(state_dir, "staging")) else None
+    with open(journal, 'r', encoding='utf-8') as f:
+        entry = json.load(f)
+    staging = os.path.join(state_dir, *entry.get('staging', "staging").split("/"))
+    for cfg_dir in entry['dirs']:
+        live = os.path.join(account_path, *cfg_dir.split("/"))
+        staged = os.path.join(staging, *cfg_dir.split("/"))
+        if not os.path.isdir(staged):
+            continue  # already swapped in
+        if os.path.isdir(live):
+            previous = os.path.join(state_dir, *entry.get('previous', "previous").split("/"), *cfg_dir.split("/"))
+            os.makedirs(os.path.dirname(previous), exist_ok=True)
+            os.replace(live, previous)
+        os.makedirs(os.path.dirname(live), exist_ok=True)
+        os.replace(staged, live)
+    fsync_dir(account_path)
+    os.remove(journal)
+    return 'forward'
+
+
+# What a finished or abandoned StagedImport leaves in STATE_DIR.
+IMPORT_LEFTOVERS = ("staging", "previous", IMPORT_JOURNAL + ".cbd2tmp")
+
+
+def remove_import_leftovers(account_path):
+    """Deletes ``IMPORT_LEFTOVERS`` unless a journal still has to swap them in. Needs the ``AccountLock``."""
+    state_dir = os.path.join(account_path, STATE_DIR)
+    if os.path.exists(os.path.join(state_dir, IMPORT_JOURNAL)):
+        return
+    for leftover in IMPORT_LEFTOVERS:
+        path = os.path.join(state_dir, leftover)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def links_supported(directory) -> bool:
+    """Whether files in ``directory`` can be hardlinked (not on FAT/exFAT drives, for example)."""
+    probe = os.path.join(directory, f"link-probe-{os.getpid()}-{threading.get_ident()}.tmp")
+    open(probe, 'wb').close()
+    try:
+        os.link(probe, probe + ".link")
+        os.remove(probe + ".link")
+        return True
+    except OSError:
+        return False
+    finally:
+        os.remove(probe)
+
+
+class AccountIndex:
+    """Persistent cache of what account discovery learned, keyed by account folder.
+
+    Each entry records the stat of the files it was derived from
+    (``localconfig.vdf`` mtime/size, cfg folder mtimes), so callers can
+    revalidate it with ``stat`` alone. With ``path=None`` the index lives in
+    memory only. Safe to use from several threads.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._dirty = False
+        if path:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    self._entries = data.get('accounts', {})
+            except (OSError, ValueError):
+                pass
+
+    def get(self, account_folder) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(account_folder)
+            return dict(entry) if entry else None
+
+    def update(self, account_folder, **fields):
+        with self._lock:
+            self._entries.setdefault(account_folder, {}).update(fields)
+            self._dirty = True
+
+    def retain(self, userdata_path, account_folders):
+        """Forgets accounts under ``userdata_path`` that are not in ``account_folders``."""
+        keep = set(account_folders)
+        with self._lock:
+            for key in list(self._entries):
+                if os.path.dirname(key) == userdata_path and key not in keep:
+                    del self._entries[key]
+                    self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {'version': self.VERSION, 'accounts': self._entries}
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+                self._dirty = False
+            except OSError:
+                pass
+
+
+class ConfigEngine:
+    """Account discovery, import and export for one Steam userdata folder.
+
+    ``log`` has the signature of ``ConfigBridgeApp.log``
+    (``message, is_error=False, console_only=False``).
+    """
+
+    def __init__(self, steam_userdata_path: Optional[str] = None, log=None, snapshot_store=None, index=None):
+        self.steam_userdata_path = steam_userdata_path
+        self.log = log or print_log
+        self.index = index if index is not None else AccountIndex(os.path.join(user_cache_dir(), "accounts.json"))
+        self._snapshot_store = snapshot_store
+
+    @property
+    def snapshot_store(self):
+        if self._snapshot_store is None:
+            from snapshots import SnapshotStore
+            self._snapshot_store = SnapshotStore()
+        return self._snapshot_store
+
+    def _localconfig_info(self, steam_id, account_folder):
+        """What ``parse_localconfig`` says about an account, parsing each file version at most once.
+
+        Raises FileNotFoundError if the account has no localconfig.vdf.
+        """
+        vdf_path = os.path.join(account_folder, "config", "localconfig.vdf")
+        st = os.stat(vdf_path)
+        entry = self.index.get(account_folder)
+        if entry and entry.get('vdf_mtime_ns') == st.st_mtime_ns and entry.get('vdf_size') == st.st_size:
+            return entry['vdf_info']
+
+        try:
+            info = parse_localconfig(vdf_path, steam_id)
+        except Exception as e:
+            info = {'error': str(e)}
+        self.index.update(account_folder, steam_id=steam_id, vdf_mtime_ns=st.st_mtime_ns, vdf_size=st.st_size,
+                          vdf_info=info)
+        return info
+
+    def get_steam_account_info(self, steam_id, account_path):
+        account_folder = os.path.dirname(os.path.abspath(account_path))
+        vdf_path = os.path.join(account_folder, "config", "localconfig.vdf")
+        fallback = {'personaname': f"User {steam_id}", 'avatar_url': None, 'avatar_hash': None}
+        try:
+            info = self._localconfig_info(steam_id, account_folder)
+        except FileNotFoundError:
+            self.log(f"File not found: {vdf_path} for {steam_id}", is_error=True, console_only=True)
+            return fallback
+        except OSError as e:
+            self.log(f"Error reading vdf for {steam_id}: {e}", is_error=True, console_only=True)
+            return fallback
+
+        if 'error' in info:
+            self.log(f"Error reading vdf for {steam_id}: {info['error']}", is_error=True, console_only=True)
+            return fallback
+        if not info['has_store']:
+            self.log(f"UserLocalConfigStore not found in VDF for {steam_id}", is_error=True, console_only=True)
+            return fallback
+
+        avatar_hash = info['avatar_hash']
+        avatar_url = f"https://avatars.cloudflare.steamstatic.com/{avatar_hash}_full.jpg" if avatar_hash else None
+        return {'personaname': info['personaname'] or f"User {steam_id}", 'avatar_url': avatar_url,
+                'avatar_hash': avatar_hash or None}
+
+    def get_account_folders(self) -> List[Tuple[str, str]]:
+        """Accounts with Dota 2 config files and user info, as ``(steam_id, dota config path)``.
+
+        Results are kept in ``self.index``; an unchanged account costs a few
+        ``stat`` calls and no directory listing or VDF parsing.
+        """
+        with span("accounts.discover"):
+            return self._get_account_folders()
+
+    def _get_account_folders(self) -> List[Tuple[str, str]]:
+        account_folders = []
+        try:
+            if not self.steam_userdata_path or not os.path.exists(self.steam_userdata_path):
+                self.log(f"Steam userdata path not found: {self.steam_userdata_path}", is_error=True)
+                return []
+
+            userdata = os.path.abspath(self.steam_userdata_path)
+            seen = []
+            for folder_name in sorted(os.listdir(userdata), key=lambda name: (len(name), name)):
+                if folder_name.isdigit():
+                    seen.append(os.path.join(userdata, folder_name))
+                    dota_config_path = self._check_account_folder(userdata, folder_name)
+                    if dota_config_path:
+                        account_folders.append((folder_name, dota_config_path))
+
+            self.index.retain(userdata, seen)
+            self.index.save()
+
+        except Exception as e:
+            self.log(f"Error accessing Steam userdata: {e}", is_error=True)
+            self.log(traceback.format_exc(), is_error=True, console_only=True)
+
+        return account_folders
+
+    def _check_account_folder(self, userdata, folder_name) -> Optional[str]:
+        """The Dota 2 config path of one account folder, or None if it is not a usable account."""
+        account_folder = os.path.join(userdata, folder_name)
+        dota_config_path = os.path.join(account_folder, DOTA_APP_ID)
+
+        # Check for Dota 2 config directory AND if any config files exist
+        if not os.path.isdir(dota_config_path):
+            return None
+        cfg_stat = cfg_dirs_stat(dota_config_path)
+        entry = self.index.get(account_folder)
+        if entry and entry.get('cfg_stat') == cfg_stat:
+            config_files_exist = entry['has_configs']
+        else:
+            config_files_exist = has_config_files(dota_config_path)
+            self.index.update(account_folder, steam_id=folder_name, cfg_stat=cfg_stat,
+                              has_configs=config_files_exist,
+                              cfg_paths=[os.path.join(dota_config_path, d) for d in CFG_DIRS
+                                         if os.path.isdir(os.path.join(dota_config_path, d))])
+
+        if not config_files_exist:
+            self.log(f"No config files found for {folder_name}. Skipping.", is_error=False)
+            return None  # Skip this account
+
+        try:
+            info = self._localconfig_info(folder_name, account_folder)
+        except FileNotFoundError:
+            self.log(f"localconfig.vdf not found for {folder_name}. Skipping.", is_error=False)
+            return None
+
+        if 'error' in info:
+            self.log(f"Error reading localconfig.vdf for {folder_name}: {info['error']}. Skipping.",
+                     is_error=True)
+        elif info['has_friends']:
+            return dota_config_path  # Use dota config path
+        else:
+            self.log(f"User information not found in localconfig.vdf for {folder_name}. Skipping.",
+                     is_error=False)
+        return None
+
+    def reload_accounts(self, steam_ids) -> Dict[str, Optional[Dict]]:
+        """Re-reads just the given accounts (e.g. after a file change).
+
+        Returns steam id -> fresh account dict (see ``load_account``, without
+        avatar), or None for ids that are no longer usable accounts.
+        """
+        accounts = {}
+        userdata = os.path.abspath(self.steam_userdata_path) if self.steam_userdata_path else None
+        for steam_id in steam_ids:
+            dota_config_path = None
+            if userdata and os.path.isdir(os.path.join(userdata, steam_id)):
+                try:
+                    dota_config_path = self._check_account_folder(userdata, steam_id)
+                except OSError as e:
+                    self.log(f"Error reading account {steam_id}: {e}", is_error=True, console_only=True)
+            accounts[steam_id] = self.load_account(steam_id, dota_config_path) if dota_config_path else None
+        self.index.save()
+        return accounts
+
+    def load_account(self, steam_id, account_path) -> Dict:
+        self.recover_account(account_path)
+        account_info = self.get_steam_account_info(steam_id, account_path)
+        return {
+            'account_id': steam_id,
+            'personaname': account_info.get('personaname', f"User {steam_id}"),
+            'avatar_url': account_info.get('avatar_url'),
+            'avatar_hash': account_info.get('avatar_hash'),
+            'avatar': None,
+            'path': account_path
+        }
+
+    def load_accounts(self, **loader_options) -> List[Dict]:
+        """Discovered accounts as dicts, in account id order; see ``AccountLoader`` for the options.
+
+        Avatars are only fetched if a ``fetch_avatar`` callable is given.
+        """
+        return AccountLoader(self, **loader_options).run()
+
+    def import_config(self, target_account_path, source_path, incremental=True, task: Optional[TaskControl] = None,
+                      paths=None, backup=True):
+        """Imports a .cbd2/.zip archive, another account folder or a stored snapshot
+        (``snapshot:<id>``) into ``target_account_path``.
+
+        With ``incremental`` (the default) only files that differ are
+        rewritten or deleted and the change counts are returned (see
+        ``apply_operations``). Otherwise every cfg folder present in the
+        source is emptied and copied again, and None is returned.
+
+        ``paths`` limits an incremental import to these archive names or
+        folders (``remote/cfg``); only the selected archive members are
+        read. Members of format 2 archives are checked against the
+        manifest hash as they are written.
+
+        ``task`` receives progress and can cancel the import. The changed
+        cfg folders are built aside and swapped in at the end (see
+        ``StagedImport``), so if the import is cancelled (TaskCancelled),
+        fails or is killed, the account keeps its previous state. Unless
+        ``backup`` is False, the account is backed up first so
+        ``undo_import`` can revert a completed import. This is
+        ``plan_import`` followed by ``execute_plan``.
+        """
+        try:
+            plan = self.plan_import(target_account_path, source_path, incremental, paths)
+        except Exception as e:
+            self.log(f"Error during import: {e}", is_error=True)
+            self.log(traceback.format_exc(), is_error=True, console_only=True)
+            raise
+        return self.execute_plan(plan, task, backup)
+
+    def recover_account(self, account_path):
+        """Finishes or drops an import that was interrupted in ``account_path``; see ``recover_import``."""
+        result = recover_import(account_path)
+        if result == 'forward':
+            self.log(f"Completed an interrupted import into {account_path}")
+        elif result == 'back':
+            self.log(f"Discarded an unfinished import into {account_path}, nothing was changed")
+
+    def backup_store(self, account_path):
+        from backups import BackupStore
+        return BackupStore(account_path)
+
+    def undo_import(self, account_path, backup_id=None) -> Dict:
+        """Restores the newest (or the given) backup of an account; see ``BackupStore.restore``.
+
+        The replaced config is kept as a new backup, so an undo can itself
+        be undone. Returns that backup's manifest.
+        """
+        self.recover_account(account_path)
+        with span("backup.restore", account=account_path):
+            manifest = self.backup_store(account_path).restore(backup_id)
+        self.log(f"Restored backup {manifest['undoes']}; the replaced config was kept as backup {manifest['id']}")
+        return manifest
+
+    def plan_import(self, target_account_path, source_path, incremental=True, paths=None) -> 'ImportPlan':
+        """Works out what importing ``source_path`` would do, without changing anything.
+
+        Reads the source's file list (an archive's central directory and
+        manifest, not its contents) and stats the target's cfg folders; see
+        ``import_config`` for the arguments. Raises FileNotFoundError if the
+        source has no config files and ValueError for an unusable source.
+        """
+        if paths and not incremental:
+            raise ValueError("A partial import must be incremental")
+        self.recover_account(target_account_path)
+        if os.path.isdir(source_path):
+            self.recover_account(source_path)
+        with span("import.plan", source=source_path, incremental=incremental):
+            description = self.inspect_source(source_path)
+            source_tree = description['files']
+            if paths:
+                source_tree = select_paths(source_tree, paths)
+            if not source_tree:
+                self.log(f"No configuration files found in {source_path}", is_error=True)
+                raise FileNotFoundError("No config files")
+            if description['kind'] == 'archive':
+                check_archive_compression(entry['info'] for entry in source_tree.values())
+
+            plan = ImportPlan(target_account_path, source_path, description['kind'], incremental, paths)
+            if description['kind'] == 'archive':
+                plan.source_stamp = file_stamp(source_path)
+            source_dirs = sorted({cfg_dir_of(name) for name in source_tree})
+            plan.target_tree = scan_account(target_account_path)
+            plan.target_dirs = dirs_stat(target_account_path, plan.target_tree)
+            target_tree = {name: entry for name, entry in plan.target_tree.items() if cfg_dir_of(name) in source_dirs}
+            if paths:
+                target_tree = select_paths(target_tree, paths)
+
+            plan_operations(plan, source_tree, target_tree)
+            if not incremental:
+                plan.replace_dirs = source_dirs
+            plan.free_space = free_disk_space(target_account_path)
+        return plan
+
+    def execute_plan(self, plan: 'ImportPlan', task: Optional[TaskControl] = None, backup=True) -> Optional[Dict]:
+        """Carries out an ``ImportPlan`` without scanning the source or target again.
+
+        Each file is checked against the state it had when planned (a stat,
+        not a scan); if the target or an archive source changed since,
+        ValueError is raised and nothing is changed. The account itself is
+        not touched before the staged folders are committed; missing cfg
+        folders and the mtimes of unchanged files follow after that (see
+        ``settle_target``). With ``backup``, the account's cfg folders are
+        backed up first (see ``backups.py``) so ``undo_import`` can restore
+        them. Returns what ``import_config`` returns.
+        """
+        try:
+            self.recover_account(plan.target_path)
+            if plan.source_stamp and file_stamp(plan.source_path) != plan.source_stamp:
+                raise ValueError("The source changed after the import was planned")
+            staged, backup_id = StagedImport(plan.target_path), None
+            try:
+                plan.free_space = free_disk_space(plan.target_path)
+                links = links_supported(os.path.join(plan.target_path, STATE_DIR))
+                needed = plan.bytes_to_write + plan.clone_bytes(backup, links)
+                if plan.free_space is not None and needed + FREE_SPACE_MARGIN > plan.free_space:
+                    raise ValueError(f"Not enough free disk space: {format_size(needed)} to write, "
+                                     f"{format_size(plan.free_space)} free")
+
+                for operation in plan.operations:
+                    check_planned_target(plan.target_path, operation)
+                backups = self.backup_store(plan.target_path)
+                if backup and plan.operations:
+                    with span("backup.create", files=len(plan.target_tree)):
+                        backup_id = backups.create(plan.target_tree, reason=f"import {plan.source_path}",
+                                                   prune=False, link=plan.replaced_names())['id']
+
+                with span("import", source=plan.source_path, incremental=plan.incremental):
+                    stats = self._execute_plan(plan, task, staged)
+            except BaseException:
+                staged.discard()
+                if backup_id:
+                    backups.delete(backup_id)
+                raise
+            staged.commit()
+            self.settle_target(plan)
+            if backup_id:
+                backups.prune()
+
+        except TaskCancelled:
+            self.log("Import cancelled, nothing was changed")
+            raise
+        except Exception as e:
+            self.log(f"Error during import: {e}", is_error=True)
+            self.log(traceback.format_exc(), is_error=True, console_only=True)
+            raise
+
+        if plan.kind == 'snapshot':
+            self.log(f"Restored snapshot {plan.source_path[len(SNAPSHOT_PREFIX):]}{format_stats(stats)}")
+        elif plan.kind == 'archive':
+            self.log(f"Imported config from file {plan.source_path}{format_stats(stats)}")
+        else:
+            self.log(f"Imported config from account {plan.source_path}{format_stats(stats)}")
+        return stats if plan.incremental else None
+
+    def settle_target(self, plan: 'ImportPlan'):
+        """The steps of an import that follow the commit: missing cfg folders and mtimes of unchanged files.
+
+        Neither changes any content, so a failure is only logged.
+        """
+        try:
+            for cfg_dir in CFG_DIRS:
+                full_cfg_dir = os.path.join(plan.target_path, cfg_dir)
+                if not os.path.exists(full_cfg_dir):
+                    os.makedirs(full_cfg_dir)
+                    self.log(f"Created directory: {full_cfg_dir}")
+            for path, mtime in plan.touch:
+                os.utime(path, (mtime, mtime))
+        except OSError as e:
+            self.log(f"Error finishing import into {plan.target_path}: {e}", is_error=True, console_only=True)
+
+    def _execute_plan(self, plan, task, staged):
+        if plan.kind != 'archive':
+            return self.apply_operations(plan, lambda entry: open(entry['path'], 'rb'), staged, task)
+        try:
+            with zipfile.ZipFile(plan.source_path, 'r') as zip_ref:
+                return self.apply_operations(plan, lambda entry: open_member(zip_ref, entry), staged, task)
+        except zipfile.BadZipFile:
+            self.log(f"Invalid zip file: {plan.source_path}", is_error=True)
+            raise ValueError("The selected file is not a valid archive")
+
+    def apply_operations(self, plan: 'ImportPlan', open_source, staged: StagedImport,
+                         task: Optional[TaskControl] = None) -> Dict:
+        """Performs a plan's operations; ``open_source(entry)`` returns a binary stream for a source entry.
+
+        Each cfg folder with changes is rebuilt in ``staged``: folders in
+        ``plan.replace_dirs`` start empty, others keep the files the plan
+        neither writes nor deletes. The caller commits or discards
+        ``staged``. Returns counts of ``added``/``replaced``/``deleted``/
+        ``unchanged`` files and ``bytes_written``.
+        """
+        stats = {'added': 0, 'replaced': 0, 'deleted': 0, 'unchanged': plan.unchanged, 'bytes_written': 0}
+        deletes = [operation for operation in plan.operations if operation['op'] == 'delete']
+        writes = [operation for operation in plan.operations if operation['op'] != 'delete']
+        if task:
+            task.begin(len(plan.operations), plan.bytes_to_write)
+
+        changed = {operation['name'] for operation in plan.operations}
+        cfg_dirs = set(plan.replace_dirs) | {cfg_dir_of(name) for name in changed}
+        with span("import.stage", dirs=len(cfg_dirs)):
+            for cfg_dir in sorted(cfg_dirs):
+                keep = {}
+                if cfg_dir not in plan.replace_dirs:
+                    check_planned_dirs(plan, cfg_dir)
+                    keep = {name: entry for name, entry in plan.target_tree.items()
+                            if cfg_dir_of(name) == cfg_dir and name not in changed}
+                staged.stage_dir(cfg_dir, keep)
+
+        for _ in deletes:
+            stats['deleted'] += 1
+            if task:
+                task.advance(files=1)
+        if deletes:
+            for cfg_dir in {cfg_dir_of(operation['name']) for operation in deletes}:
+                remove_empty_dirs(staged.staged_path(cfg_dir))
+
+        for operation in writes:
+            with open_source(operation['source']) as src:
+                stats['bytes_written'] += write_file_atomic(src, staged.staged_path(operation['name']),
+                                                            operation['source']['mtime'], task, fsync=True)
+            stats['replaced' if operation['op'] == 'replace' else 'added'] += 1
+            if task:
+                task.advance(files=1)
+        with span("import.flush"):
+            staged.flush()
+        return stats
+
+    def export_snapshot(self, account_path, metadata: Dict):
+        """Stores the account's cfg folders in the snapshot store; returns the snapshot id."""
+        if not has_config_files(account_path):
+            raise FileNotFoundError("No config files")
+        snapshot_id = self.snapshot_store.save(account_path, metadata)
+        self.log(f"Configuration saved as snapshot {snapshot_id}")
+        return snapshot_id
+
+    def export_config(self, account_path, save_path, metadata: Dict, task: Optional[TaskControl] = None,
+                      compression=DEFAULT_COMPRESSION):
+        """Writes the account's cfg folders plus ``metadata.json`` and the manifest to ``save_path``.
+
+        Files are streamed from the account straight into the archive, so
+        nothing is staged next to ``save_path``. The archive is written under
+        a ``.part`` name and renamed into place once complete; if the export
+        fails or ``task`` is cancelled, no file is left behind.
+        ``compression`` names a profile from ``COMPRESSION_PROFILES``;
+        members are compressed in parallel (see ``write_archive_members``).
+
+        Raises FileNotFoundError if the account has no config files and
+        ValueError for an unusable compression profile.
+        """
+        method, level = compression_settings(compression)
+        self.recover_account(account_path)
+        if not has_config_files(account_path):
+            raise FileNotFoundError("No config files")
+
+        tree = scan_account(account_path)
+        members = [(zipfile.ZipInfo.from_file(entry['path'], name), entry['path'])
+                   for name, entry in sorted(tree.items())]
+        if task:
+            task.begin(len(members), sum(entry['size'] for entry in tree.values()))
+
+        part_path = save_path + ".part"
+        try:
+            with span("export", path=save_path, compression=compression), \
+                    zipfile.ZipFile(part_path, 'w', method, compresslevel=level) as zipf:
+                hashes = write_archive_members(zipf, members, method, level, task)
+                for name, entry in tree.items():
+                    entry['hash'] = hashes[name]
+                zipf.writestr(MANIFEST_NAME, json.dumps(build_manifest(tree), indent=1))
+                zipf.writestr("metadata.json", json.dumps(metadata, indent=2))
+            os.replace(part_path, save_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+        self.log(f"Configuration exported to {save_path}")
+
+    def inspect_source(self, source_path) -> Dict:
+        """Describes an archive, account folder or snapshot (``snapshot:<id>``) without extracting it.
+
+        Archives are read from their central directory, ``metadata.json``
+        and manifest only. Returns ``{'kind', 'format', 'metadata',
+        'digest', 'pending_import', 'size', 'stored_size', 'files'}``;
+        ``files`` is a source tree as ``scan_archive``/``scan_account``
+        return it, and ``format``, ``metadata`` and ``digest`` are None
+        where the source has none. ``pending_import`` is True for an account
+        holding the journal of an interrupted import, which is left for the
+        next load or import to complete (see ``recover_import``); ``files``
+        is the account as it is until then.
+        """
+        description = {'kind': None, 'format': None, 'metadata': None, 'digest': None, 'pending_import': False}
+        if source_path.startswith(SNAPSHOT_PREFIX):
+            snapshot_id = source_path[len(SNAPSHOT_PREFIX):]
+            tree = self.snapshot_store.snapshot_tree(snapshot_id)
+            description.update(kind='snapshot', metadata=self.snapshot_store.load(snapshot_id)['metadata'],
+                               digest=manifest_digest(tree))
+            stored_size = None
+        elif os.path.isfile(source_path):
+            try:
+                with zipfile.ZipFile(source_path, 'r') as zip_ref:
+                    manifest = read_manifest(zip_ref)
+                    tree = scan_archive(zip_ref, manifest)
+                    description.update(kind='archive', format=manifest['format'] if manifest else 1,
+                                       metadata=read_metadata(zip_ref),
+                                       digest=manifest['digest'] if manifest else None)
+            except zipfile.BadZipFile:
+                raise ValueError("The selected file is not a valid archive")
+            stored_size = sum(entry['info'].compress_size for entry in tree.values())
+        elif os.path.isdir(source_path):
+            tree = scan_account(source_path)
+            description.update(kind='account', pending_import=os.path.exists(
+                os.path.join(source_path, STATE_DIR, IMPORT_JOURNAL)))
+            stored_size = None
+        else:
+            raise ValueError("Invalid source path")
+        size = sum(entry['size'] for entry in tree.values())
+        description.update(size=size, stored_size=size if stored_size is None else stored_size, files=tree)
+        return description
+
+    def diff_sources(self, old_path, new_path) -> Dict[str, List[str]]:
+        """Compares two sources (see ``inspect_source``); returns ``diff_trees(old, new)``."""
+        with span("diff", old=old_path, new=new_path):
+            return diff_trees(self.inspect_source(old_path)['files'], self.inspect_source(new_path)['files'])
+
+    def verify_archive(self, archive_path) -> Dict:
+        """Reads every cfg member of an archive and checks it against its manifest hash.
+
+        Format 1 archives have no manifest, so only the zip CRCs are
+        checked. Returns ``{'format', 'files', 'damaged'}`` (names of the
+        members that failed); raises ValueError if the archive or its
+        manifest cannot be read at all.
+        """
+        damaged = []
+        try:
+            with span("verify", path=archive_path), zipfile.ZipFile(archive_path, 'r') as zip_ref:
+                check_archive_compression(zip_ref.infolist())
+                manifest = read_manifest(zip_ref)
+                tree = scan_archive(zip_ref, manifest)
+                for name, entry in sorted(tree.items()):
+                    try:
+                        with open_member(zip_ref, entry) as src:
+                            while src.read(COPY_BUFSIZE):
+                                pass
+                    except DAMAGED_MEMBER_ERRORS:
+                        damaged.append(name)
+        except zipfile.BadZipFile:
+            raise ValueError("The selected file is not a valid archive")
+        return {'format': manifest['format'] if manifest else 1, 'files': len(tree), 'damaged': damaged}
+
+
+class AccountLoader:
+    """Loads accounts on two bounded thread pools.
+
+    Reading account info (``ConfigEngine.load_account``) runs on
+    ``parse_workers`` threads; avatar downloads (``fetch_avatar(account)``
+    returning a file path or None) run on a separate pool of
+    ``avatar_workers`` threads, so a slow download never holds a parse slot.
+    A task still running ``parse_timeout``/``avatar_timeout`` seconds after
+    it started is abandoned: the account is skipped or left without avatar.
+
+    ``on_account(account)`` is called as soon as an account's info is known
+    and ``on_avatar(account)`` when its avatar arrives, both from the
+    thread calling ``run``. ``run`` returns the accounts in account id order
+    regardless of completion order.
+    """
+
+    def __init__(self, config_engine, parse_workers=4, avatar_workers=8, parse_timeout=10.0,
+                 avatar_timeout=15.0, fetch_avatar=None, on_account=None, on_avatar=None):
+        self.engine = config_engine
+        self.parse_workers = max(1, parse_workers)
+        self.avatar_workers = max(1, avatar_workers)
+        self.parse_timeout = parse_timeout
+        self.avatar_timeout = avatar_timeout
+        self.fetch_avatar = fetch_avatar
+        self.on_account = on_account
+        self.on_avatar = on_avatar
+
+    def run(self) -> List[Dict]:
+        with span("accounts.load"):
+            return self._run()
+
+    def _run(self) -> List[Dict]:
+        log = self.engine.log
+        folders = self.engine.get_account_folders()
+        accounts: List[Optional[Dict]] = [None] * len(folders)
+        started = {}
+
+        def timed(future_key, func, *args):
+            started[future_key] = time.monotonic()
+            return func(*args)
+
+        parse_pool = ThreadPoolExecutor(self.parse_workers, thread_name_prefix="cbd2-parse")
+        avatar_pool = ThreadPoolExecutor(self.avatar_workers, thread_name_prefix="cbd2-avatar")
+        pending = {}
+        try:
+            for i, (steam_id, account_path) in enumerate(folders):
+                key = ('parse', i)
+                pending[parse_pool.submit(timed, key, self.engine.load_account, steam_id, account_path)] = key
+
+            while pending:
+                done, _ = wait(pending, timeout=0.25, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, i = key = pending.pop(future)
+                    started.pop(key, None)
+                    steam_id = folders[i][0]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        log(f"Error loading account {steam_id}: {e}", is_error=True, console_only=True)
+                        continue
+
+                    if stage == 'parse':
+                        accounts[i] = result
+                        if self.on_account:
+                            self.on_account(result)
+                        if self.fetch_avatar and result.get('avatar_url'):
+                            avatar_key = ('avatar', i)
+                            pending[avatar_pool.submit(timed, avatar_key, self.fetch_avatar, result)] = avatar_key
+                    else:
+                        accounts[i]['avatar'] = result
+                        if self.on_avatar and result:
+                            self.on_avatar(accounts[i])
+
+                now = time.monotonic()
+                for future, key in list(pending.items()):
+                    timeout = self.parse_timeout if key[0] == 'parse' else self.avatar_timeout
+                    start = started.get(key)
+                    if timeout is not None and start is not None and now - start > timeout:
+                        del pending[future]
+                        future.cancel()
+                        log(f"Timed out loading {key[0]} for account {folders[key[1]][0]}", is_error=True,
+                            console_only=True)
+        finally:
+            for future in pending:  # queued work is dropped; shutdown(cancel_futures=True) needs Python 3.9
+                future.cancel()
+            parse_pool.shutdown(wait=False)
+            avatar_pool.shutdown(wait=False)
+            self.engine.index.save()
+
+        return [account for account in accounts if account is not None]
+
+
+def parse_localconfig(vdf_path, steam_id) -> Dict:
+    """Reads persona name and avatar hash from an account's localconfig.vdf.
+
+    Returns ``has_store``/``has_friends`` (whether ``UserLocalConfigStore``
+    and its ``friends`` block exist), ``personaname`` (None if absent) and
+    ``avatar_hash`` (empty string if absent).
+
+    Uses the targeted ``vdfscan`` scanner and falls back to a full
+    ``vdf.load`` if the file is too unusual for it.
+    """
+    with span("vdf.parse", account=steam_id):
+        try:
+            with open(vdf_path, 'r', encoding='utf-8') as f:
+                return scan_localconfig(f, steam_id)
+        except VdfScanError:
+            with span("vdf.parse_full", account=steam_id):
+                return parse_localconfig_full(vdf_path, steam_id)
+
+
+def parse_localconfig_full(vdf_path, steam_id) -> Dict:
+    """``parse_localconfig`` via a full ``vdf.load`` of the file."""
+    with open(vdf_path, 'r', encoding='utf-8') as f:
+        config_data = vdf.load(f)
+
+    user_config = config_data.get('UserLocalConfigStore', {})
+    friends = user_config.get('friends', {}) if user_config else {}
+    account_info = friends.get(steam_id, {})
+
+    # Prefer 'PersonaName' at the top level of 'friends', then look inside the steam_id dict,
+    # then use the name history.
+    personaname = friends.get("PersonaName")  # Check for global PersonaName FIRST
+    if not personaname:
+        personaname = account_info.get('Name')  # Then check for 'Name' within the specific user data.
+
+    if not personaname:
+        # Fallback to name history if 'Name' is missing
+        if 'NameHistory' in account_info:
+            name_history = account_info['NameHistory']
+            # NameHistory might be a dict (keys are numbers as strings) or a list.  Handle both.
+            if isinstance(name_history, dict):
+                # Get the first name in history (usually the most recent).
+                personaname = next(iter(name_history.values()), None)  # Get first value, or None
+            elif isinstance(name_history, list):
+                personaname = name_history[0] if name_history else None  # get first or None
+
+    return {
+        'has_store': bool(user_config),
+        'has_friends': bool(user_config) and 'friends' in user_config,
+        'personaname': personaname or None,
+        'avatar_hash': account_info.get('avatar', ''),
+    }
+
+
+def cfg_dirs_stat(account_path) -> List[Optional[int]]:
+    """mtime_ns of each cfg folder (None if missing); changes whenever files are added or removed."""
+    stats = []
+    for cfg_dir in CFG_DIRS:
+        try:
+            stats.append(os.stat(os.path.join(account_path, cfg_dir)).st_mtime_ns)
+        except OSError:
+            stats.append(None)
+    return stats
+
+
+def has_config_files(account_path) -> bool:
+    for cfg_dir in CFG_DIRS:
+        full_cfg_path = os.path.join(account_path, cfg_dir)
+        if os.path.isdir(full_cfg_path) and os.listdir(full_cfg_path):
+            return True
+    return False
+
+
+def split_archive_name(name) -> Optional[Tuple[str, str]]:
+    """Maps an archive member name to ``(cfg folder, relative path)``.
+
+    Returns None for members outside the cfg folders (``metadata.json``)
+    and for names that would escape the target folder.
+    """
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if ".." in parts or not parts or ":" in parts[0]:
+        return None
+    for cfg_dir in CFG_DIRS:
+        cfg_parts = cfg_dir.split(os.sep)
+        if parts[:len(cfg_parts)] == cfg_parts and len(parts) > len(cfg_parts):
+            return cfg_dir, os.path.join(*parts[len(cfg_parts):])
+    return None
+
+
+def cfg_dir_of(name):
+    """The cfg folder (``CFG_DIRS`` spelling) an archive-style name belongs to."""
+    return split_archive_name(name)[0]
+
+
+def archive_name(cfg_dir, rel_path):
+    return "/".join(cfg_dir.split(os.sep) + rel_path.split(os.sep))
+
+
+def scan_account(account_path, cfg_dirs=None) -> Dict[str, Dict]:
+    """Lists the files under an account's cfg folders without reading them.
+
+    Returns archive name -> ``{'size', 'mtime', 'path'}``.
+    """
+    tree = {}
+    for cfg_dir in CFG_DIRS:
+        if cfg_dirs is not None and cfg_dir not in cfg_dirs:
+            continue
+        root_dir = os.path.join(account_path, cfg_dir)
+        if not os.path.isdir(root_dir):
+            continue
+        for root, _, files in os.walk(root_dir):
+            for file in files:
+                file_path = os.path.join(root, file)
+                st = os.stat(file_path)
+                name = archive_name(cfg_dir, os.path.relpath(file_path, root_dir))
+                tree[name] = {'size': st.st_size, 'mtime': st.st_mtime, 'path': file_path}
+    return tree
+
+
+def scan_archive(zip_ref: zipfile.ZipFile, manifest: Optional[Dict] = None) -> Dict[str, Dict]:
+    """Lists the cfg members of an archive from its central directory.
+
+    Returns archive name -> ``{'size', 'mtime', 'crc', 'info'}``. With the
+    archive's ``manifest`` (format 2) entries also get the member's
+    ``hash`` and its exact mtime; ValueError is raised if the manifest
+    does not describe the members actually present.
+    """
+    tree = {}
+    for info in zip_ref.infolist():
+        if info.is_dir():
+            continue
+        split = split_archive_name(info.filename)
+        if split:
+            tree[archive_name(*split)] = {'size': info.file_size, 'crc': info.CRC, 'info': info}
+    if manifest is None:
+        for entry in tree.values():
+            entry['mtime'] = time.mktime(entry['info'].date_time + (0, 0, -1))
+        return tree
+
+    files = manifest['files']
+    if set(files) != set(tree) or any(files[name]['size'] != entry['size'] for name, entry in tree.items()):
+        raise ValueError("The archive is damaged: its manifest does not match its contents")
+    for name, entry in tree.items():
+        entry['mtime'] = files[name]['mtime']
+        entry['hash'] = files[name]['hash']
+    return tree
+
+
+def read_metadata(zip_ref: zipfile.ZipFile) -> Optional[Dict]:
+    """The archive's ``metadata.json``, or None if it is missing or unreadable."""
+    try:
+        metadata = json.loads(zip_ref.read("metadata.json"))
+    except (KeyError, ValueError):
+        return None
+    return metadata if isinstance(metadata, dict) else None
+
+
+def plan_operations(plan: ImportPlan, source_tree: Dict[str, Dict], target_tree: Dict[str, Dict]):
+    """Adds to ``plan`` the operations that make ``target_tree`` match ``source_tree``.
+
+    An incremental plan leaves files with the same content alone (aligning
+    their mtime); a full plan replaces every file the source has.
+    """
+    for name in sorted(set(target_tree) - set(source_tree)):
+        plan.add('delete', name, None, target_tree[name])
+    for name, entry in sorted(source_tree.items()):
+        target_entry = target_tree.get(name)
+        if not target_entry:
+            plan.add('create', name, entry, None)
+        elif not plan.incremental or not entries_match(entry, target_entry):
+            plan.add('replace', name, entry, target_entry)
+        else:
+            plan.unchanged += 1
+            if target_entry['mtime'] != entry['mtime']:
+                # Same content: align the mtime so the next run settles on size/mtime alone.
+                plan.touch.append((target_entry['path'], entry['mtime']))
+
+
+def check_planned_target(target_path, operation):
+    """Raises ValueError if an operation's target file changed since it was planned."""
+    check_planned_file(target_path, operation['name'], operation['target'])
+
+
+def dirs_stat(account_path, tree: Dict[str, Dict]) -> Dict[str, Optional[int]]:
+    """mtime_ns (None if missing) of each cfg folder and each folder holding a file of ``tree``, by path.
+
+    Adding or removing a file changes the mtime of its folder, so
+    ``check_planned_dirs`` can tell with a stat whether the file list is
+    still the one planned.
+    """
+    dirs = {os.path.join(account_path, cfg_dir) for cfg_dir in CFG_DIRS}
+    dirs.update(os.path.dirname(entry['path']) for entry in tree.values())
+    stats = {}
+    for path in dirs:
+        try:
+            stats[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            stats[path] = None
+    return stats
+
+
+def check_planned_dirs(plan: ImportPlan, cfg_dir):
+    """Raises ValueError if files were added to or removed from ``cfg_dir`` since it was planned."""
+    live = os.path.join(plan.target_path, cfg_dir)
+    for path, mtime_ns in plan.target_dirs.items():
+        if path == live or path.startswith(live + os.sep):
+            try:
+                current = os.stat(path).st_mtime_ns
+            except OSError:
+                current = None
+            if current != mtime_ns:
+                raise ValueError(f"The account changed after the import was planned ({cfg_dir})")
+
+
+def check_planned_file(target_path, name, expected):
+    """Raises ValueError unless the target file ``name`` still has the planned entry ``expected`` (None: absent)."""
+    path = os.path.join(target_path, *name.split("/"))
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    if expected is None:
+        changed = st is not None
+    else:
+        changed = st is None or st.st_size != expected['size'] or st.st_mtime != expected['mtime']
+    if changed:
+        raise ValueError(f"The account changed after the import was planned ({name})")
+
+
+def file_stamp(path) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def free_disk_space(path) -> Optional[int]:
+    """Free bytes on the drive holding ``path``, or None if unknown."""
+    try:
+        return shutil.disk_usage(path).free
+    except OSError:
+        return None
+
+
+def format_size(nbytes) -> str:
+    if nbytes < 1024 * 1024:
+        return f"{nbytes / 1024:.0f} KB"
+    return f"{nbytes / (1024 * 1024):.1f} MB"
+
+
+def same_content(a: Dict, b: Dict) -> bool:
+    """True if two tree entries (from any source) hold the same content.
+
+    CRCs (from the zip central directory) or hashes are compared when both
+    entries carry them, so archives and snapshots never need reading;
+    otherwise ``entries_match`` decides, reading a file on disk only when
+    sizes match and mtimes differ.
+    """
+    if a['size'] != b['size']:
+        return False
+    for key in ('crc', 'hash'):
+        if key in a and key in b:
+            return a[key] == b[key]
+    if 'path' in b:
+        return entries_match(a, b)
+    return entries_match(b, a)
+
+
+def diff_trees(old_tree: Dict[str, Dict], new_tree: Dict[str, Dict]) -> Dict[str, List[str]]:
+    """What turning ``old_tree`` into ``new_tree`` changes.
+
+    Returns sorted archive names under ``added``, ``removed``, ``changed``
+    and ``unchanged``.
+    """
+    common = sorted(set(old_tree) & set(new_tree))
+    changed = [name for name in common if not same_content(new_tree[name], old_tree[name])]
+    return {
+        'added': sorted(set(new_tree) - set(old_tree)),
+        'removed': sorted(set(old_tree) - set(new_tree)),
+        'changed': changed,
+        'unchanged': sorted(set(common) - set(changed)),
+    }
+
+
+def manifest_digest(files: Dict[str, Dict]) -> str:
+    """Digest over every member's name, size and hash, in name order.
+
+    Archives holding the same files have the same digest, whatever their
+    mtimes, member order or compression.
+    """
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    for name in sorted(files):
+        digest.update(f"{name}\0{files[name]['size']}\0{files[name]['hash']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def build_manifest(files: Dict[str, Dict]) -> Dict:
+    """The format 2 manifest for archive name -> ``{'size', 'mtime', 'hash'}``."""
+    files = {name: {'size': files[name]['size'], 'mtime': files[name]['mtime'], 'hash': files[name]['hash']}
+             for name in sorted(files)}
+    return {'format': ARCHIVE_FORMAT, 'hash': HASH_NAME, 'files': files, 'digest': manifest_digest(files)}
+
+
+def read_manifest(zip_ref: zipfile.ZipFile) -> Optional[Dict]:
+    """The archive's manifest, or None for a format 1 archive (which has none).
+
+    Raises ValueError if the manifest is unreadable, inconsistent with its
+    own digest or from a newer format.
+    """
+    try:
+        info = zip_ref.getinfo(MANIFEST_NAME)
+    except KeyError:
+        return None
+    try:
+        manifest = json.loads(zip_ref.read(info))
+        files = manifest['files']
+        if manifest['format'] > ARCHIVE_FORMAT:
+            raise ValueError("The archive was made by a newer version of ConfigBridge")
+        if manifest['hash'] != HASH_NAME or manifest_digest(files) != manifest['digest']:
+            raise ValueError("The archive is damaged: its manifest digest does not match")
+    except (KeyError, TypeError, json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError("The archive is damaged: its manifest is unreadable")
+    return manifest
+
+
+class HashingReader:
+    """Wraps a binary stream and hashes what is read from it.
+
+    With ``expected``, reaching the end of the stream raises ValueError if
+    the content hash differs, so a damaged member fails before its
+    temporary file is renamed into place.
+    """
+
+    def __init__(self, raw, expected=None, name=None):
+        self.raw = raw
+        self.expected = expected
+        self.name = name
+        self._digest = hashlib.blake2b(digest_size=HASH_SIZE)
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        if data:
+            self._digest.update(data)
+        elif self.expected is not None and self.hexdigest() != self.expected:
+            raise ValueError(f"The archive is damaged: {self.name} does not match its manifest hash")
+        return data
+
+    def hexdigest(self):
+        return self._digest.hexdigest()
+
+    def close(self):
+        self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def open_member(zip_ref: zipfile.ZipFile, entry: Dict):
+    """Opens a ``scan_archive`` entry, checked against its manifest hash when it has one."""
+    src = zip_ref.open(entry['info'])
+    if 'hash' in entry:
+        return HashingReader(src, entry['hash'], entry['info'].filename)
+    return src
+
+
+def select_paths(tree: Dict[str, Dict], paths) -> Dict[str, Dict]:
+    """The entries of ``tree`` named by ``paths``: archive names or folders (``remote/cfg``)."""
+    prefixes = [path.replace("\\", "/").strip("/") for path in paths]
+    return {name: entry for name, entry in tree.items()
+            if any(name == prefix or name.startswith(prefix + "/") for prefix in prefixes)}
+
+
+def _method_available(method) -> bool:
+    if method == zipfile.ZIP_BZIP2:
+        return bz2 is not None
+    if method == zipfile.ZIP_LZMA:
+        return lzma is not None
+    return method in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED)
+
+
+def compression_settings(profile) -> Tuple[int, Optional[int]]:
+    """The ``(method, level)`` of an export profile from ``COMPRESSION_PROFILES``.
+
+    Raises ValueError for an unknown profile or one this Python cannot write.
+    """
+    if profile not in COMPRESSION_PROFILES:
+        raise ValueError(f"Unknown compression profile: {profile} "
+                         f"(choose from {', '.join(COMPRESSION_PROFILES)})")
+    method, level = COMPRESSION_PROFILES[profile]
+    if not _method_available(method):
+        raise ValueError(f"Compression profile {profile} is not supported by this Python build")
+    return method, level
+
+
+def set_compression(info: zipfile.ZipInfo, method, level):
+    """Sets a member's method and level; ``ZipFile.open(info, 'w')`` takes both from the info."""
+    info.compress_type = method
+    if hasattr(zipfile.ZipInfo, 'compress_level'):  # Python 3.13+
+        info.compress_level = level
+    else:
+        info._compresslevel = level
+
+
+def check_archive_compression(infos):
+    """Raises ValueError if a cfg member among ``infos`` uses a compression method this Python cannot read.
+
+    Checked before anything is written, so an unreadable archive fails the
+    import up front instead of part way through.
+    """
+    for info in infos:
+        if split_archive_name(info.filename) and not _method_available(info.compress_type):
+            method = ZIP_METHOD_NAMES.get(info.compress_type, info.compress_type)
+            raise ValueError(f"The archive uses an unsupported compression method ({method})")
+
+
+def entries_match(source_entry, target_entry) -> bool:
+    """True if the target file already holds the source entry's content.
+
+    Size and mtime decide in the common case; equal sizes with different
+    mtimes fall back to comparing content (CRC32 for archive members, a
+    BLAKE2 hash for files and snapshot entries). Imports stamp files with the source mtime, so a
+    target that was written from this source matches exactly.
+    """
+    if source_entry['size'] != target_entry['size']:
+        return False
+    if abs(source_entry['mtime'] - target_entry['mtime']) < 0.001:
+        return True
+    if 'crc' in source_entry:
+        return file_crc32(target_entry['path']) == source_entry['crc']
+    if 'hash' in source_entry:
+        return file_hash(target_entry['path']) == source_entry['hash']
+    return file_hash(source_entry['path']) == file_hash(target_entry['path'])
+
+
+def file_crc32(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFSIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_BUFSIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def copy_stream(src, dst, task: Optional[TaskControl] = None) -> int:
+    """Copies ``src`` to ``dst`` in ``COPY_BUFSIZE`` chunks, reporting bytes to ``task``.
+
+    Returns the number of bytes copied.
+    """
+    copied = 0
+    for chunk in iter(lambda: src.read(COPY_BUFSIZE), b""):
+        dst.write(chunk)
+        copied += len(chunk)
+        if task:
+            task.advance(nbytes=len(chunk))
+    return copied
+
+
+def compress_member(path, method, level, task: Optional[TaskControl] = None) -> Tuple[List[bytes], int, int, str]:
+    """Reads and compresses one file in memory; returns ``(chunks, crc, size, hash)``.
+
+    Uses zipfile's own compressor for ``method``, so the output is exactly
+    what ``ZipFile.open(info, 'w')`` would have written.
+    """
+    compressor = zipfile._get_compressor(method, level)
+    digest = hashlib.blake2b(digest_size=HASH_SIZE)
+    chunks, crc, size = [], 0, 0
+    with span("zip.compress", path=path), open(path, 'rb') as src:
+        for chunk in iter(lambda: src.read(COPY_BUFSIZE), b""):
+            if task:
+                task.check()
+            crc = zlib.crc32(chunk, crc)
+            digest.update(chunk)
+            size += len(chunk)
+            chunks.append(compressor.compress(chunk) if compressor else chunk)
+    if compressor:
+        chunks.append(compressor.flush())
+    return chunks, crc, size, digest.hexdigest()
+
+
+def parallel_zip_supported(zipf: zipfile.ZipFile) -> bool:
+    """Whether this Python's zipfile has the internals ``compress_member`` and ``append_compressed_member`` use.
+
+    They are private, so a Python release may change them; without them
+    ``write_archive_members`` writes every member serially.
+    """
+    return hasattr(zipfile, '_get_compressor') and all(
+        hasattr(zipf, name) for name in ('_lock', '_writecheck', '_didModify', 'start_dir', 'fp', 'filelist',
+                                         'NameToInfo'))
+
+
+def append_compressed_member(zipf: zipfile.ZipFile, info: zipfile.ZipInfo, chunks, crc, size):
+    """Appends a member compressed by ``compress_member`` to an archive open for writing.
+
+    Writes the local header and data at the end of the archive and
+    registers the member for the central directory, like ``ZipFile.open``
+    does for a streamed member.
+    """
+    info.file_size = size
+    info.CRC = crc
+    info.compress_size = sum(map(len, chunks))
+    info.flag_bits = 0x02 if info.compress_type == zipfile.ZIP_LZMA else 0  # LZMA end-of-stream marker
+    with zipf._lock:
+        zipf._writecheck(info)
+        zipf._didModify = True
+        info.header_offset = zipf.fp.tell()
+        zipf.fp.write(info.FileHeader())
+        for chunk in chunks:
+            zipf.fp.write(chunk)
+        zipf.filelist.append(info)
+        zipf.NameToInfo[info.filename] = info
+        zipf.start_dir = zipf.fp.tell()
+
+
+def write_archive_members(zipf: zipfile.ZipFile, members: List[Tuple[zipfile.ZipInfo, str]], method, level,
+                          task: Optional[TaskControl] = None, workers=EXPORT_WORKERS) -> Dict[str, str]:
+    """Writes ``(info, path)`` members to ``zipf`` in list order; returns member name -> content hash.
+
+    Members are compressed on up to ``workers`` threads into memory while
+    the calling thread appends the finished ones in order, so the archive
+    is the same as a serial write. At most ``2 * workers`` members are
+    held in memory; stored members and files over
+    ``PARALLEL_MEMBER_LIMIT`` are streamed by the calling thread. Progress
+    is reported to ``task`` from the calling thread only. Without
+    ``parallel_zip_supported`` every member is streamed.
+    """
+    parallel = (method != zipfile.ZIP_STORED and workers > 1 and len(members) > 1
+                and parallel_zip_supported(zipf))
+    pool = ThreadPoolExecutor(workers, thread_name_prefix="cbd2-compress") if parallel else None
+    pending = deque()
+    remaining = iter(members)
+    hashes = {}
+
+    def fill():
+        while len(pending) < 2 * workers:
+            member = next(remaining, None)
+            if member is None:
+                return
+            info, path = member
+            set_compression(info, method, level)
+            future = None
+            if pool and info.file_size <= PARALLEL_MEMBER_LIMIT:
+                future = pool.submit(compress_member, path, method, level, task)
+            pending.append((info, path, future))
+
+    try:
+        fill()
+        while pending:
+            info, path, future = pending.popleft()
+            if future is None:
+                with span("zip.write", name=info.filename), HashingReader(open(path, 'rb')) as src, \
+                        zipf.open(info, 'w') as dst:
+                    copy_stream(src, dst, task)
+                hashes[info.filename] = src.hexdigest()
+            else:
+                chunks, crc, size, hashes[info.filename] = future.result()
+                with span("zip.write", name=info.filename):
+                    append_compressed_member(zipf, info, chunks, crc, size)
+                if task:
+                    task.advance(nbytes=size)
+            if task:
+                task.advance(files=1)
+            fill()
+    finally:
+        if pool:
+            for _, _, future in pending:  # shutdown(cancel_futures=True) needs Python 3.9
+                if future:
+                    future.cancel()
+            pool.shutdown(wait=True)
+    return hashes
+
+
+def write_file_atomic(src, dst_path, mtime=None, task: Optional[TaskControl] = None, fsync=False):
+    """Streams ``src`` into ``dst_path`` via a temporary file and a rename.
+
+    With ``fsync`` the data is flushed to disk before the rename. Returns
+    the number of bytes written.
+    """
+    if os.path.isdir(dst_path):
+        shutil.rmtree(dst_path)
+    os.makedirs(os.path.dirname(dst_path), exist_ok=True)
+    tmp_path = dst_path + ".cbd2tmp"
+    try:
+        with span("file.write", path=dst_path), open(tmp_path, 'wb') as dst:
+            written = copy_stream(src, dst, task)
+            if fsync:
+                dst.flush()
+                os.fsync(dst.fileno())
+        if mtime is not None:
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+
+def remove_empty_dirs(directory):
+    """Removes empty sub-folders of ``directory`` (but not ``directory`` itself)."""
+    for root, dirs, _ in os.walk(directory, topdown=False):
+        for d in dirs:
+            path = os.path.join(root, d)
+            if not os.listdir(path):
+                os.rmdir(path)
+
+
+def format_stats(stats) -> str:
+    if not stats:
+        return ""
+    return (f": {stats['added']} added, {stats['replaced']} replaced, {stats['deleted']} deleted, "
+            f"{stats['unchanged']} unchanged ({stats['bytes_written']} bytes written)")
+
+
+def fsync_file(path):
+    with open(path, 'r+b') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_dir(path):
+    """Flushes a folder's entries to disk; a no-op on Windows, where folders cannot be opened."""
+    if os.name == 'nt':
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def iter_config_files(account_path):
+    """Yields ``(archive name, file path)`` for every file under the account's cfg folders.
+
+    Archive names always use ``/`` (``local/cfg/video.txt``), matching the
+    layout of .cbd2 archives.
+    """
+    for cfg_dir in CFG_DIRS:
+        root_dir = os.path.join(account_path, cfg_dir)
+        if not os.path.isdir(root_dir):
+            continue
+        for root, dirs, files in os.walk(root_dir):
+            dirs.sort()
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                yield os.path.relpath(file_path, account_path).replace(os.sep, "/"), file_path
+
+
+def make_metadata(personaname, account_id) -> Dict:
+    return {
+        "exported_by": personaname,
+        "account_id": account_id,
+        "export_date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "exporter_version": EXPORTER_VERSION
+    }
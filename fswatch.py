@@ -0,0 +1,250 @@
+"""Watches the Steam userdata folder for account changes.
+
+Only the handful of paths account discovery depends on are watched: the
+account folders themselves, ``config/localconfig.vdf`` and the Dota 2 cfg
+folders of every account. On Linux this uses inotify (through ctypes, no
+extra dependency); elsewhere, or if inotify is unavailable, those paths are
+stat-polled. Bursts of events (Steam rewrites localconfig.vdf several times
+in a row) are debounced, and ``on_change(steam_ids)`` is called from the
+watcher thread with the set of accounts whose files changed.
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from typing import Dict, Optional, Set
+
+from engine import CFG_DIRS, DOTA_APP_ID, print_log
+
+# inotify event masks (linux/inotify.h)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Temporary files written by imports; the rename that follows is the event that matters.
+IGNORED_SUFFIXES = (".cbd2tmp", ".tmp")
+
+
+class UserdataWatcher:
+    """Calls ``on_change(steam_ids)`` when accounts under ``userdata_path`` change.
+
+    ``debounce`` is the quiet time (seconds) to wait after the last event
+    before reporting, ``max_delay`` caps how long a steady stream of events
+    can postpone a report, and ``poll_interval`` is the stat-polling period
+    used when inotify is not available.
+    """
+
+    def __init__(self, userdata_path, on_change, debounce=0.5, max_delay=3.0, poll_interval=2.0, log=None,
+                 use_inotify=True):
+        self.userdata = os.path.abspath(userdata_path)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.log = log or print_log
+        self.use_inotify = use_inotify
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Set[str] = set()
+        self._first_event = None
+        self._last_event = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="cbd2-fswatch")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def _run(self):
+        inotify = None
+        if self.use_inotify and sys.platform.startswith("linux"):
+            try:
+                inotify = _Inotify()
+            except OSError as e:
+                self.log(f"inotify unavailable, polling userdata instead: {e}", console_only=True)
+        try:
+            if inotify:
+                self._run_inotify(inotify)
+            else:
+                self._run_polling()
+        except Exception as e:
+            self.log(f"Userdata watcher stopped: {e}", is_error=True, console_only=True)
+        finally:
+            if inotify:
+                inotify.close()
+
+    # --- debouncing ---
+    def _changed(self, steam_id):
+        now = time.monotonic()
+        if not self._pending:
+            self._first_event = now
+        self._pending.add(steam_id)
+        self._last_event = now
+
+    def _flush_due(self) -> Optional[float]:
+        """Reports pending changes if they are due; returns seconds until the next report otherwise."""
+        if not self._pending:
+            return None
+        now = time.monotonic()
+        due = min(self._last_event + self.debounce, self._first_event + self.max_delay)
+        if now < due:
+            return due - now
+        changed, self._pending = self._pending, set()
+        try:
+            self.on_change(changed)
+        except Exception as e:
+            self.log(f"Error handling userdata change: {e}", is_error=True, console_only=True)
+        return None
+
+    # --- inotify ---
+    def _run_inotify(self, inotify):
+        # wd -> (steam id or None for the userdata root, names of interest or None for all)
+        watches: Dict[int, tuple] = {}
+
+        def watch(path, steam_id, names):
+            try:
+                wd = inotify.add_watch(path, WATCH_MASK)
+            except OSError:
+                return  # does not exist (yet); its parent's watch reports when it appears
+            watches[wd] = (steam_id, names)
+
+        def watch_account(steam_id):
+            account_folder = os.path.join(self.userdata, steam_id)
+            dota_path = os.path.join(account_folder, DOTA_APP_ID)
+            watch(account_folder, steam_id, {"config", DOTA_APP_ID})
+            watch(os.path.join(account_folder, "config"), steam_id, {"localconfig.vdf"})
+            watch(dota_path, steam_id, {cfg_dir.split(os.sep)[0] for cfg_dir in CFG_DIRS})
+            for cfg_dir in CFG_DIRS:
+                parts = cfg_dir.split(os.sep)
+                if len(parts) > 1:
+                    watch(os.path.join(dota_path, parts[0]), steam_id, {parts[1]})
+                watch(os.path.join(dota_path, cfg_dir), steam_id, None)
+
+        watch(self.userdata, None, None)
+        for name in os.listdir(self.userdata):
+            if name.isdigit():
+                watch_account(name)
+
+        while not self._stop.is_set():
+            wait = self._flush_due()
+            ready, _, _ = select.select([inotify.fd], [], [], min(wait or 0.5, 0.5))
+            if not ready:
+                continue
+            for wd, mask, name in inotify.read_events():
+                if mask & IN_IGNORED:
+                    watches.pop(wd, None)
+                    continue
+                if wd not in watches:
+                    continue
+                steam_id, names = watches[wd]
+                if name.endswith(IGNORED_SUFFIXES):
+                    continue
+                if steam_id is None:
+                    if name.isdigit():
+                        self._changed(name)
+                        if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                            watch_account(name)
+                    continue
+                if names is not None and name and name not in names:
+                    continue
+                self._changed(steam_id)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # A folder on the watched path appeared: watch everything below it that now exists.
+                    watch_account(steam_id)
+
+    # --- polling ---
+    def _signature(self, steam_id):
+        account_folder = os.path.join(self.userdata, steam_id)
+        dota_path = os.path.join(account_folder, DOTA_APP_ID)
+        signature = []
+        for path in [os.path.join(account_folder, "config", "localconfig.vdf"), dota_path] + \
+                [os.path.join(dota_path, cfg_dir) for cfg_dir in CFG_DIRS]:
+            try:
+                st = os.stat(path)
+                signature.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                signature.append(None)
+        return signature
+
+    def _snapshot(self):
+        try:
+            names = os.listdir(self.userdata)
+        except OSError:
+            return {}
+        return {name: self._signature(name) for name in names if name.isdigit()}
+
+    def _run_polling(self):
+        previous = self._snapshot()
+        next_poll = time.monotonic() + self.poll_interval
+        while not self._stop.is_set():
+            wait = self._flush_due()
+            now = time.monotonic()
+            if now >= next_poll:
+                current = self._snapshot()
+                for steam_id in set(previous) | set(current):
+                    if previous.get(steam_id) != current.get(steam_id):
+                        self._changed(steam_id)
+                previous = current
+                next_poll = now + self.poll_interval
+                continue
+            self._stop.wait(min(wait or next_poll - now, next_poll - now))
+
+
+class _Inotify:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            if e.errno == errno.EINTR:
+                return
+            raise
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            yield wd, mask, name
+
+    def close(self):
+        os.close(self.fd)
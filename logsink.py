@@ -0,0 +1,57 @@
+"""Thread-safe log buffer for the GUI console window.
+
+Any thread may ``write`` a line; the Tk thread periodically ``drain``s
+the queued lines and inserts them into the window in one batch. At most
+``max_lines`` lines wait in the queue (older ones are dropped, as the
+window would trim them anyway), and every line can also be appended to a
+size-rotated log file.
+"""
+import os
+import logging
+import logging.handlers
+from collections import deque
+from typing import List, Optional, Tuple
+
+
+class LogSink:
+    def __init__(self, max_lines=5000, log_file: Optional[str] = None, max_bytes=1024 * 1024, backups=3):
+        self.max_lines = max_lines
+        # (line, is_error) waiting for the window; deque append/popleft are atomic, so no lock is needed.
+        self._pending = deque(maxlen=max_lines)
+        self._file_logger = None
+        if log_file:
+            directory = os.path.dirname(os.path.abspath(log_file))
+            os.makedirs(directory, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backups,
+                                                           encoding='utf-8')
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._file_logger = logging.getLogger(f"cbd2.logsink.{id(self)}")
+            self._file_logger.propagate = False
+            self._file_logger.setLevel(logging.INFO)
+            self._file_logger.addHandler(handler)
+
+    def write(self, line, is_error=False, to_window=True):
+        """Queues a line for the window (and writes it to the log file); safe from any thread.
+
+        Pass ``to_window=False`` while nothing drains the sink, so lines do not pile up.
+        """
+        if to_window:
+            self._pending.append((line, is_error))
+        if self._file_logger:
+            self._file_logger.info(line)
+
+    def drain(self, limit=1000) -> List[Tuple[str, bool]]:
+        """Takes up to ``limit`` (None: all) queued lines, oldest first."""
+        batch = []
+        try:
+            while limit is None or len(batch) < limit:
+                batch.append(self._pending.popleft())
+        except IndexError:
+            pass
+        return batch
+
+    def close(self):
+        if self._file_logger:
+            for handler in list(self._file_logger.handlers):
+                handler.close()
+                self._file_logger.removeHandler(handler)
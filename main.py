@@ -1,8 +1,7 @@
 import os
 import sys
+import queue
 import threading
-import zipfile
-import shutil
 import webbrowser
 from typing import Dict, List
 import tkinter as tk
@@ -10,11 +9,18 @@ from tkinter import filedialog, messagebox, ttk
 import customtkinter as ctk  # Using newer customtkinter version
 import requests
 from PIL import Image, ImageTk
-import json
 import time
 import traceback
-import psutil
-import vdf
+
+from avatars import AvatarCache
+from fswatch import UserdataWatcher
+from logsink import LogSink
+from procwatch import DotaProcessMonitor
+from thumbnails import ThumbnailCache
+from tracing import TRACER, span
+from engine import (
+    ConfigEngine, TaskCancelled, TaskControl, find_steam_userdata_path, format_size, has_config_files, make_metadata
+)
 
 # --- Settings ---
 THEME = {
@@ -32,17 +38,24 @@ THEME = {
     "button_secondary": "#2a2a2a"
 }
 
-# Steam paths
-STEAM_PATHS = [
-    "C:/Program Files (x86)/Steam/userdata",
-    "C:/Program Files/Steam/userdata",
-    "D:/Steam/userdata",
-    os.path.expanduser("~/Steam/userdata")
-]
-DOTA_APP_ID = "570"
-CONFIG_DIR = "cfg"
-LOCAL_CFG_DIR = os.path.join("local", "cfg")
-REMOTE_CFG_DIR = os.path.join("remote", "cfg")
+# Account loading: bounded thread pools and per-task timeouts (seconds)
+ACCOUNT_PARSE_WORKERS = 4
+AVATAR_WORKERS = 8
+ACCOUNT_PARSE_TIMEOUT = 10
+AVATAR_TIMEOUT = 15
+
+# Worker threads hand UI work to the Tk thread through a queue drained this often (ms),
+# spending at most this long (s) per drain so bursts of updates cannot stall the window
+UI_QUEUE_INTERVAL_MS = 30
+UI_QUEUE_BUDGET = 0.05
+
+# Console log window: lines kept, how often queued lines are flushed into it (ms), lines per flush
+LOG_MAX_LINES = 5000
+LOG_FLUSH_INTERVAL_MS = 100
+LOG_FLUSH_BATCH = 1000
+
+# Import review screen: file operations listed before the rest is summarised
+PLAN_MAX_LINES = 500
 
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("dark-blue")
@@ -75,6 +88,22 @@ LANGUAGES = {
         "empty_config_dir": "Config directory empty",
         "user_not_found": "User info not found",
         "dota_config_not_found": "Dota 2 config not found",
+        "search": "Search by name or ID",
+        "importing": "Importing...",
+        "exporting": "Exporting...",
+        "cancel": "Cancel",
+        "cancelled": "Cancelled, nothing was changed",
+        "task_running": "Another operation on this account is still running",
+        "progress": "{files_done}/{files_total} files, {mb_done:.1f}/{mb_total:.1f} MB",
+        "review_import": "Review import",
+        "plan_summary": "{create} new, {replace} changed, {delete} removed, {unchanged} unchanged",
+        "plan_size": "{to_write} to write, {free} free",
+        "plan_more": "... and {count} more",
+        "plan_up_to_date": "Already up to date, nothing to import",
+        "plan_no_space": "Not enough free disk space",
+        "undo_import": "Undo last import",
+        "undoing": "Undoing import...",
+        "import_undone": "Import undone",
     },
     "RU": {
         "loading": "Загрузка...",
@@ -103,36 +132,26 @@ LANGUAGES = {
         "empty_config_dir": "Папка пуста",
         "user_not_found": "Инфо не найдено",
         "dota_config_not_found": "Конфиг не найден",
+        "search": "Поиск по имени или ID",
+        "importing": "Импорт...",
+        "exporting": "Экспорт...",
+        "cancel": "Отмена",
+        "cancelled": "Отменено, ничего не изменено",
+        "task_running": "Другая операция с этим аккаунтом ещё выполняется",
+        "progress": "{files_done}/{files_total} файлов, {mb_done:.1f}/{mb_total:.1f} МБ",
+        "review_import": "Проверка импорта",
+        "plan_summary": "{create} новых, {replace} изменено, {delete} удалено, {unchanged} без изменений",
+        "plan_size": "Будет записано {to_write}, свободно {free}",
+        "plan_more": "... и ещё {count}",
+        "plan_up_to_date": "Уже актуально, импортировать нечего",
+        "plan_no_space": "Недостаточно места на диске",
+        "undo_import": "Отменить последний импорт",
+        "undoing": "Отмена импорта...",
+        "import_undone": "Импорт отменён",
     },
 }
 
 
-def kill_dota2(user_name=None, min_memory_mb=None):
-    time.sleep(1)
-    killed_pids = []
-    for proc in psutil.process_iter(['pid', 'name', 'username', 'memory_full_info']):
-        try:
-            if proc.info['name'] and proc.info['name'].lower() == "dota2.exe":
-                if user_name and proc.info['username'] != user_name:
-                    continue
-
-                if min_memory_mb is not None:
-                    memory_mb = proc.info['memory_full_info'].rss / (1024 * 1024)
-                    if memory_mb < min_memory_mb:
-                        continue
-
-                proc.kill()
-                killed_pids.append(proc.info['pid'])
-                print(f"dota2.exe (PID: {proc.info['pid']}) killed.")
-
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-        except Exception as e:
-            print(f"Error processing: {e}")
-
-    return killed_pids
-
-
 # --- Utilities ---
 def resource_path(relative_path):
     if hasattr(sys, "_MEIPASS"):
@@ -140,6 +159,16 @@ def resource_path(relative_path):
     return os.path.join(os.getcwd(), relative_path)
 
 
+def argv_value(name):
+    """The value given as ``name VALUE`` or ``name=VALUE`` on the command line, if any."""
+    for i, arg in enumerate(sys.argv):
+        if arg == name and i + 1 < len(sys.argv):
+            return sys.argv[i + 1]
+        if arg.startswith(name + "="):
+            return arg[len(name) + 1:]
+    return None
+
+
 def check_internet():
     try:
         requests.get("http://google.com", timeout=3)
@@ -148,23 +177,6 @@ def check_internet():
         return False
 
 
-def find_steam_userdata_path():
-    for path in STEAM_PATHS:
-        if os.path.exists(path) and os.path.isdir(path):
-            return path
-    return None
-
-
-# --- Animations ---
-def animate_progress_bar(progress_bar):
-    current_value = progress_bar.get()
-    if current_value < 1:
-        progress_bar.set(current_value + 0.01)
-    else:
-        progress_bar.set(0)
-    progress_bar.after(50, lambda: animate_progress_bar(progress_bar))
-
-
 # --- Custom Widgets ---
 class AnimatedButton(ctk.CTkButton):
     def __init__(self, master, **kwargs):
@@ -208,8 +220,47 @@ class SecondaryButton(AnimatedButton):
         self.configure(fg_color="#3A5875", border_width=1)
 
 
+class AvatarView(ctk.CTkFrame):
+    """Round avatar slot: the account's thumbnail, or its initial if there is none.
+
+    ``set_account`` can be called again to show a different account.
+    """
+
+    def __init__(self, master, thumbnails=None, fallback_color=THEME["accent"], **kwargs):
+        super().__init__(master, width=50, height=50, corner_radius=25, fg_color=fallback_color, **kwargs)
+        self.pack_propagate(False)
+        self.thumbnails = thumbnails
+        self.fallback_color = fallback_color
+
+        self.image_label = tk.Label(self, bg=THEME["bg_primary"], borderwidth=0, highlightthickness=0)
+        self.initial_label = ctk.CTkLabel(self, text="", font=("Inter", 18, "bold"),
+                                          text_color=THEME["text_primary"])
+
+    def set_account(self, account: Dict):
+        photo_image = None
+        if account.get('avatar') and self.thumbnails:
+            try:
+                photo_image = self.thumbnails.photo(account.get('avatar_hash') or account['account_id'],
+                                                    account['avatar'])
+            except Exception as e:
+                print(f"Error loading avatar: {e}")
+
+        if photo_image:
+            # Создаём прозрачный фон для аватара вместо красного
+            self.configure(fg_color="transparent")
+            self.image_label.configure(image=photo_image)
+            self.image_label.image = photo_image  # Сохраняем ссылку
+            self.initial_label.place_forget()
+            self.image_label.place(relx=0.5, rely=0.5, anchor="center")
+        else:
+            self.configure(fg_color=self.fallback_color)
+            self.initial_label.configure(text=account['personaname'][0].upper() if account['personaname'] else "?")
+            self.image_label.place_forget()
+            self.initial_label.place(relx=0.5, rely=0.5, anchor="center")
+
+
 class AccountCard(ctk.CTkFrame):
-    def __init__(self, master, account: Dict, on_select, lang_code, **kwargs):
+    def __init__(self, master, account: Dict, on_select, lang_code, thumbnails=None, **kwargs):
         super().__init__(
             master,
             fg_color=THEME["card_bg"],
@@ -217,6 +268,8 @@ class AccountCard(ctk.CTkFrame):
             border_width=0,
             **kwargs
         )
+        self.on_select = on_select
+        self.account = None
 
         self.bind("<Enter>", lambda e: self.configure(border_width=1, border_color=THEME["accent"]))
         self.bind("<Leave>", lambda e: self.configure(border_width=0))
@@ -228,73 +281,27 @@ class AccountCard(ctk.CTkFrame):
         content.pack(fill="x")
 
         # Avatar display (with rounding)
-        avatar_frame = ctk.CTkFrame(content, width=50, height=50, corner_radius=25, fg_color=THEME["accent"])
-        avatar_frame.pack(side="left", padx=(0, 16))
-        avatar_frame.pack_propagate(False)
-
-        if account.get('avatar'):
-            try:
-                # Создаём прозрачный фон для аватара вместо красного
-                avatar_frame.configure(fg_color="transparent")
-
-                # Загружаем и изменяем размер аватара
-                avatar_image = Image.open(account['avatar']).resize((48, 48))
-
-                # Преобразуем в RGBA если необходимо
-                if avatar_image.mode != 'RGBA':
-                    avatar_image = avatar_image.convert('RGBA')
-
-                # Создаём круглую маску
-                mask = Image.new('L', (48, 48), 0)
-                draw = ImageDraw.Draw(mask)
-                draw.ellipse((0, 0, 48, 48), fill=255)
-
-                # Создаём новое изображение с прозрачным фоном
-                circular_image = Image.new('RGBA', (48, 48), (0, 0, 0, 0))
-                # Применяем маску к аватару
-                circular_image.paste(avatar_image, (0, 0), mask)
-
-                photo_image = ImageTk.PhotoImage(circular_image)
-                # Создаём метку с прозрачным фоном
-                avatar_label = tk.Label(avatar_frame, image=photo_image, bg=THEME["bg_primary"],
-                                        borderwidth=0, highlightthickness=0)
-                avatar_label.image = photo_image  # Сохраняем ссылку
-                avatar_label.place(relx=0.5, rely=0.5, anchor="center")
-            except Exception as e:
-                print(f"Error loading avatar: {e}")
-                # Запасной вариант для инициалов
-                initial_label = ctk.CTkLabel(avatar_frame,
-                                             text=account['personaname'][0].upper() if account['personaname'] else "?",
-                                             font=("Inter", 18, "bold"), text_color=THEME["text_primary"])
-                initial_label.place(relx=0.5, rely=0.5, anchor="center")
-
-        else:
-            initial_label = ctk.CTkLabel(
-                avatar_frame,
-                text=account['personaname'][0].upper() if account['personaname'] else "?",
-                font=("Inter", 18, "bold"),
-                text_color=THEME["text_primary"],
-            )
-            initial_label.place(relx=0.5, rely=0.5, anchor="center")
+        self.avatar_view = AvatarView(content, thumbnails=thumbnails)
+        self.avatar_view.pack(side="left", padx=(0, 16))
 
         info_frame = ctk.CTkFrame(content, fg_color="transparent")
         info_frame.pack(side="left", fill="both", expand=True)
 
-        name_label = ctk.CTkLabel(
+        self.name_label = ctk.CTkLabel(
             info_frame,
-            text=account['personaname'],
+            text="",
             font=("Inter", 14, "bold"),
             text_color=THEME["text_primary"]
         )
-        name_label.pack(anchor="w")
+        self.name_label.pack(anchor="w")
 
-        id_label = ctk.CTkLabel(
+        self.id_label = ctk.CTkLabel(
             info_frame,
-            text=f"ID: {account['account_id']}",
+            text="",
             font=("Inter", 11),
             text_color=THEME["text_secondary"]
         )
-        id_label.pack(anchor="w")
+        self.id_label.pack(anchor="w")
 
         select_btn = AnimatedButton(
             content,
@@ -302,14 +309,283 @@ class AccountCard(ctk.CTkFrame):
             fg_color=THEME["accent"],
             hover_color=THEME["hover_accent"],
             width=100,
-            command=lambda: on_select(account)
+            command=lambda: self.on_select(self.account)
         )
         select_btn.pack(side="right", padx=(8, 0))
 
+        self.set_account(account)
+
+    def set_account(self, account: Dict):
+        """Shows another account in this card (used when rows are recycled)."""
+        self.account = account
+        self.avatar_view.set_account(account)
+        self.name_label.configure(text=account['personaname'])
+        self.id_label.configure(text=f"ID: {account['account_id']}")
+
+
+class VirtualAccountList(ctk.CTkFrame):
+    """Scrollable, filterable account list that only builds cards for visible rows.
+
+    Rows have a fixed height; scrolling moves and refills a small pool of
+    ``AccountCard`` widgets instead of creating one per account. The search
+    box filters by persona name or account id over an in-memory index, and
+    narrows the previous result while the query is only being extended.
+    """
+
+    ROW_HEIGHT = 92
+    ROW_GAP = 10
+    FILTER_DELAY_MS = 120
+
+    def __init__(self, master, accounts: List[Dict], on_select, lang_code, thumbnails=None, exclude=None,
+                 loading=False, **kwargs):
+        kwargs.setdefault("fg_color", "transparent")
+        super().__init__(master, **kwargs)
+        self.on_select = on_select
+        self.lang_code = lang_code
+        self.thumbnails = thumbnails
+        self.exclude = exclude  # account id never shown (the account being imported into)
+        self.loading = loading
+
+        self._index = []      # (search key, account) for every account
+        self._filtered = []   # the entries currently shown
+        self._last_query = ""
+        self._filter_job = None
+        self._rows = []       # [card, canvas item, shown index]
+        self._width = 1
+        self._height = 1
+
+        self.search_entry = ctk.CTkEntry(
+            self,
+            placeholder_text=LANGUAGES[lang_code]["search"],
+            fg_color=THEME["card_bg"],
+            border_color=THEME["border"],
+            text_color=THEME["text_primary"],
+            height=36
+        )
+        self.search_entry.pack(fill="x", pady=(0, 10))
+        self.search_entry.bind("<KeyRelease>", self._on_query_changed)
+
+        body = ctk.CTkFrame(self, fg_color="transparent")
+        body.pack(fill="both", expand=True)
+
+        self.scrollbar = ctk.CTkScrollbar(body, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.canvas = tk.Canvas(body, bg=THEME["bg_secondary"], highlightthickness=0, borderwidth=0,
+                                yscrollincrement=self.ROW_HEIGHT // 4)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.configure(yscrollcommand=self._on_canvas_scrolled)
+        self.canvas.bind("<Configure>", self._on_canvas_configure)
+        self._bind_wheel(self.canvas)
+
+        self._empty_text = self.canvas.create_text(
+            0, 40, text="", fill=THEME["text_primary"], font=("Inter", 14), state="hidden"
+        )
+        self.set_loading(loading)
+
+        self.set_accounts(accounts)
+
+    # --- data ---
+    @staticmethod
+    def _search_key(account):
+        return f"{account['personaname'].lower()}\n{account['account_id']}"
+
+    def set_accounts(self, accounts: List[Dict]):
+        """Replaces the list contents, keeping the current query and scroll position."""
+        self._index = [(self._search_key(account), account) for account in accounts
+                       if account['account_id'] != self.exclude]
+        self._last_query = None
+        self._apply_filter(keep_position=True)
+
+    def add_account(self, account: Dict):
+        """Appends one account (as accounts are discovered) without rebuilding the list."""
+        if account['account_id'] == self.exclude:
+            return
+        entry = (self._search_key(account), account)
+        self._index.append(entry)
+        if self._filtered is not self._index and self._last_query and self._last_query in entry[0]:
+            self._filtered.append(entry)
+        self._update_scrollregion()
+        self.canvas.itemconfigure(self._empty_text, state="hidden" if self._filtered else "normal")
+        self._refresh()
+
+    def set_loading(self, loading):
+        """While loading, an empty list says so instead of "no accounts found"."""
+        self.loading = loading
+        text = LANGUAGES[self.lang_code]["loading" if loading else "no_accounts_found"]
+        self.canvas.itemconfigure(self._empty_text, text=text)
+
+    def update_account(self, account: Dict):
+        """Redraws the visible row showing this account, if any."""
+        for entries in (self._index, self._filtered) if self._filtered is not self._index else (self._index,):
+            for entry_index, (key, entry) in enumerate(entries):
+                if entry['account_id'] == account['account_id']:
+                    entries[entry_index] = (self._search_key(account), account)
+        for row in self._rows:
+            card = row[0]
+            if card.account and card.account['account_id'] == account['account_id']:
+                card.set_account(account)
+
+    def _on_query_changed(self, *_):
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(self.FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self, keep_position=False):
+        self._filter_job = None
+        query = self.search_entry.get().strip().lower()
+        if not query:
+            filtered = self._index
+        elif self._last_query and query.startswith(self._last_query):
+            filtered = [entry for entry in self._filtered if query in entry[0]]
+        else:
+            filtered = [entry for entry in self._index if query in entry[0]]
+        self._filtered = filtered
+        self._last_query = query
+
+        for row in self._rows:
+            row[2] = None  # force every visible row to be refilled
+        self._update_scrollregion()
+        if not keep_position:
+            self.canvas.yview_moveto(0)
+        self.canvas.itemconfigure(self._empty_text, state="hidden" if filtered else "normal")
+        self._refresh()
+
+    # --- layout ---
+    def _update_scrollregion(self):
+        total = max(len(self._filtered) * self.ROW_HEIGHT, self._height)
+        self.canvas.configure(scrollregion=(0, 0, self._width, total))
+
+    def _on_canvas_configure(self, event):
+        self._width, self._height = max(event.width, 1), max(event.height, 1)
+        for card, item, _ in self._rows:
+            self.canvas.itemconfigure(item, width=self._width)
+        self.canvas.coords(self._empty_text, self._width // 2, 40)
+        self._update_scrollregion()
+        self._refresh()
+
+    def _on_scrollbar(self, *args):
+        self.canvas.yview(*args)
+
+    def _on_canvas_scrolled(self, first, last):
+        self.scrollbar.set(first, last)
+        self._refresh()
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        widget.bind("<Button-4>", self._on_mousewheel, add="+")
+        widget.bind("<Button-5>", self._on_mousewheel, add="+")
+        for child in widget.winfo_children():
+            self._bind_wheel(child)
+
+    def _on_mousewheel(self, event):
+        if getattr(event, "num", None) == 4:
+            step = -1
+        elif getattr(event, "num", None) == 5:
+            step = 1
+        elif sys.platform == "darwin":
+            step = -event.delta
+        else:
+            step = -int(event.delta / 120) or (-1 if event.delta > 0 else 1)
+        self.canvas.yview_scroll(step, "units")
+
+    def _new_row(self):
+        card = AccountCard(self.canvas, account=self._filtered[0][1], on_select=self.on_select,
+                           lang_code=self.lang_code, thumbnails=self.thumbnails)
+        item = self.canvas.create_window(0, -2 * self.ROW_HEIGHT, anchor="nw", window=card,
+                                         width=self._width, height=self.ROW_HEIGHT - self.ROW_GAP)
+        self._bind_wheel(card)
+        self._rows.append([card, item, None])
+
+    def _refresh(self):
+        if not self._filtered:
+            for row in self._rows:
+                self.canvas.coords(row[1], 0, -2 * self.ROW_HEIGHT)
+                row[2] = None
+            return
+
+        top = self.canvas.canvasy(0)
+        first = max(0, int(top // self.ROW_HEIGHT))
+        last = min(len(self._filtered), int((top + self._height) // self.ROW_HEIGHT) + 1)
+        needed = min(len(self._filtered), int(self._height // self.ROW_HEIGHT) + 2)
+        while len(self._rows) < needed:
+            self._new_row()
+
+        pool = len(self._rows)
+        shown = set()
+        for index in range(first, last):
+            row = self._rows[index % pool]
+            shown.add(index % pool)
+            if row[2] != index:
+                row[0].set_account(self._filtered[index][1])
+                self.canvas.coords(row[1], 0, index * self.ROW_HEIGHT)
+                row[2] = index
+        for slot, row in enumerate(self._rows):
+            if slot not in shown and row[2] is not None:
+                self.canvas.coords(row[1], 0, -2 * self.ROW_HEIGHT)
+                row[2] = None
+
+
+class TaskRunner:
+    """Runs mutating operations on worker threads, at most one per key (the target account).
+
+    ``func(task)`` runs on a new thread with a ``TaskControl`` it uses to
+    report progress and notice cancellation. ``on_progress(progress)``,
+    ``on_done(result)`` and ``on_error(exception)`` are delivered on the Tk
+    thread through ``call_in_ui``.
+    """
+
+    def __init__(self, call_in_ui):
+        self.call_in_ui = call_in_ui
+        self._active = {}  # key -> (TaskControl, thread)
+        self._lock = threading.Lock()
+
+    def is_running(self, key):
+        with self._lock:
+            return key in self._active
+
+    def start(self, key, func, on_done=None, on_error=None, on_progress=None):
+        """Starts ``func`` unless a task for ``key`` is still running; returns its TaskControl or None."""
+        with self._lock:
+            if key in self._active:
+                return None
+            task = TaskControl(on_progress=(lambda progress: self.call_in_ui(on_progress, progress))
+                               if on_progress else None)
+
+            def run():
+                try:
+                    result = func(task)
+                except BaseException as e:
+                    self.call_in_ui(self._finish, key, on_error, e)
+                else:
+                    self.call_in_ui(self._finish, key, on_done, result)
+
+            thread = threading.Thread(target=run, daemon=True, name=f"cbd2-task-{key}")
+            self._active[key] = (task, thread)
+        thread.start()
+        return task
+
+    def _finish(self, key, callback, value):
+        with self._lock:
+            self._active.pop(key, None)
+        if callback:
+            callback(value)
+
+    def cancel_all(self, timeout=5.0):
+        """Cancels every running task and waits (up to ``timeout`` seconds) for their rollback."""
+        with self._lock:
+            active = list(self._active.values())
+        for task, _ in active:
+            task.cancel()
+        deadline = time.monotonic() + timeout
+        for _, thread in active:
+            thread.join(max(0.0, deadline - time.monotonic()))
+
 
 # --- Main Application ---
 class ConfigBridgeApp(ctk.CTk):
     def __init__(self):
+        self.startup_span = TRACER.start("startup")
         super().__init__()
         self.title("ConfigBridge Dota 2")
         self.geometry("800x600")
@@ -320,9 +596,22 @@ class ConfigBridgeApp(ctk.CTk):
         self.accounts: List[Dict] = []
         self.current_lang = "RU"
         self.console_mode = "-console" in sys.argv
+        self.trace_path = argv_value("--trace")
+        self._ui_queue = queue.Queue()
+        self.log_sink = LogSink(max_lines=LOG_MAX_LINES, log_file=argv_value("--log-file"))
         self.log_window = None
+        self._log_window_open = False
         self.steam_userdata_path = find_steam_userdata_path()
+        self.engine = ConfigEngine(self.steam_userdata_path, log=self.log)
+        self.avatar_cache = AvatarCache(pool_size=AVATAR_WORKERS, log=self.log)
+        self.thumbnails = ThumbnailCache()
         self._popup_window = None  # Store the popup window
+        self.accounts_loading = bool(self.steam_userdata_path)
+        self.account_list = None  # the VirtualAccountList currently on screen, if any
+        self.show_startup_warnings = True
+        self.tasks = TaskRunner(self.call_in_ui)
+        self.dota = DotaProcessMonitor(log=self.log)
+        self.watcher = None  # started once the initial account load is done
 
         if self.console_mode:
             self.create_log_window()
@@ -349,23 +638,28 @@ class ConfigBridgeApp(ctk.CTk):
         )
         self.main_container.pack(fill="both", expand=True, padx=16, pady=16)
 
-        self.show_loading()
-        threading.Thread(target=self.load_data, daemon=True).start()
+        self.after(UI_QUEUE_INTERVAL_MS, self._drain_ui_queue)
+        self.finish_initialization()
+        threading.Thread(target=self.load_data, daemon=True, name="cbd2-load").start()
+        threading.Thread(target=self.check_connectivity, daemon=True, name="cbd2-connectivity").start()
 
-        self.warnings_label = ctk.CTkLabel(
-            self,
-            text="",
-            font=("Segoe UI", 20),
-            text_color=THEME["text_primary"],
-        )
+    def call_in_ui(self, func, *args):
+        """Runs ``func(*args)`` on the Tk thread; safe to call from any thread."""
+        self._ui_queue.put((func, args))
 
-        self.countdown_label = ctk.CTkLabel(
-            self,
-            text="",
-            font=("Segoe UI", 12),
-            text_color=THEME["text_secondary"]
-        )
-        self.countdown_label.place(x=10, y=self.winfo_screenheight() - 50)
+    def _drain_ui_queue(self):
+        deadline = time.monotonic() + UI_QUEUE_BUDGET
+        try:
+            while time.monotonic() < deadline:
+                func, args = self._ui_queue.get_nowait()
+                try:
+                    func(*args)
+                except Exception as e:
+                    self.log(f"UI update failed: {e}", is_error=True, console_only=True)
+                    self.log(traceback.format_exc(), is_error=True, console_only=True)
+        except queue.Empty:
+            pass
+        self.after(UI_QUEUE_INTERVAL_MS, self._drain_ui_queue)
 
     def create_log_window(self):
         self.log_window = tk.Toplevel(self)
@@ -377,69 +671,73 @@ class ConfigBridgeApp(ctk.CTk):
         self.log_text.pack(expand=True, fill="both", padx=10, pady=10)
 
         self.log_text.tag_configure("error", foreground=THEME["error"])
+        self._log_window_open = True
+        self.after(LOG_FLUSH_INTERVAL_MS, self._flush_log)
 
     def log(self, message, is_error=False, console_only=False):
-        timestamp = time.strftime("%H:%M:%S")
+        """Logs a message; safe to call from any thread.
+
+        Lines reach the console window in batches (see ``_flush_log``).
+        """
+        now = time.time()
+        timestamp = time.strftime("%H:%M:%S", time.localtime(now)) + f".{int(now % 1 * 1000):03d}"
         log_msg = f"[{timestamp}] {'Error' if is_error else 'Info'}: {message}"
 
+        self.log_sink.write(log_msg, is_error, to_window=self._log_window_open)
         if self.console_mode:
-            if self.log_window and self.log_window.winfo_exists():
-                self.log_text.insert(tk.END, log_msg + "\n", "error" if is_error else "")
-                self.log_text.see(tk.END)
-            else:
+            if not self._log_window_open:
                 print(log_msg)
         elif not console_only:
             print(log_msg)
             if is_error:  # Show error messages even when not console only
-                self.show_error_message(message)
-
-    def show_loading(self):
-        for widget in self.main_container.winfo_children():
-            widget.destroy()
-
-        loading_frame = ctk.CTkFrame(
-            self.main_container,
-            fg_color=THEME["bg_secondary"],
-            corner_radius=12
-        )
-        loading_frame.pack(expand=True, fill="both", padx=20, pady=20)
-
-        loading_label = ctk.CTkLabel(
-            loading_frame,
-            text=LANGUAGES[self.current_lang]["loading"],
-            font=("Segoe UI", 16, "bold"),
-            text_color=THEME["text_primary"]
-        )
-        loading_label.pack(expand=True)
-
-        progress_bar = ctk.CTkProgressBar(
-            loading_frame,
-            progress_color=THEME["progress_color"],
-            width=300
-        )
-        progress_bar.pack(expand=True)
-        animate_progress_bar(progress_bar)
+                self.call_in_ui(self.show_error_message, message)
+
+    def _flush_log(self):
+        if not self.log_window.winfo_exists():
+            # Window closed: print from now on, including whatever was still queued.
+            self._log_window_open = False
+            for line, _ in self.log_sink.drain(limit=None):
+                print(line)
+            return
+        batch = self.log_sink.drain(LOG_FLUSH_BATCH)
+        if batch:
+            # Consecutive lines with the same tag go in with one insert.
+            chunk, chunk_error = [], batch[0][1]
+            for line, is_error in batch + [(None, None)]:
+                if line is None or is_error != chunk_error:
+                    self.log_text.insert(tk.END, "".join(chunk), "error" if chunk_error else "")
+                    chunk, chunk_error = [], is_error
+                if line is not None:
+                    chunk.append(line + "\n")
+            excess = int(self.log_text.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0:
+                self.log_text.delete("1.0", f"{excess + 1}.0")
+            self.log_text.see(tk.END)
+        self.after(LOG_FLUSH_INTERVAL_MS, self._flush_log)
 
     def load_data(self):
-        try:
-            if not check_internet():
-                self.show_error_message(LANGUAGES[self.current_lang]["no_internet"])
-                self.log(LANGUAGES[self.current_lang]["no_internet"], is_error=True)
-
-            if not self.steam_userdata_path:
-                self.log("Steam userdata path not found", is_error=True)
-                self.after(0, lambda: self.show_error_message(LANGUAGES[self.current_lang]["steam_not_found"]))
-                self.after(1000, self.finish_initialization)
-                return
+        """Discovers accounts on a worker thread, streaming each one to the UI as it resolves."""
+        if not self.steam_userdata_path:
+            self.log("Steam userdata path not found", is_error=True, console_only=True)
+            self.call_in_ui(self.show_error_message, LANGUAGES[self.current_lang]["steam_not_found"])
+            return
 
-            self.load_accounts()
-            self.after(0, self.finish_initialization)
+        accounts = None
+        try:
+            accounts = self.load_accounts()
         except Exception as e:
             error_msg = f"Error loading data: {str(e)}"
-            self.log(error_msg, is_error=True)
+            self.log(error_msg, is_error=True, console_only=True)
             self.log(traceback.format_exc(), is_error=True, console_only=True)
-            self.after(0, lambda: self.show_error_message(error_msg))
-            self.after(1000, self.finish_initialization)
+            self.call_in_ui(self.show_error_message, error_msg)
+        finally:
+            self.call_in_ui(self.on_accounts_loaded, accounts)
+
+    def check_connectivity(self):
+        """Only needed for avatars, so it runs in the background and merely warns."""
+        if not check_internet():
+            self.log(LANGUAGES[self.current_lang]["no_internet"], is_error=True, console_only=True)
+            self.call_in_ui(self.show_error_message, LANGUAGES[self.current_lang]["no_internet"])
 
     def show_error_message(self, message):
         self.status_label.configure(
@@ -452,29 +750,8 @@ class ConfigBridgeApp(ctk.CTk):
         for widget in self.main_container.winfo_children():
             widget.destroy()
 
-        self.main_container.pack_forget()
         self.create_header()
-        self.show_warnings_with_countdown()
-
-    def show_warnings_with_countdown(self):
-        self.warnings_label.configure(
-            text=f"{LANGUAGES['EN']['warnings']}\n\n{LANGUAGES['RU']['warnings']}",
-            font=("Segoe UI", 14),
-            text_color=THEME["text_primary"]
-        )
-        self.warnings_label.place(relx=0.5, rely=0.5, anchor="center")
-        self.start_countdown(3)
-
-    def start_countdown(self, seconds):
-        if seconds > 0:
-            self.countdown_label.configure(text=f"{seconds}", text_color=THEME["text_primary"])
-            self.countdown_label.place(relx=1.0, rely=1.0, x=-10, y=-10, anchor="se")
-            self.after(1000, self.start_countdown, seconds - 1)
-        else:
-            self.warnings_label.place_forget()
-            self.countdown_label.place_forget()
-            self.main_container.pack(fill="both", expand=True, padx=16, pady=16)
-            self.create_main_ui()
+        self.create_main_ui()
 
     def create_header(self):
         header = ctk.CTkFrame(
@@ -622,23 +899,11 @@ class ConfigBridgeApp(ctk.CTk):
             self.create_main_ui()
 
     def create_main_ui(self):
-        kill_dota2()
-        if not self.accounts:
-            empty_frame = ctk.CTkFrame(
-                self.main_container,
-                fg_color=THEME["bg_secondary"],
-                corner_radius=16
-            )
-            empty_frame.pack(fill="both", expand=True)
+        with span("ui.main"):
+            self._create_main_ui()
 
-            empty_label = ctk.CTkLabel(
-                empty_frame,
-                text=LANGUAGES[self.current_lang]["no_accounts_found"],
-                font=("Inter", 16, "bold"),
-                text_color=THEME["text_primary"]
-            )
-            empty_label.pack(expand=True)
-            return
+    def _create_main_ui(self):
+        self.dota.close_async()
 
         accounts_frame = ctk.CTkFrame(
             self.main_container,
@@ -658,180 +923,143 @@ class ConfigBridgeApp(ctk.CTk):
         )
         title.pack(side="left")
 
-        self.scroll_frame = ctk.CTkScrollableFrame(
+        if self.show_startup_warnings:
+            warnings_label = ctk.CTkLabel(
+                accounts_frame,
+                text=LANGUAGES[self.current_lang]["warnings"],
+                font=("Inter", 11),
+                text_color=THEME["text_secondary"],
+                justify="left"
+            )
+            warnings_label.pack(anchor="w", padx=20, pady=(0, 10))
+
+        self.account_list = VirtualAccountList(
             accounts_frame,
-            fg_color="transparent",
-            corner_radius=0
+            accounts=self.accounts,
+            on_select=self.select_account,
+            lang_code=self.current_lang,
+            thumbnails=self.thumbnails,
+            loading=self.accounts_loading
         )
-        self.scroll_frame.pack(fill="both", expand=True, padx=20, pady=(0, 20))
-
-        for account in self.accounts:
-            account_card = AccountCard(
-                self.scroll_frame,
-                account=account,
-                on_select=self.select_account,
-                lang_code=self.current_lang
-            )
-            account_card.pack(fill="x", pady=(0, 10))
+        self.account_list.pack(fill="both", expand=True, padx=20, pady=(0, 20))
 
     def get_steam_account_info(self, steam_id, account_path):
-        vdf_path = os.path.join(account_path, "..", "config", "localconfig.vdf")
-        try:
-            with open(vdf_path, 'r', encoding='utf-8') as f:
-                config_data = vdf.load(f)
-
-            user_config = config_data.get('UserLocalConfigStore', {})
-            if not user_config:
-                self.log(f"UserLocalConfigStore not found in VDF for {steam_id}", is_error=True, console_only=True)
-                return {'personaname': f"User {steam_id}", 'avatar_url': None}
-
-            friends = user_config.get('friends', {})
-            account_info = friends.get(steam_id, {})
-
-            # Prefer 'PersonaName' at the top level of 'friends', then look inside the steam_id dict,
-            # then use the name history, and finally fall back to "User {steam_id}".
-            personaname = friends.get("PersonaName")  # Check for global PersonaName FIRST
-            if not personaname:
-                personaname = account_info.get('Name')  # Then check for 'Name' within the specific user data.
-
-            if not personaname:
-                # Fallback to name history if 'Name' is missing
-                if 'NameHistory' in account_info:
-                    name_history = account_info['NameHistory']
-                    # NameHistory might be a dict (keys are numbers as strings) or a list.  Handle both.
-                    if isinstance(name_history, dict):
-                        # Get the first name in history (usually the most recent).
-                        personaname = next(iter(name_history.values()), None)  # Get first value, or None
-                    elif isinstance(name_history, list):
-                        personaname = name_history[0] if name_history else None  # get first or None
-
-            if not personaname:
-                personaname = f"User {steam_id}"  # Fallback
-
-            avatar_hash = account_info.get('avatar', '')
-            avatar_url = f"https://avatars.cloudflare.steamstatic.com/{avatar_hash}_full.jpg" if avatar_hash else None
-            return {'personaname': personaname, 'avatar_url': avatar_url}
-
-        except FileNotFoundError:
-            self.log(f"File not found: {vdf_path} for {steam_id}", is_error=True, console_only=True)
-            return {'personaname': f"User {steam_id}", 'avatar_url': None}
-        except (KeyError, AttributeError) as e:
-            self.log(f"KeyError or AttributeError accessing VDF data for {steam_id}: {e}", is_error=True,
-                     console_only=True)
-            return {'personaname': f"User {steam_id}", 'avatar_url': None}
-        except Exception as e:
-            self.log(f"Error reading vdf for {steam_id}: {e}", is_error=True, console_only=True)
-            return {'personaname': f"User {steam_id}", 'avatar_url': None}
+        return self.engine.get_steam_account_info(steam_id, account_path)
 
     def get_account_folders(self):
-        account_folders = []
-        try:
-            if not self.steam_userdata_path or not os.path.exists(self.steam_userdata_path):
-                self.log(f"Steam userdata path not found: {self.steam_userdata_path}", is_error=True)
-                return []
-
-            for folder_name in os.listdir(self.steam_userdata_path):
-                if folder_name.isdigit():
-                    account_path = os.path.join(self.steam_userdata_path, folder_name)
-                    dota_config_path = os.path.join(account_path, DOTA_APP_ID)
-
-                    # Check for Dota 2 config directory AND if any config files exist
-                    if os.path.isdir(dota_config_path):
-                        config_files_exist = False
-                        for cfg_dir in [CONFIG_DIR, LOCAL_CFG_DIR, REMOTE_CFG_DIR]:
-                            full_cfg_path = os.path.join(dota_config_path, cfg_dir)
-                            if os.path.exists(full_cfg_path) and any(os.listdir(full_cfg_path)):
-                                config_files_exist = True
-                                break  # No need to check further if we found files
-
-                        if not config_files_exist:
-                            self.log(f"No config files found for {folder_name}. Skipping.", is_error=False)
-                            continue # Skip this account
-
-
-
-                        vdf_path = os.path.join(account_path, "config", "localconfig.vdf")
-                        if os.path.exists(vdf_path):
-                            try:
-                                with open(vdf_path, 'r', encoding='utf-8') as f:
-                                    config_data = vdf.load(f)
-                                    if "UserLocalConfigStore" in config_data and "friends" in config_data[
-                                        "UserLocalConfigStore"]:
-                                        account_folders.append((folder_name, dota_config_path))  # Use dota config path
-                                    else:
-                                        self.log(
-                                            f"User information not found in localconfig.vdf for {folder_name}. Skipping.",
-                                            is_error=False)
-                            except Exception as e:
-                                self.log(f"Error reading localconfig.vdf for {folder_name}: {e}. Skipping.",
-                                         is_error=True)
-                        else:
-                            self.log(f"localconfig.vdf not found for {folder_name}. Skipping.", is_error=False)
-
-        except Exception as e:
-            self.log(f"Error accessing Steam userdata: {e}", is_error=True)
-            self.log(traceback.format_exc(), is_error=True, console_only=True)
-
-        return account_folders
-
-    def load_accounts(self):
-        account_folders = self.get_account_folders()
-        self.accounts = []
-
-        def load_account_data(steam_id, account_path):
-            try:
-                account_info = self.get_steam_account_info(steam_id, account_path)
-                avatar_file_path = None
-
-                if account_info.get('avatar_url'):
-                    avatar_file_path = self.download_avatar(account_info['avatar_url'], steam_id)
-
-                account_data = {
-                    'account_id': steam_id,
-                    'personaname': account_info.get('personaname', f"User {steam_id}"),
-                    'avatar': avatar_file_path,  # Store the file path
-                    'path': account_path
-                }
-                self.accounts.append(account_data)
-            except Exception as e:
-                self.log(f"Error loading account {steam_id}: {e}", is_error=True, console_only=True)
-
-        threads = []
-        for steam_id, account_path in account_folders:
-            thread = threading.Thread(target=load_account_data, args=(steam_id, account_path))
-            threads.append(thread)
-            thread.start()
-
-        for thread in threads:
-            thread.join()
-
-    def download_avatar(self, url, steam_id):
-        """Downloads the avatar and saves it locally, returning the file path."""
-        if not url:
-            return None
+        return self.engine.get_account_folders()
+
+    def load_accounts(self) -> List[Dict]:
+        """Runs the account loader; call from a worker thread. Progress reaches the UI via ``call_in_ui``."""
+        return self.engine.load_accounts(
+            parse_workers=ACCOUNT_PARSE_WORKERS,
+            avatar_workers=AVATAR_WORKERS,
+            parse_timeout=ACCOUNT_PARSE_TIMEOUT,
+            avatar_timeout=AVATAR_TIMEOUT,
+            fetch_avatar=self.download_avatar,
+            on_account=lambda account: self.call_in_ui(self.on_account_loaded, account),
+            on_avatar=lambda account: self.call_in_ui(self.on_avatar_loaded, account)
+        )
 
-        try:
-            response = requests.get(url, stream=True, timeout=5)
-            response.raise_for_status()
+    def _visible_account_list(self):
+        if self.account_list is not None and self.account_list.winfo_exists():
+            return self.account_list
+        return None
 
-            # Create a directory for avatars if it doesn't exist
-            avatar_dir = os.path.join(os.getcwd(), "avatars")
-            os.makedirs(avatar_dir, exist_ok=True)
+    def on_account_loaded(self, account):
+        if not self.accounts:
+            TRACER.record("startup.first_account", self.startup_span.start_ns, time.perf_counter_ns())
+        self.accounts.append(account)
+        account_list = self._visible_account_list()
+        if account_list:
+            account_list.add_account(account)
+
+    def on_avatar_loaded(self, account):
+        account_list = self._visible_account_list()
+        if account_list:
+            account_list.update_account(account)
+
+    def on_accounts_loaded(self, accounts):
+        """Loading finished: switch to the final, ordered account list (None if loading failed)."""
+        if accounts is not None:
+            self.accounts = accounts
+        if self.accounts_loading:
+            self.startup_span.end(accounts=len(self.accounts))
+            self.log(TRACER.format_summary("Startup"), console_only=True)
+        self.accounts_loading = False
+        account_list = self._visible_account_list()
+        if account_list:
+            account_list.set_loading(False)
+            account_list.set_accounts(self.accounts)
+
+        if self.steam_userdata_path and self.watcher is None:
+            self.watcher = UserdataWatcher(self.steam_userdata_path, self.on_userdata_changed, log=self.log)
+            self.watcher.start()
+
+    def on_userdata_changed(self, steam_ids):
+        """Watcher thread: re-reads only the changed accounts and hands them to the UI."""
+        known = {account['account_id']: account for account in list(self.accounts)}
+        changes = self.engine.reload_accounts(steam_ids)
+        for steam_id, account in changes.items():
+            if account is None:
+                continue
+            old = known.get(steam_id)
+            if old and old.get('avatar') and old.get('avatar_hash') == account['avatar_hash']:
+                account['avatar'] = old['avatar']
+            elif account.get('avatar_url'):
+                account['avatar'] = self.download_avatar(account)
+        self.call_in_ui(self.apply_account_changes, changes)
+
+    def apply_account_changes(self, changes):
+        """Applies ``reload_accounts`` results: updates changed cards, adds and removes accounts."""
+        by_id = {account['account_id']: account for account in self.accounts}
+        structure_changed = False
+        updated = []
+        for steam_id, account in changes.items():
+            old = by_id.get(steam_id)
+            if account is None:
+                if old:
+                    del by_id[steam_id]
+                    structure_changed = True
+                continue
+            if old is None:
+                structure_changed = True
+            elif (old['personaname'], old['avatar'], old['path']) != \
+                    (account['personaname'], account['avatar'], account['path']):
+                updated.append(account)
+            else:
+                continue
+            by_id[steam_id] = account
+            if self.selected_account and self.selected_account['account_id'] == steam_id:
+                self.selected_account = account
 
-            # Save the avatar with the steam_id as the filename
-            file_path = os.path.join(avatar_dir, f"{steam_id}.jpg")
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            return file_path
+        if not structure_changed and not updated:
+            return
+        self.accounts = sorted(by_id.values(), key=lambda account: (len(account['account_id']),
+                                                                    account['account_id']))
+        self.log(f"Accounts changed on disk: {', '.join(sorted(changes))}", console_only=True)
+        account_list = self._visible_account_list()
+        if not account_list:
+            return
+        if structure_changed:
+            account_list.set_accounts(self.accounts)
+        else:
+            for account in updated:
+                account_list.update_account(account)
 
-        except Exception as e:
-            self.log(f"Error downloading avatar for {steam_id}: {e}", is_error=True, console_only=True)
-            return None
+    def download_avatar(self, account):
+        """Returns the cached avatar file for the account, downloading it if needed.
 
+        Also pre-renders the list thumbnail here, off the Tk thread.
+        """
+        avatar_path = self.avatar_cache.get(account.get('avatar_hash'), account.get('avatar_url'))
+        if avatar_path:
+            self.thumbnails.render(account.get('avatar_hash') or account['account_id'], avatar_path)
+        return avatar_path
 
     def select_account(self, account):
         self.selected_account = account
+        self.show_startup_warnings = False
         for widget in self.main_container.winfo_children():
             widget.destroy()
         self.create_header()
@@ -855,59 +1083,9 @@ class ConfigBridgeApp(ctk.CTk):
         header.pack_propagate(False)
 
         # Avatar display (with rounding)
-        avatar_frame = ctk.CTkFrame(header, width=50, height=50, corner_radius=25, fg_color="transparent")
-        avatar_frame.pack(side="left", padx=20)
-        avatar_frame.pack_propagate(False)
-
-        if self.selected_account.get('avatar'):
-            try:
-                # Загружаем и изменяем размер аватара
-                avatar_image = Image.open(self.selected_account['avatar']).resize((48, 48))
-
-                # Преобразуем в RGBA если необходимо
-                if avatar_image.mode != 'RGBA':
-                    avatar_image = avatar_image.convert('RGBA')
-
-                # Создаём круглую маску
-                mask = Image.new('L', (48, 48), 0)
-                draw = ImageDraw.Draw(mask)
-                draw.ellipse((0, 0, 48, 48), fill=255)
-
-                # Создаём изображение с прозрачным фоном
-                circular_image = Image.new('RGBA', (48, 48), (0, 0, 0, 0))
-                circular_image.paste(avatar_image, (0, 0), mask)
-
-                # Конвертируем в PhotoImage
-                photo_image = ImageTk.PhotoImage(circular_image)
-
-                # Создаём метку для аватара
-                avatar_label = tk.Label(
-                    avatar_frame, image=photo_image, bg=THEME["bg_primary"],
-                    borderwidth=0, highlightthickness=0
-                )
-                avatar_label.image = photo_image  # Сохраняем ссылку
-                avatar_label.place(relx=0.5, rely=0.5, anchor="center")
-
-            except Exception as e:
-                print(f"Ошибка загрузки аватара: {e}")
-
-                # Показываем первую букву имени, если аватар не загрузился
-                initial_label = ctk.CTkLabel(
-                    avatar_frame,
-                    text=self.selected_account['personaname'][0].upper() if self.selected_account[
-                        'personaname'] else "?",
-                    font=("Inter", 18, "bold"), text_color=THEME["text_primary"]
-                )
-                initial_label.place(relx=0.5, rely=0.5, anchor="center")
-
-        else:
-            # Если нет аватара, показываем первую букву имени
-            initial_label = ctk.CTkLabel(
-                avatar_frame,
-                text=self.selected_account['personaname'][0].upper() if self.selected_account['personaname'] else "?",
-                font=("Inter", 18, "bold"), text_color=THEME["text_primary"]
-            )
-            initial_label.place(relx=0.5, rely=0.5, anchor="center")
+        avatar_view = AvatarView(header, thumbnails=self.thumbnails, fallback_color="transparent")
+        avatar_view.pack(side="left", padx=20)
+        avatar_view.set_account(self.selected_account)
 
         name_label = ctk.CTkLabel(
             header,
@@ -947,6 +1125,15 @@ class ConfigBridgeApp(ctk.CTk):
         )
         export_btn.pack(fill="x", pady=(0, 10))
 
+        if self.engine.backup_store(self.selected_account['path']).list():
+            undo_btn = SecondaryButton(
+                buttons_frame,
+                text=LANGUAGES[self.current_lang]["undo_import"],
+                command=self.undo_import,
+                height=40
+            )
+            undo_btn.pack(fill="x", pady=(0, 10))
+
         back_btn = SecondaryButton(
             buttons_frame,
             text=LANGUAGES[self.current_lang]["back"],
@@ -1017,31 +1204,16 @@ class ConfigBridgeApp(ctk.CTk):
         )
         title.pack(pady=20)
 
-        scroll_frame = ctk.CTkScrollableFrame(
+        self.account_list = VirtualAccountList(
             selection_frame,
-            fg_color="transparent"
+            accounts=self.accounts,
+            on_select=self.import_from_account,
+            lang_code=self.current_lang,
+            thumbnails=self.thumbnails,
+            exclude=self.selected_account['account_id'],
+            loading=self.accounts_loading
         )
-        scroll_frame.pack(fill="both", expand=True, padx=16, pady=(0, 16))
-
-        account_found = False
-        for account in self.accounts:
-            if account['account_id'] != self.selected_account['account_id']:
-                AccountCard(
-                    scroll_frame,
-                    account=account,
-                    on_select=lambda acc=account: self.import_from_account(acc),
-                    lang_code=self.current_lang
-                ).pack(fill="x", pady=(0, 8))
-                account_found = True
-
-        if not account_found:
-            no_accounts_label = ctk.CTkLabel(
-                scroll_frame,
-                text=LANGUAGES[self.current_lang]["no_accounts_found"],
-                font=("Segoe UI", 14),
-                text_color=THEME["text_primary"]
-            )
-            no_accounts_label.pack(expand=True, pady=20)
+        self.account_list.pack(fill="both", expand=True, padx=16, pady=(0, 16))
 
         AnimatedButton(
             selection_frame,
@@ -1056,26 +1228,98 @@ class ConfigBridgeApp(ctk.CTk):
             title=LANGUAGES[self.current_lang]["import_from_file"]
         )
         if file_path:
-            try:
-                self.import_config(self.selected_account['path'], file_path)
-                self.show_success_message(LANGUAGES[self.current_lang]["config_imported"])
-            except Exception as e:
-                self.log(f"Error importing from file: {e}", is_error=True)
-                self.log(traceback.format_exc(), is_error=True, console_only=True)
-                self.show_error_message(str(e))
-            finally:
-                self.select_account(self.selected_account)
+            self.preview_import(file_path, "Error importing from file")
 
     def import_from_account(self, source_account):
-        try:
-            self.import_config(self.selected_account['path'], source_account['path'])
-            self.show_success_message(LANGUAGES[self.current_lang]["config_imported"])
-        except Exception as e:
-            self.log(f"Error importing from account: {e}", is_error=True)
-            self.log(traceback.format_exc(), is_error=True, console_only=True)
-            self.show_error_message(str(e))
-        finally:
-            self.select_account(self.selected_account)
+        self.preview_import(source_account['path'], "Error importing from account")
+
+    def run_task(self, title_key, func, success_key, error_context):
+        """Runs ``func(task)`` for the selected account on a worker, showing a progress screen."""
+        account = self.selected_account
+        trace_mark = TRACER.mark()
+        trace_title = LANGUAGES["EN"][title_key].rstrip(".")
+
+        def traced(task):
+            with span(f"task.{title_key}", account=account['account_id']):
+                return func(task)
+
+        def on_done(_):
+            self.log(TRACER.format_summary(trace_title, since=trace_mark), console_only=True)
+            self.show_success_message(LANGUAGES[self.current_lang][success_key])
+            self.select_account(account)
+
+        def on_error(e):
+            self.log(TRACER.format_summary(trace_title, since=trace_mark), console_only=True)
+            if isinstance(e, TaskCancelled):
+                self.show_success_message(LANGUAGES[self.current_lang]["cancelled"])
+            else:
+                self.log(f"{error_context}: {e}", is_error=True)
+                self.log("".join(traceback.format_exception(type(e), e, e.__traceback__)), is_error=True,
+                         console_only=True)
+                self.show_error_message(str(e))
+            self.select_account(account)
+
+        progress_view = {}
+        task = self.tasks.start(account['path'], traced, on_done=on_done, on_error=on_error,
+                                on_progress=lambda progress: self.update_task_progress(progress_view, progress))
+        if task is None:
+            self.show_error_message(LANGUAGES[self.current_lang]["task_running"])
+            return
+        progress_view.update(self.show_task_progress(title_key, task))
+
+    def show_task_progress(self, title_key, task):
+        for widget in self.main_container.winfo_children():
+            widget.destroy()
+
+        task_frame = ctk.CTkFrame(
+            self.main_container,
+            fg_color=THEME["bg_secondary"],
+            corner_radius=16
+        )
+        task_frame.pack(fill="both", expand=True)
+
+        inner = ctk.CTkFrame(task_frame, fg_color="transparent")
+        inner.place(relx=0.5, rely=0.5, anchor="center")
+
+        ctk.CTkLabel(
+            inner,
+            text=LANGUAGES[self.current_lang][title_key],
+            font=("Inter", 16, "bold"),
+            text_color=THEME["text_primary"]
+        ).pack(pady=(0, 16))
+
+        progress_bar = ctk.CTkProgressBar(inner, progress_color=THEME["progress_color"], width=360)
+        progress_bar.set(0)
+        progress_bar.pack()
+
+        detail_label = ctk.CTkLabel(
+            inner,
+            text="",
+            font=("Inter", 11),
+            text_color=THEME["text_secondary"]
+        )
+        detail_label.pack(pady=(8, 16))
+
+        cancel_btn = SecondaryButton(
+            inner,
+            text=LANGUAGES[self.current_lang]["cancel"],
+            command=task.cancel,
+            width=120
+        )
+        cancel_btn.pack()
+        return {'bar': progress_bar, 'label': detail_label}
+
+    def update_task_progress(self, progress_view, progress):
+        bar = progress_view.get('bar')
+        if not bar or not bar.winfo_exists():
+            return
+        if progress['bytes_total']:
+            bar.set(progress['bytes_done'] / progress['bytes_total'])
+        elif progress['files_total']:
+            bar.set(progress['files_done'] / progress['files_total'])
+        progress_view['label'].configure(text=LANGUAGES[self.current_lang]["progress"].format(
+            files_done=progress['files_done'], files_total=progress['files_total'],
+            mb_done=progress['bytes_done'] / (1024 * 1024), mb_total=progress['bytes_total'] / (1024 * 1024)))
 
     def show_success_message(self, message):
         self.status_label.configure(
@@ -1084,110 +1328,115 @@ class ConfigBridgeApp(ctk.CTk):
         )
         self.after(3000, lambda: self.status_label.configure(text=""))
 
-    def import_config(self, target_account_path, source_path):
-        try:
-            base_cfg_dir = os.path.join(target_account_path, CONFIG_DIR)
-            local_cfg_dir = os.path.join(target_account_path, LOCAL_CFG_DIR)
-            remote_cfg_dir = os.path.join(target_account_path, REMOTE_CFG_DIR)
+    def preview_import(self, source_path, error_context="Error importing"):
+        """Plans importing ``source_path`` into the selected account on a worker, then shows the plan."""
+        account = self.selected_account
+        no_config_files = LANGUAGES[self.current_lang]["no_config_files"]
 
-            for cfg_dir in [base_cfg_dir, local_cfg_dir, remote_cfg_dir]:
-                if not os.path.exists(cfg_dir):
-                    os.makedirs(cfg_dir)
-                    self.log(f"Created directory: {cfg_dir}")
+        def plan(task):
+            try:
+                return self.engine.plan_import(account['path'], source_path)
+            except FileNotFoundError:
+                raise FileNotFoundError(no_config_files)
 
-            if os.path.isfile(source_path):
-                try:
-                    with zipfile.ZipFile(source_path, 'r') as zip_ref:
-                        temp_extract_dir = os.path.join(os.path.dirname(source_path),
-                                                        f"temp_extract_{int(time.time())}")
-                        os.makedirs(temp_extract_dir, exist_ok=True)
+        def on_done(import_plan):
+            if self.selected_account is account:
+                self.show_import_plan(import_plan, error_context)
+
+        def on_error(e):
+            self.log(f"{error_context}: {e}", is_error=True)
+            self.show_error_message(str(e))
+
+        if self.tasks.start(("plan", account['path']), plan, on_done=on_done, on_error=on_error) is None:
+            self.show_error_message(LANGUAGES[self.current_lang]["task_running"])
+
+    def show_import_plan(self, plan, error_context):
+        for widget in self.main_container.winfo_children():
+            widget.destroy()
+        lang = LANGUAGES[self.current_lang]
+
+        plan_frame = ctk.CTkFrame(
+            self.main_container,
+            fg_color=THEME["bg_secondary"],
+            corner_radius=12
+        )
+        plan_frame.pack(fill="both", expand=True)
 
-                        try:
-                            zip_ref.extractall(temp_extract_dir)
-                            self._copy_config_files(temp_extract_dir, target_account_path)
+        ctk.CTkLabel(
+            plan_frame,
+            text=lang["review_import"],
+            font=("Segoe UI", 16, "bold"),
+            text_color=THEME["text_primary"]
+        ).pack(pady=(20, 8))
 
-                        finally:
-                            if os.path.exists(temp_extract_dir):
-                                shutil.rmtree(temp_extract_dir)
+        ctk.CTkLabel(
+            plan_frame,
+            text=lang["plan_summary"].format(**plan.counts()),
+            font=("Inter", 12),
+            text_color=THEME["text_secondary"]
+        ).pack()
+        free = format_size(plan.free_space) if plan.free_space is not None else "?"
+        ctk.CTkLabel(
+            plan_frame,
+            text=lang["plan_size"].format(to_write=format_size(plan.bytes_to_write), free=free),
+            font=("Inter", 12),
+            text_color=THEME["text_secondary"] if plan.fits else THEME["error"]
+        ).pack(pady=(0, 8))
+
+        operations = ctk.CTkTextbox(plan_frame, font=("Consolas", 11), fg_color=THEME["card_bg"],
+                                    text_color=THEME["text_primary"], wrap="none")
+        operations.pack(fill="both", expand=True, padx=20)
+        markers = {'create': "+", 'replace': "~", 'delete': "-"}
+        lines = [f"{markers[operation['op']]} {operation['name']}" for operation in plan.operations[:PLAN_MAX_LINES]]
+        if len(plan.operations) > PLAN_MAX_LINES:
+            lines.append(lang["plan_more"].format(count=len(plan.operations) - PLAN_MAX_LINES))
+        operations.insert("1.0", "\n".join(lines) if lines else lang["plan_up_to_date"])
+        operations.configure(state="disabled")
+
+        buttons_frame = ctk.CTkFrame(plan_frame, fg_color="transparent")
+        buttons_frame.pack(fill="x", padx=20, pady=20)
+        if not plan.fits:
+            ctk.CTkLabel(
+                buttons_frame,
+                text=lang["plan_no_space"],
+                font=("Inter", 12),
+                text_color=THEME["error"]
+            ).pack(pady=(0, 8))
+        elif plan.operations:
+            AnimatedButton(
+                buttons_frame,
+                text=lang["import_config"],
+                fg_color=THEME["accent"],
+                command=lambda: self.execute_import(plan, error_context),
+                height=50
+            ).pack(fill="x", pady=(0, 8))
 
-                    self.log(f"Imported config from file {source_path}")
+        AnimatedButton(
+            buttons_frame,
+            text=lang["back"],
+            fg_color=THEME["bg_secondary"],
+            command=self.show_import_options
+        ).pack(fill="x")
 
-                except zipfile.BadZipFile:
-                    self.log(f"Invalid zip file: {source_path}", is_error=True)
-                    raise ValueError("The selected file is not a valid archive")
+    def execute_import(self, plan, error_context="Error importing"):
+        def run(task):
+            self.dota.wait_until_released(plan.target_path, task)
+            return self.engine.execute_plan(plan, task)
 
-            elif os.path.isdir(source_path):
-                has_configs = self._copy_config_files(source_path, target_account_path)
+        self.run_task("importing", run, "config_imported", error_context)
 
-                if not has_configs:
-                    self.log(f"No configuration files found in source", is_error=True)
-                    raise FileNotFoundError(LANGUAGES[self.current_lang]["no_config_files"])
+    def undo_import(self):
+        account_path = self.selected_account['path']
 
-                self.log(f"Imported config from account {source_path}")
-            else:
-                raise ValueError("Invalid source path")
+        def run(task):
+            self.dota.wait_until_released(account_path, task)
+            return self.engine.undo_import(account_path)
 
-        except Exception as e:
-            self.log(f"Error during import: {e}", is_error=True)
-            self.log(traceback.format_exc(), is_error=True, console_only=True)
-            raise
-
-    def _copy_config_files(self, source_path, target_path):
-        has_copied_files = False
-
-        source_dirs = [
-            os.path.join(source_path, CONFIG_DIR),
-            os.path.join(source_path, LOCAL_CFG_DIR),
-            os.path.join(source_path, REMOTE_CFG_DIR)
-        ]
-
-        target_dirs = [
-            os.path.join(target_path, CONFIG_DIR),
-            os.path.join(target_path, LOCAL_CFG_DIR),
-            os.path.join(target_path, REMOTE_CFG_DIR)
-        ]
-
-        for target_dir in target_dirs:
-            if not os.path.exists(target_dir):
-                os.makedirs(target_dir)
-
-        for i, source_dir in enumerate(source_dirs):
-            if os.path.exists(source_dir) and os.path.isdir(source_dir):
-                target_dir = target_dirs[i]
-
-                for item in os.listdir(target_dir):
-                    item_path = os.path.join(target_dir, item)
-                    if os.path.isfile(item_path):
-                        os.remove(item_path)
-                    elif os.path.isdir(item_path):
-                        shutil.rmtree(item_path)
-
-                for item in os.listdir(source_dir):
-                    src_item = os.path.join(source_dir, item)
-                    dst_item = os.path.join(target_dir, item)
-
-                    if os.path.isfile(src_item):
-                        shutil.copy2(src_item, dst_item)
-                        has_copied_files = True
-                    elif os.path.isdir(src_item):
-                        shutil.copytree(src_item, dst_item, dirs_exist_ok=True)
-                        has_copied_files = True
-
-        return has_copied_files
+        self.run_task("undoing", run, "import_undone", "Error undoing import")
 
     def export_config(self):
         try:
-            base_cfg_dir = os.path.join(self.selected_account['path'], CONFIG_DIR)
-            local_cfg_dir = os.path.join(self.selected_account['path'], LOCAL_CFG_DIR)
-            remote_cfg_dir = os.path.join(self.selected_account['path'], REMOTE_CFG_DIR)
-
-            has_config_files = False
-            for cfg_dir in [base_cfg_dir, local_cfg_dir, remote_cfg_dir]:
-                if os.path.exists(cfg_dir) and os.listdir(cfg_dir):
-                    has_config_files = True
-                    break
-
-            if not has_config_files:
+            if not has_config_files(self.selected_account['path']):
                 self.log(LANGUAGES[self.current_lang]["no_config_files"], is_error=True)
                 self.show_error_message(LANGUAGES[self.current_lang]["no_config_files"])
                 return
@@ -1201,71 +1450,11 @@ class ConfigBridgeApp(ctk.CTk):
             )
 
             if save_path:
-                temp_dir = os.path.join(os.path.dirname(save_path), f"temp_export_{int(time.time())}")
-                os.makedirs(temp_dir, exist_ok=True)
-
-                try:
-                    temp_cfg_dir = os.path.join(temp_dir, CONFIG_DIR)
-                    temp_local_cfg_dir = os.path.join(temp_dir, LOCAL_CFG_DIR)
-                    temp_remote_cfg_dir = os.path.join(temp_dir, REMOTE_CFG_DIR)
-
-                    if os.path.exists(base_cfg_dir):
-                        os.makedirs(temp_cfg_dir, exist_ok=True)
-                        for item in os.listdir(base_cfg_dir):
-                            src_path = os.path.join(base_cfg_dir, item)
-                            dst_path = os.path.join(temp_cfg_dir, item)
-                            if os.path.isfile(src_path):
-                                shutil.copy2(src_path, dst_path)
-                            elif os.path.isdir(src_path):
-                                shutil.copytree(src_path, dst_path)
-
-                    if os.path.exists(local_cfg_dir):
-                        os.makedirs(os.path.dirname(temp_local_cfg_dir), exist_ok=True)
-                        os.makedirs(temp_local_cfg_dir, exist_ok=True)
-                        for item in os.listdir(local_cfg_dir):
-                            src_path = os.path.join(local_cfg_dir, item)
-                            dst_path = os.path.join(temp_local_cfg_dir, item)
-                            if os.path.isfile(src_path):
-                                shutil.copy2(src_path, dst_path)
-                            elif os.path.isdir(src_path):
-                                shutil.copytree(src_path, dst_path)
-
-                    if os.path.exists(remote_cfg_dir):
-                        os.makedirs(os.path.dirname(temp_remote_cfg_dir), exist_ok=True)
-                        os.makedirs(temp_remote_cfg_dir, exist_ok=True)
-                        for item in os.listdir(remote_cfg_dir):
-                            src_path = os.path.join(remote_cfg_dir, item)
-                            dst_path = os.path.join(temp_remote_cfg_dir, item)
-                            if os.path.isfile(src_path):
-                                shutil.copy2(src_path, dst_path)
-                            elif os.path.isdir(src_path):
-                                shutil.copytree(src_path, dst_path)
-
-                    metadata = {
-                        "exported_by": self.selected_account['personaname'],
-                        "account_id": self.selected_account['account_id'],
-                        "export_date": time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "exporter_version": "2.0.1"
-                    }
-
-                    with open(os.path.join(temp_dir, "metadata.json"), 'w', encoding='utf-8') as f:
-                        json.dump(metadata, f, indent=2)
-
-                    with zipfile.ZipFile(save_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                        for root, _, files in os.walk(temp_dir):
-                            for file in files:
-                                file_path = os.path.join(root, file)
-                                zipf.write(
-                                    file_path,
-                                    os.path.relpath(file_path, temp_dir)
-                                )
-
-                    self.log(f"Configuration exported to {save_path}")
-                    self.show_success_message(LANGUAGES[self.current_lang]["config_exported"])
-
-                finally:
-                    if os.path.exists(temp_dir):
-                        shutil.rmtree(temp_dir)
+                account_path = self.selected_account['path']
+                metadata = make_metadata(self.selected_account['personaname'], self.selected_account['account_id'])
+                self.run_task("exporting",
+                              lambda task: self.engine.export_config(account_path, save_path, metadata, task=task),
+                              "config_exported", "Error during export")
 
         except Exception as e:
             self.log(f"Error during export: {e}", is_error=True)
@@ -1285,13 +1474,19 @@ class ConfigBridgeApp(ctk.CTk):
                 self.log_window.destroy()
             if self._popup_window:
                 self._popup_window.destroy()
+            self.tasks.cancel_all()
+            if self.trace_path:
+                TRACER.write_chrome_trace(self.trace_path)
+                print(f"Trace written to {self.trace_path}")
+            self.log_sink.close()
+            if self.watcher:
+                self.watcher.stop()
+            self.avatar_cache.close()
             self.destroy()
         except Exception as e:
             print(f"Error during closing: {e}")
             self.destroy()
 
-from PIL import Image, ImageTk, ImageDraw
-
 if __name__ == "__main__":
     try:
         ctk.set_widget_scaling(1.0)
@@ -0,0 +1,127 @@
+"""Finding and closing the Dota 2 process without stalling the UI.
+
+Processes are enumerated with their names only (no memory or user
+lookups), and the processes found are remembered, so repeated checks cost
+a single ``is_running`` call until the game exits. Waiting for the game to
+exit uses ``psutil.wait_procs`` instead of fixed sleeps.
+"""
+import os
+import time
+import threading
+from typing import List, Optional
+
+import psutil
+
+from engine import TaskControl, iter_config_files, print_log
+
+DOTA_PROCESS_NAMES = ("dota2.exe", "dota2")
+# Seconds the game gets to exit after terminate() before it is killed.
+TERMINATE_TIMEOUT = 5.0
+# Poll step while a closed game's cfg files are still locked (Windows releases handles lazily).
+RELEASE_POLL_INTERVAL = 0.1
+
+
+class DotaProcessMonitor:
+    def __init__(self, log=None):
+        self.log = log or print_log
+        self._lock = threading.Lock()
+        self._known: List[psutil.Process] = []
+        self._closer: Optional[threading.Thread] = None
+
+    def running(self) -> List[psutil.Process]:
+        """The running Dota 2 processes; rescans only once the remembered ones are gone."""
+        with self._lock:
+            # is_running() also compares the creation time, so a reused PID is not mistaken for the game.
+            self._known = [proc for proc in self._known if proc.is_running()]
+            if not self._known:
+                for proc in psutil.process_iter(['name']):
+                    name = proc.info['name']
+                    if name and name.lower() in DOTA_PROCESS_NAMES:
+                        self._known.append(proc)
+            return list(self._known)
+
+    def close(self, timeout=TERMINATE_TIMEOUT) -> List[int]:
+        """Terminates the game (killing it if it ignores that for ``timeout`` seconds).
+
+        Returns the PIDs that exited.
+        """
+        procs = self.running()
+        if not procs:
+            return []
+        for proc in procs:
+            try:
+                proc.terminate()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied as e:
+                self.log(f"Cannot close dota2 (PID: {proc.pid}): {e}", is_error=True, console_only=True)
+        gone, alive = psutil.wait_procs(procs, timeout=timeout)
+        for proc in alive:
+            try:
+                proc.kill()
+            except psutil.Error:
+                pass
+        if alive:
+            killed, alive = psutil.wait_procs(alive, timeout=timeout)
+            gone += killed
+        for proc in alive:
+            self.log(f"dota2 (PID: {proc.pid}) did not exit", is_error=True, console_only=True)
+        for proc in gone:
+            self.log(f"dota2 (PID: {proc.pid}) closed.", console_only=True)
+        return [proc.pid for proc in gone]
+
+    def close_async(self):
+        """Closes the game on a background thread; overlapping requests share one thread."""
+        with self._lock:
+            if self._closer and self._closer.is_alive():
+                return
+            self._closer = threading.Thread(target=self._close_quietly, daemon=True, name="cbd2-close-dota")
+            self._closer.start()
+
+    def _close_quietly(self):
+        try:
+            self.close()
+        except Exception as e:
+            self.log(f"Error closing Dota 2: {e}", is_error=True, console_only=True)
+
+    def wait_until_released(self, account_path, task: Optional[TaskControl] = None, timeout=30.0):
+        """Returns once Dota 2 is closed and has let go of the account's cfg files.
+
+        Closes the game if it is running. Returns immediately if it was not
+        running. ``task`` is polled for cancellation; raises TimeoutError if
+        a cfg file is still locked after ``timeout`` seconds.
+        """
+        if not self.running():
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            if task:
+                task.check()
+            if self.running():
+                self.close()
+                continue
+            locked = locked_config_file(account_path)
+            if locked is None:
+                return
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Config file is still in use: {locked}")
+            time.sleep(RELEASE_POLL_INTERVAL)
+
+
+def locked_config_file(account_path) -> Optional[str]:
+    """The first cfg file of the account that cannot be opened for writing, or None.
+
+    Read-only files are skipped: imports replace them by rename, and they
+    would never become writable by waiting.
+    """
+    for _, file_path in iter_config_files(account_path):
+        if not os.access(file_path, os.W_OK):
+            continue
+        try:
+            with open(file_path, 'r+b'):
+                pass
+        except PermissionError:
+            return file_path
+        except OSError:
+            continue
+    return None
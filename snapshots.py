@@ -0,0 +1,224 @@
+"""Content-addressed snapshot store for account configs.
+
+A snapshot is a small JSON manifest mapping archive names (``cfg/...``,
+``local/cfg/...``, ``remote/cfg/...``) to the hash of their content; the
+content itself lives once per hash in a shared blob folder. Identical files
+across accounts and across points in time are therefore stored only once.
+
+Layout under the store root::
+
+    blobs/<first two hash chars>/<hash>
+    manifests/<snapshot id>.json
+    tmp/                      blobs being written
+    store.lock                held by ``save`` and ``gc``, see ``engine.FileLock``
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import zipfile
+from typing import Dict, List, Optional
+
+from engine import (
+    COPY_BUFSIZE, DEFAULT_COMPRESSION, HASH_SIZE, MANIFEST_NAME, FileLock, build_manifest, compression_settings,
+    scan_account, user_data_dir, write_archive_members
+)
+from tracing import span
+
+MANIFEST_VERSION = 1
+
+
+class SnapshotStore:
+    def __init__(self, root: Optional[str] = None):
+        self.root = root or os.path.join(user_data_dir(), "snapshots")
+        self.blobs_dir = os.path.join(self.root, "blobs")
+        self.manifests_dir = os.path.join(self.root, "manifests")
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        self.lock_path = os.path.join(self.root, "store.lock")
+
+    def blob_path(self, file_hash_hex):
+        return os.path.join(self.blobs_dir, file_hash_hex[:2], file_hash_hex)
+
+    def manifest_path(self, snapshot_id):
+        if not snapshot_id or os.sep in snapshot_id or "/" in snapshot_id or snapshot_id.startswith("."):
+            raise ValueError(f"Invalid snapshot id: {snapshot_id}")
+        return os.path.join(self.manifests_dir, f"{snapshot_id}.json")
+
+    def save(self, account_path, metadata: Dict) -> str:
+        """Snapshots the account's cfg folders; only content not yet in the store is written."""
+        with FileLock(self.lock_path):
+            files = {}
+            for name, entry in sorted(scan_account(account_path).items()):
+                with span("snapshot.file", name=name):
+                    files[name] = self._add_blob(entry['path'])
+
+            snapshot_id = self._new_snapshot_id(metadata.get('account_id', 'account'))
+            manifest = {
+                'version': MANIFEST_VERSION,
+                'id': snapshot_id,
+                'created': time.time(),
+                'metadata': metadata,
+                'files': files,
+            }
+            os.makedirs(self.manifests_dir, exist_ok=True)
+            tmp_path = self.manifest_path(snapshot_id) + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, indent=2)
+            os.replace(tmp_path, self.manifest_path(snapshot_id))
+        return snapshot_id
+
+    def _add_blob(self, source_file) -> Dict:
+        """Stores a file's content unless the store has it; returns its ``size``, ``mtime`` and ``hash``.
+
+        The file is read once and hashed as it is copied, so a blob always
+        holds the content its hash names, even if the game rewrites the
+        file meanwhile. Up to ``COPY_BUFSIZE`` is held in memory and only
+        written out if the content is new.
+        """
+        digest = hashlib.blake2b(digest_size=HASH_SIZE)
+        chunks, size, tmp_path, tmp = [], 0, None, None
+        try:
+            with open(source_file, 'rb') as src:
+                mtime = os.fstat(src.fileno()).st_mtime
+                for chunk in iter(lambda: src.read(COPY_BUFSIZE), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    if tmp is not None:
+                        tmp.write(chunk)
+                        continue
+                    chunks.append(chunk)
+                    if size > COPY_BUFSIZE:
+                        tmp_path, tmp = self._tmp_blob()
+                        tmp.writelines(chunks)
+                        chunks = []
+            blob = self.blob_path(digest.hexdigest())
+            if not os.path.exists(blob):
+                if tmp is None:
+                    tmp_path, tmp = self._tmp_blob()
+                    tmp.writelines(chunks)
+                tmp.close()
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                os.replace(tmp_path, blob)
+                tmp_path = None
+        finally:
+            if tmp is not None:
+                tmp.close()
+            if tmp_path is not None:
+                os.remove(tmp_path)
+        return {'size': size, 'mtime': mtime, 'hash': digest.hexdigest()}
+
+    def _tmp_blob(self):
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.tmp_dir)
+        return tmp_path, os.fdopen(fd, 'wb')
+
+    def _new_snapshot_id(self, account_id):
+        base = f"{account_id}-{time.strftime('%Y%m%d-%H%M%S')}"
+        snapshot_id, n = base, 1
+        while os.path.exists(self.manifest_path(snapshot_id)):
+            n += 1
+            snapshot_id = f"{base}-{n}"
+        return snapshot_id
+
+    def load(self, snapshot_id) -> Dict:
+        try:
+            with open(self.manifest_path(snapshot_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Snapshot not found: {snapshot_id}")
+
+    def list(self, account_id=None) -> List[Dict]:
+        """Manifests (newest first), optionally only those of one account."""
+        if not os.path.isdir(self.manifests_dir):
+            return []
+        manifests = []
+        for file in os.listdir(self.manifests_dir):
+            if not file.endswith(".json"):
+                continue
+            manifest = self.load(file[:-len(".json")])
+            if account_id is None or manifest['metadata'].get('account_id') == account_id:
+                manifests.append(manifest)
+        manifests.sort(key=lambda m: m['created'], reverse=True)
+        return manifests
+
+    def snapshot_tree(self, snapshot_id) -> Dict[str, Dict]:
+        """The snapshot as a source tree for ``ConfigEngine.plan_import``."""
+        tree = {}
+        for name, entry in self.load(snapshot_id)['files'].items():
+            tree[name] = dict(entry, path=self.blob_path(entry['hash']))
+        return tree
+
+    def export_archive(self, snapshot_id, save_path, compression=DEFAULT_COMPRESSION):
+        """Builds a .cbd2 archive from a stored snapshot without touching the account.
+
+        ``compression`` names a profile from ``engine.COMPRESSION_PROFILES``.
+        """
+        method, level = compression_settings(compression)
+        manifest = self.load(snapshot_id)
+        part_path = save_path + ".part"
+        try:
+            with zipfile.ZipFile(part_path, 'w', method, compresslevel=level) as zipf:
+                members = []
+                for name, entry in sorted(manifest['files'].items()):
+                    info = zipfile.ZipInfo(name, time.localtime(entry['mtime'])[:6])
+                    info.file_size = entry['size']
+                    members.append((info, self.blob_path(entry['hash'])))
+                write_archive_members(zipf, members, method, level)
+                zipf.writestr(MANIFEST_NAME, json.dumps(build_manifest(manifest['files']), indent=1))
+                zipf.writestr("metadata.json", json.dumps(manifest['metadata'], indent=2))
+            os.replace(part_path, save_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    def delete(self, snapshot_id):
+        os.remove(self.manifest_path(snapshot_id))
+
+    def prune(self, keep_last=None, max_age_days=None) -> List[str]:
+        """Deletes old snapshots per account; returns the deleted ids.
+
+        ``keep_last`` keeps the newest N snapshots of every account and
+        ``max_age_days`` drops snapshots older than that, except an account's
+        newest one. Blobs are reclaimed separately by ``gc``.
+        """
+        by_account = {}
+        for manifest in self.list():
+            by_account.setdefault(manifest['metadata'].get('account_id'), []).append(manifest)
+
+        deleted = []
+        cutoff = time.time() - max_age_days * 86400 if max_age_days is not None else None
+        for manifests in by_account.values():
+            for index, manifest in enumerate(manifests):
+                too_many = keep_last is not None and index >= keep_last
+                too_old = cutoff is not None and index > 0 and manifest['created'] < cutoff
+                if too_many or too_old:
+                    self.delete(manifest['id'])
+                    deleted.append(manifest['id'])
+        return deleted
+
+    def gc(self) -> Dict:
+        """Removes blobs that no manifest references; returns counts and bytes freed.
+
+        Waits for any ``save`` to finish first, as its new blobs are not
+        referenced until its manifest is written.
+        """
+        with FileLock(self.lock_path):
+            referenced = set()
+            for manifest in self.list():
+                referenced.update(entry['hash'] for entry in manifest['files'].values())
+
+            removed, freed = 0, 0
+            if os.path.isdir(self.blobs_dir):
+                for root, _, files in os.walk(self.blobs_dir):
+                    for file in files:
+                        if file not in referenced:
+                            path = os.path.join(root, file)
+                            freed += os.path.getsize(path)
+                            os.remove(path)
+                            removed += 1
+            if os.path.isdir(self.tmp_dir):
+                shutil.rmtree(self.tmp_dir)
+        return {'removed': removed, 'bytes_freed': freed, 'referenced': len(referenced)}
@@ -0,0 +1,568 @@
+"""Engine behaviours that must hold whatever the optimisations underneath."""
+import io
+import json
+import os
+import shutil
+import sys
+import time
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import backups  # noqa: E402
+import engine  # noqa: E402
+from backups import BackupStore  # noqa: E402
+from engine import (  # noqa: E402
+    CFG_DIRS, COMPRESSION_PROFILES, IMPORT_JOURNAL, SNAPSHOT_PREFIX, STATE_DIR, AccountIndex, ConfigEngine,
+    StagedImport, compression_settings, make_metadata, parse_localconfig_full, recover_import, scan_account,
+    write_archive_members
+)
+from snapshots import SnapshotStore  # noqa: E402
+from vdfscan import scan_localconfig  # noqa: E402
+
+STEAM_ID = "100000001"
+
+
+def vdf_text(pairs, indent=0):
+    """localconfig.vdf text for nested ``(key, value or list of pairs)`` lists, one pair per line like Steam."""
+    tab = "\t" * indent
+    lines = []
+    for key, value in pairs:
+        if isinstance(value, list):
+            lines += [f'{tab}"{key}"', f"{tab}{{", vdf_text(value, indent + 1), f"{tab}}}"]
+        else:
+            lines.append(f'{tab}"{key}"\t\t"{value}"')
+    return "\n".join(line for line in lines if line)
+
+
+LOCALCONFIGS = {
+    'plain': [("UserLocalConfigStore", [
+        ("Software", [("Valve", [("Steam", [("x", "{ // }")])])]),
+        ("friends", [
+            ("PersonaName", 'Player \\"One\\"'),
+            (STEAM_ID, [("Name", "Old"), ("avatar", "abc"), ("NameHistory", [("0", "Old"), ("1", "Older")])]),
+            ("100000002", [("avatar", "other")]),
+        ]),
+    ])],
+    'duplicate friends': [("UserLocalConfigStore", [
+        ("friends", [(STEAM_ID, [("Name", "First")])]),
+        ("streaming", [("x", "y")]),
+        ("friends", [("PersonaName", "Later"), (STEAM_ID, [("avatar", "h")])]),
+    ])],
+    'duplicate keys': [("UserLocalConfigStore", [
+        ("friends", [("PersonaName", ""), (STEAM_ID, [("avatar", "a"), ("avatar", "b")])]),
+        ("friends", [(STEAM_ID, [("NameHistory", [("0", "Hist")])])]),
+    ])],
+    'no persona': [("UserLocalConfigStore", [("friends", [("100000002", [("Name", "Someone")])])])],
+    'no friends': [("UserLocalConfigStore", [("Software", [("a", "b")])])],
+}
+
+
+@pytest.mark.parametrize("name", sorted(LOCALCONFIGS))
+def test_localconfig_scanner_matches_vdf(tmp_path, name):
+    text = vdf_text(LOCALCONFIGS[name])
+    path = tmp_path / "localconfig.vdf"
+    path.write_text(text, encoding='utf-8')
+    assert scan_localconfig(io.StringIO(text), STEAM_ID) == parse_localconfig_full(str(path), STEAM_ID)
+
+
+def test_account_index_revalidates_by_stat(tmp_path, monkeypatch):
+    userdata = str(tmp_path / "userdata")
+    dota = make_account(userdata, STEAM_ID, 1)
+    for cfg_dir in CFG_DIRS:  # an old mtime, so any later change shows
+        os.utime(os.path.join(dota, *cfg_dir.split("/")), (1e9, 1e9))
+    vdf_path = os.path.join(userdata, STEAM_ID, "config", "localconfig.vdf")
+    os.makedirs(os.path.dirname(vdf_path))
+    with open(vdf_path, 'w', encoding='utf-8') as f:
+        f.write(vdf_text(LOCALCONFIGS['plain']))
+    calls = []
+
+    def counted(name):
+        real = getattr(engine, name)
+
+        def wrapper(*args):
+            calls.append(name)
+            return real(*args)
+        return wrapper
+
+    for name in ("parse_localconfig", "has_config_files"):
+        monkeypatch.setattr(engine, name, counted(name))
+
+    def discover():
+        config_engine = ConfigEngine(userdata, log=lambda *args, **kwargs: None,
+                                     index=AccountIndex(str(tmp_path / "index.json")))
+        return config_engine.get_account_folders(), config_engine
+
+    assert discover()[0] == [(STEAM_ID, dota)]
+    assert discover()[0] == [(STEAM_ID, dota)]
+    assert calls == ["has_config_files", "parse_localconfig"]
+
+    mtime = os.path.getmtime(vdf_path) + 10
+    os.utime(vdf_path, (mtime, mtime))
+    discover()
+    assert calls[2:] == ["parse_localconfig"]
+
+    with open(vdf_path, 'w', encoding='utf-8') as f:
+        f.write(vdf_text(LOCALCONFIGS['plain']).replace("Player", "Renamed player"))
+    os.utime(vdf_path, (mtime, mtime))  # only the size tells
+    config_engine = discover()[1]
+    assert calls[3:] == ["parse_localconfig"]
+    assert config_engine.get_steam_account_info(STEAM_ID, dota)['personaname'] == 'Renamed player "One"'
+
+    for entry in scan_account(dota).values():
+        os.remove(entry['path'])
+    assert discover()[0] == []
+    assert calls[4:] == ["has_config_files"]
+
+
+def make_account(root, name, seed):
+    """A Dota 2 folder with a few files in every cfg folder; returns its path."""
+    account = os.path.join(root, name, "570")
+    for i, cfg_dir in enumerate(CFG_DIRS):
+        os.makedirs(os.path.join(account, *cfg_dir.split("/")))
+        for j in range(3):
+            with open(os.path.join(account, *cfg_dir.split("/"), f"file_{j}.cfg"), 'w') as f:
+                f.write(f"{name} {'x' * seed} {i} {j}\n" * (j + 1))
+    return account
+
+
+def contents(account):
+    result = {}
+    for name, entry in scan_account(account).items():
+        with open(entry['path'], 'rb') as f:
+            result[name] = f.read()
+    return result
+
+
+@pytest.fixture
+def config_engine(tmp_path):
+    return ConfigEngine(str(tmp_path), log=lambda *args, **kwargs: None, index=AccountIndex(),
+                        snapshot_store=SnapshotStore(str(tmp_path / "snapshots")))
+
+
+def tamper(archive, member):
+    """Rewrites ``archive`` with ``member``'s bytes changed; zipfile computes a matching CRC, the manifest is kept."""
+    with zipfile.ZipFile(archive) as zip_ref:
+        members = [(info, zip_ref.read(info)) for info in zip_ref.infolist()]
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for info, data in members:
+            zipf.writestr(info, data.upper() if info.filename == member else data)
+
+
+def test_manifest_verifies_intact_archive(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    archive = str(tmp_path / "a.cbd2")
+    config_engine.export_config(source, archive, make_metadata("A", "1"))
+    result = config_engine.verify_archive(archive)
+    assert result['format'] == 2 and result['files'] == 9 and result['damaged'] == []
+
+
+def test_manifest_catches_member_with_valid_crc(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    archive = str(tmp_path / "a.cbd2")
+    config_engine.export_config(source, archive, make_metadata("A", "1"))
+    tamper(archive, "remote/cfg/file_1.cfg")
+    assert config_engine.verify_archive(archive)['damaged'] == ["remote/cfg/file_1.cfg"]
+
+    before = contents(target)
+    for incremental in (True, False):
+        with pytest.raises(ValueError):
+            config_engine.import_config(target, archive, incremental=incremental, backup=False)
+        assert contents(target) == before
+
+
+def copy_account(source, root, name):
+    """A copy of ``source`` with the same contents and mtimes; returns its path."""
+    account = os.path.join(root, name, "570")
+    shutil.copytree(source, account)
+    return account
+
+
+def zip_account(account, archive):
+    """Writes ``account`` as a format 1 archive: cfg members only, no manifest, so CRCs are all there is."""
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zipf:
+        for name, entry in sorted(scan_account(account).items()):
+            zipf.write(entry['path'], name)
+    return archive
+
+
+def source_of(config_engine, account, kind, tmp_path):
+    if kind == 'account':
+        return account
+    if kind == 'zip':
+        return zip_account(account, str(tmp_path / "source.zip"))
+    if kind == 'snapshot':
+        return SNAPSHOT_PREFIX + config_engine.export_snapshot(account, make_metadata("A", "1"))
+    archive = str(tmp_path / "source.cbd2")
+    config_engine.export_config(account, archive, make_metadata("A", "1"))
+    return archive
+
+
+def rewrite(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+
+
+def test_incremental_import_applies_only_differences(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = copy_account(source, tmp_path, "b")
+    rewrite(os.path.join(target, "cfg", "file_0.cfg"), "changed and longer\n")
+    os.remove(os.path.join(target, "local", "cfg", "file_1.cfg"))
+    rewrite(os.path.join(target, "remote", "cfg", "extra.cfg"), "not in the source\n")
+
+    stats = config_engine.import_config(target, source, backup=False)
+    assert (stats['added'], stats['replaced'], stats['deleted'], stats['unchanged']) == (1, 1, 1, 7)
+    assert contents(target) == contents(source)
+
+
+@pytest.mark.parametrize("kind", ['account', 'archive', 'zip'])
+def test_unchanged_import_reads_and_writes_nothing(tmp_path, config_engine, monkeypatch, kind):
+    source = make_account(tmp_path, "a", 1)
+    target = copy_account(source, tmp_path, "b")
+    source_path = source_of(config_engine, source, kind, tmp_path)
+    if kind == 'zip':  # zip mtimes have 2 s resolution; align the target the way an import would
+        for entry in scan_account(target).values():
+            os.utime(entry['path'], (entry['mtime'], entry['mtime']))
+        config_engine.import_config(target, source_path, backup=False)
+
+    def unexpected(path):
+        raise AssertionError(f"{path} was read although size and mtime match")
+
+    monkeypatch.setattr(engine, "file_hash", unexpected)
+    monkeypatch.setattr(engine, "file_crc32", unexpected)
+    stats = config_engine.import_config(target, source_path, backup=False)
+    assert stats == {'added': 0, 'replaced': 0, 'deleted': 0, 'unchanged': 9, 'bytes_written': 0}
+
+
+@pytest.mark.parametrize("kind", ['account', 'archive', 'zip'])
+def test_incremental_import_compares_content_when_mtimes_differ(tmp_path, config_engine, kind):
+    source = make_account(tmp_path, "a", 1)
+    target = copy_account(source, tmp_path, "b")
+    source_path = source_of(config_engine, source, kind, tmp_path)
+    later = os.path.getmtime(os.path.join(source, "cfg", "file_0.cfg")) + 3600
+    for entry in scan_account(target).values():
+        os.utime(entry['path'], (later, later))
+    rewrite(os.path.join(target, "cfg", "file_2.cfg"), contents(source)["cfg/file_2.cfg"].decode().upper())
+
+    plan = config_engine.plan_import(target, source_path)
+    assert [(operation['op'], operation['name']) for operation in plan.operations] == [('replace', "cfg/file_2.cfg")]
+    assert plan.unchanged == 8 and len(plan.touch) == 8
+    stats = config_engine.execute_plan(plan, backup=False)
+    assert stats['replaced'] == 1 and stats['unchanged'] == 8
+    assert contents(target) == contents(source)
+    assert config_engine.plan_import(target, source_path).touch == []
+
+
+def test_failed_import_leaves_account_untouched(tmp_path, config_engine, monkeypatch):
+    source = make_account(tmp_path, "a", 1)
+    target = copy_account(source, tmp_path, "b")
+    for account in (source, target):
+        shutil.rmtree(os.path.join(account, "remote", "cfg"))
+    later = os.path.getmtime(os.path.join(source, "cfg", "file_0.cfg")) + 3600
+    for entry in scan_account(target).values():
+        os.utime(entry['path'], (later, later))
+    rewrite(os.path.join(target, "cfg", "file_2.cfg"), "changed\n")
+
+    def stats(account):
+        return {name: (entry['size'], entry['mtime']) for name, entry in scan_account(account).items()}
+    before = stats(target)
+
+    def fail(*args, **kwargs):
+        raise OSError("disk full")
+
+    write_file_atomic = engine.write_file_atomic
+    monkeypatch.setattr(engine, "write_file_atomic", fail)
+    with pytest.raises(OSError):
+        config_engine.import_config(target, source, backup=False)
+    assert stats(target) == before
+    assert not os.path.exists(os.path.join(target, "remote", "cfg"))
+
+    monkeypatch.setattr(engine, "write_file_atomic", write_file_atomic)
+    config_engine.import_config(target, source, backup=False)
+    assert stats(target) == stats(source)
+    assert os.path.isdir(os.path.join(target, "remote", "cfg"))
+
+
+def test_execution_does_not_rescan_target(tmp_path, config_engine, monkeypatch):
+    source = make_account(tmp_path, "a", 1)
+    target = copy_account(source, tmp_path, "b")
+    rewrite(os.path.join(target, "cfg", "file_0.cfg"), "changed and longer\n")
+    plan = config_engine.plan_import(target, source)
+    walked = []
+    walk = os.walk
+    monkeypatch.setattr(os, "walk", lambda top, *args, **kwargs: walked.append(top) or walk(top, *args, **kwargs))
+    config_engine.execute_plan(plan, backup=False)
+    monkeypatch.undo()
+    assert not [top for top in walked if not os.path.relpath(top, target).startswith(STATE_DIR)]
+    assert contents(target) == contents(source)
+
+
+def test_file_added_after_planning_fails_import(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = copy_account(source, tmp_path, "b")
+    rewrite(os.path.join(target, "cfg", "file_0.cfg"), "changed and longer\n")
+    plan = config_engine.plan_import(target, source)
+    time.sleep(0.01)
+    rewrite(os.path.join(target, "cfg", "new.cfg"), "written by the game meanwhile\n")
+    before = contents(target)
+    with pytest.raises(ValueError):
+        config_engine.execute_plan(plan, backup=False)
+    assert contents(target) == before
+
+
+def test_partial_import_changes_only_selected_paths(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    rewrite(os.path.join(target, "remote", "cfg", "extra.cfg"), "not in the source\n")
+    rewrite(os.path.join(target, "cfg", "extra.cfg"), "outside the selection\n")
+    before, wanted = contents(target), contents(source)
+
+    stats = config_engine.import_config(target, source, paths=["remote/cfg", "cfg/file_1.cfg"], backup=False)
+    assert (stats['added'], stats['replaced'], stats['deleted']) == (0, 4, 1)
+    after = contents(target)
+    for name in before:
+        if name.startswith("remote/cfg/") or name == "cfg/file_1.cfg":
+            assert after.get(name) == wanted.get(name)
+        else:
+            assert after[name] == before[name]
+    with pytest.raises(ValueError):
+        config_engine.import_config(target, source, incremental=False, paths=["cfg"])
+
+
+def test_compression_settings_rejects_unknown_profile(tmp_path, config_engine):
+    with pytest.raises(ValueError):
+        compression_settings("zstd")
+    archive = str(tmp_path / "a.cbd2")
+    with pytest.raises(ValueError):
+        config_engine.export_config(make_account(tmp_path, "a", 1), archive, make_metadata("A", "1"),
+                                    compression="zstd")
+    assert os.listdir(tmp_path) == ["a"]
+
+
+@pytest.mark.parametrize("profile", sorted(COMPRESSION_PROFILES))
+def test_export_round_trips_every_profile(tmp_path, config_engine, profile):
+    try:
+        method, _ = compression_settings(profile)
+    except ValueError:
+        pytest.skip(f"{profile} is not supported by this Python build")
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    archive = str(tmp_path / "a.cbd2")
+    config_engine.export_config(source, archive, make_metadata("A", "1"), compression=profile)
+    with zipfile.ZipFile(archive) as zip_ref:
+        assert {info.compress_type for info in zip_ref.infolist() if info.filename.endswith(".cfg")} == {method}
+    config_engine.import_config(target, archive, incremental=False, backup=False)
+    assert contents(target) == contents(source)
+
+
+@pytest.mark.parametrize("kind", ['account', 'archive', 'zip', 'snapshot'])
+def test_diff_reports_each_kind_of_change(tmp_path, config_engine, kind):
+    old = make_account(tmp_path, "a", 1)
+    old_source = source_of(config_engine, old, kind, tmp_path)
+    new = copy_account(old, tmp_path, "b")
+    rewrite(os.path.join(new, "cfg", "file_1.cfg"), contents(old)["cfg/file_1.cfg"].decode().upper())
+    os.remove(os.path.join(new, "local", "cfg", "file_0.cfg"))
+    rewrite(os.path.join(new, "remote", "cfg", "new.cfg"), "added\n")
+
+    diff = config_engine.diff_sources(old_source, new)
+    assert diff['added'] == ["remote/cfg/new.cfg"]
+    assert diff['removed'] == ["local/cfg/file_0.cfg"]
+    assert diff['changed'] == ["cfg/file_1.cfg"]
+    assert len(diff['unchanged']) == 7 and "cfg/file_0.cfg" in diff['unchanged']
+    assert config_engine.diff_sources(new, old_source)['added'] == ["local/cfg/file_0.cfg"]
+
+
+def write_members(archive, paths, profile, workers):
+    method, level = compression_settings(profile)
+    with zipfile.ZipFile(archive, 'w', method, compresslevel=level) as zipf:
+        members = []
+        for path in paths:
+            info = zipfile.ZipInfo(os.path.basename(path), (2024, 1, 1, 0, 0, 0))
+            info.file_size = os.path.getsize(path)
+            members.append((info, path))
+        hashes = write_archive_members(zipf, members, method, level, workers=workers)
+    with zipfile.ZipFile(archive) as zip_ref:
+        assert zip_ref.testzip() is None
+        return {info.filename: zip_ref.read(info) for info in zip_ref.infolist()}, hashes
+
+
+@pytest.mark.parametrize("profile", sorted(COMPRESSION_PROFILES))
+def test_parallel_export_matches_serial(tmp_path, monkeypatch, profile):
+    try:
+        compression_settings(profile)
+    except ValueError:
+        pytest.skip(f"{profile} is not supported by this Python build")
+    monkeypatch.setattr(engine, "PARALLEL_MEMBER_LIMIT", 64 * 1024)
+    contents_by_name = {"empty.cfg": b"", "big.cfg": os.urandom(16 * 1024) * 8}
+    contents_by_name.update({f"file_{i}.cfg": f"bind {i} \"say {i}\"\n".encode() * (i * 50) for i in range(1, 6)})
+    paths = []
+    for name, data in contents_by_name.items():
+        paths.append(str(tmp_path / name))
+        with open(paths[-1], 'wb') as f:
+            f.write(data)
+    appended = []
+    append = engine.append_compressed_member
+    monkeypatch.setattr(engine, "append_compressed_member", lambda zipf, info, *args:
+                        appended.append(info.filename) or append(zipf, info, *args))
+
+    serial = write_members(str(tmp_path / "serial.zip"), paths, profile, workers=1)
+    assert appended == []
+    parallel = write_members(str(tmp_path / "parallel.zip"), paths, profile, workers=4)
+    assert ("big.cfg" not in appended) and (len(appended) == 6) == (profile != "store")
+    monkeypatch.setattr(engine, "parallel_zip_supported", lambda zipf: False)  # zipfile internals changed
+    del appended[:]
+    fallback = write_members(str(tmp_path / "fallback.zip"), paths, profile, workers=4)
+    assert appended == []
+    assert serial[0] == contents_by_name and parallel == serial and fallback == serial
+
+
+def crash_during_import(config_engine, target, source, journal=True, swapped=()):
+    """Stages a full import of ``source`` and stops as a killed process would.
+
+    With ``journal`` the commit got as far as writing it and swapping in the
+    cfg folders in ``swapped``; without, it died while staging.
+    """
+    plan = config_engine.plan_import(target, source, incremental=False)
+    staged = StagedImport(target)
+    config_engine.apply_operations(plan, lambda entry: open(entry['path'], 'rb'), staged)
+    state_dir = os.path.join(target, STATE_DIR)
+    if journal:
+        with open(os.path.join(state_dir, IMPORT_JOURNAL), 'w', encoding='utf-8') as f:
+            json.dump({'dirs': staged.dirs}, f)
+    for cfg_dir in swapped:
+        live = os.path.join(target, *cfg_dir.split("/"))
+        previous = os.path.join(state_dir, "previous", *cfg_dir.split("/"))
+        os.makedirs(os.path.dirname(previous), exist_ok=True)
+        os.replace(live, previous)
+        os.replace(staged.staged_path(cfg_dir), live)
+    staged._lock.release()  # the OS drops it with the process
+
+
+def leftovers(account):
+    return sorted(set(os.listdir(os.path.join(account, STATE_DIR))) - {engine.IMPORT_LOCK})
+
+
+@pytest.mark.parametrize("swapped", [(), ("remote/cfg",)])
+def test_recovery_completes_journaled_import(tmp_path, config_engine, swapped):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    crash_during_import(config_engine, target, source, swapped=swapped)
+    assert recover_import(target) == 'forward'
+    assert contents(target) == contents(source)
+    assert leftovers(target) == []
+
+
+def test_recovery_discards_unjournaled_import(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    before = contents(target)
+    crash_during_import(config_engine, target, source, journal=False)
+    assert recover_import(target) == 'back'
+    assert contents(target) == before
+    assert leftovers(target) == []
+
+
+def test_import_plans_after_recovery(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    other = make_account(tmp_path, "c", 3)
+    crash_during_import(config_engine, target, other)
+    plan = config_engine.plan_import(target, source)
+    config_engine.execute_plan(plan, backup=False)
+    assert contents(target) == contents(source)
+
+
+def test_inspect_reports_interrupted_import_untouched(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    before = contents(target)
+    crash_during_import(config_engine, target, source)
+    state = sorted(os.listdir(os.path.join(target, STATE_DIR)))
+
+    assert config_engine.inspect_source(target)['pending_import']
+    assert not config_engine.inspect_source(source)['pending_import']
+    assert config_engine.diff_sources(target, source)['changed']
+    assert contents(target) == before and sorted(os.listdir(os.path.join(target, STATE_DIR))) == state
+
+    config_engine.plan_import(str(tmp_path / "c"), target)  # importing from it completes it first
+    assert contents(target) == contents(source)
+
+
+def test_failed_commit_releases_account(tmp_path, config_engine, monkeypatch):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    finish_import = engine.finish_import
+
+    def fail_once_journaled(account_path):
+        if os.path.exists(os.path.join(account_path, STATE_DIR, IMPORT_JOURNAL)):
+            monkeypatch.setattr(engine, "finish_import", finish_import)
+            raise PermissionError("cfg is open in another program")
+        return finish_import(account_path)
+
+    monkeypatch.setattr(engine, "finish_import", fail_once_journaled)
+    with pytest.raises(PermissionError) as failure:
+        config_engine.import_config(target, source, incremental=False, backup=False)
+    lock = engine.AccountLock(target)  # free even while the traceback keeps the StagedImport alive
+    assert failure.traceback and lock.acquire()
+    lock.release()
+    config_engine.import_config(target, source, incremental=False, backup=False)
+    assert contents(target) == contents(source)
+    assert leftovers(target) == []
+
+
+def test_staging_import_holds_account(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    plan = config_engine.plan_import(target, source, incremental=False)
+    staged = StagedImport(target)
+    config_engine.apply_operations(plan, lambda entry: open(entry['path'], 'rb'), staged)
+    assert recover_import(target) is None
+    with pytest.raises(ValueError):
+        StagedImport(target)
+    staged.flush()
+    staged.commit()
+    assert contents(target) == contents(source)
+
+
+def test_recovery_completes_interrupted_undo(tmp_path, config_engine, monkeypatch):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    before = contents(target)
+    config_engine.import_config(target, source, incremental=False)
+
+    def crash_once_journaled(account_path):
+        if os.path.exists(os.path.join(account_path, STATE_DIR, IMPORT_JOURNAL)):
+            raise KeyboardInterrupt  # killed right after the journal was written
+        return engine.finish_import(account_path)
+
+    monkeypatch.setattr(backups, "finish_import", crash_once_journaled)
+    with pytest.raises(KeyboardInterrupt):
+        config_engine.undo_import(target)
+    monkeypatch.undo()
+    assert recover_import(target) == 'forward'
+    assert contents(target) == before
+
+    store = BackupStore(target)
+    store.prune()
+    assert [manifest['reason'] for manifest in store.list()] == ["undo"]
+    assert not any(name.endswith(".partial") for name in os.listdir(store.root))
+    config_engine.undo_import(target)
+    assert contents(target) == contents(source)
+
+
+def test_backup_unaffected_by_in_place_rewrite(tmp_path, config_engine):
+    source = make_account(tmp_path, "a", 1)
+    target = make_account(tmp_path, "b", 2)
+    for account in (source, target):
+        with open(os.path.join(account, "remote", "cfg", "kept.cfg"), 'w') as f:
+            f.write("before\n")
+    kept = os.path.join(target, "remote", "cfg", "kept.cfg")
+    config_engine.import_config(target, source)
+    with open(kept, 'r+') as f:  # as the game saves some files
+        f.write("AFTER!\n")
+    config_engine.undo_import(target)
+    with open(kept) as f:
+        assert f.read() == "before\n"
@@ -0,0 +1,117 @@
+"""Snapshot store: deduplication, pruning and blob collection."""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshots  # noqa: E402
+from engine import CFG_DIRS, HASH_SIZE, FileLock, make_metadata, scan_account  # noqa: E402
+from snapshots import SnapshotStore  # noqa: E402
+
+
+def make_account(root, name, text):
+    """A Dota 2 folder with two files in every cfg folder; returns its path."""
+    account = os.path.join(root, name, "570")
+    for cfg_dir in CFG_DIRS:
+        os.makedirs(os.path.join(account, *cfg_dir.split("/")))
+        for j in range(2):
+            with open(os.path.join(account, *cfg_dir.split("/"), f"file_{j}.cfg"), 'w') as f:
+                f.write(f"{text} {cfg_dir} {j}\n")
+    return account
+
+
+def blobs(store):
+    """Blob name -> hash of its content."""
+    result = {}
+    for root, _, files in os.walk(store.blobs_dir):
+        for file in files:
+            with open(os.path.join(root, file), 'rb') as f:
+                result[file] = hashlib.blake2b(f.read(), digest_size=HASH_SIZE).hexdigest()
+    return result
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path / "store"))
+
+
+def test_save_stores_each_content_once(tmp_path, store):
+    a = make_account(tmp_path, "a", "same")
+    b = make_account(tmp_path, "b", "same")
+    big = os.urandom(1024) * 3000  # spills to a tmp file while it is read
+    for account in (a, b):
+        with open(os.path.join(account, "remote", "cfg", "big.cfg"), 'wb') as f:
+            f.write(big)
+    first = store.save(a, make_metadata("A", "1"))
+    store.save(b, make_metadata("B", "2"))
+    assert len(blobs(store)) == len(scan_account(a))
+    assert all(name == digest for name, digest in blobs(store).items())
+    assert not os.listdir(store.tmp_dir)
+    for name, entry in store.snapshot_tree(first).items():
+        assert os.path.getsize(entry['path']) == entry['size']
+
+
+def test_save_records_the_content_it_stored(tmp_path, store, monkeypatch):
+    account = make_account(tmp_path, "a", "before")
+    path = os.path.join(account, "cfg", "file_0.cfg")
+
+    def scan_then_rewrite(account_path):
+        tree = scan_account(account_path)
+        with open(path, 'w') as f:  # the game saves between the scan and the copy
+            f.write("rewritten, and longer than before\n")
+        return tree
+
+    monkeypatch.setattr(snapshots, "scan_account", scan_then_rewrite)
+    entry = store.load(store.save(account, make_metadata("A", "1")))['files']["cfg/file_0.cfg"]
+    with open(store.blob_path(entry['hash']), 'rb') as f:
+        content = f.read()
+    assert content == b"rewritten, and longer than before\n"
+    assert entry['size'] == len(content) and entry['mtime'] == os.path.getmtime(path)
+
+
+def test_prune_keeps_newest_per_account(tmp_path, store):
+    a = make_account(tmp_path, "a", "a")
+    b = make_account(tmp_path, "b", "b")
+    saved_a = [store.save(a, make_metadata("A", "1")) for _ in range(3)]
+    saved_b = store.save(b, make_metadata("B", "2"))
+    assert sorted(store.prune(keep_last=2)) == [saved_a[0]]
+
+    for snapshot_id in (saved_a[1], saved_b):
+        manifest = store.load(snapshot_id)
+        manifest['created'] -= 10 * 86400
+        with open(store.manifest_path(snapshot_id), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+    assert store.prune(max_age_days=1) == [saved_a[1]]
+    assert sorted(manifest['id'] for manifest in store.list()) == sorted([saved_a[2], saved_b])
+
+
+def test_gc_removes_only_unreferenced_blobs(tmp_path, store):
+    account = make_account(tmp_path, "a", "a")
+    old = store.save(account, make_metadata("A", "1"))
+    with open(os.path.join(account, "cfg", "file_0.cfg"), 'w') as f:
+        f.write("changed\n")
+    new = store.save(account, make_metadata("A", "1"))
+    store.delete(old)
+
+    result = store.gc()
+    assert result['removed'] == 1 and result['referenced'] == len(scan_account(account))
+    assert all(os.path.exists(entry['path']) for entry in store.snapshot_tree(new).values())
+    assert not os.path.exists(store.tmp_dir)
+
+
+def test_gc_waits_for_running_save(tmp_path, store):
+    account = make_account(tmp_path, "a", "a")
+    store.save(account, make_metadata("A", "1"))
+    with FileLock(store.lock_path):  # as a save in another process holds it
+        collector = threading.Thread(target=store.gc)
+        collector.start()
+        time.sleep(0.2)
+        assert collector.is_alive()
+    collector.join(5)
+    assert not collector.is_alive()
@@ -0,0 +1,97 @@
+"""Pre-rendered circular avatar thumbnails for the account list.
+
+Each avatar is decoded, resized and masked once per avatar hash and saved
+as a small transparent PNG in the per-user cache folder. ``render`` is
+meant to run on the avatar loading threads; ``photo`` runs on the Tk
+thread and hands out ``PhotoImage`` objects from a bounded in-memory LRU,
+so rebuilding the account list decodes nothing.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import tkinter as tk
+from PIL import Image, ImageDraw
+
+from engine import user_cache_dir
+from tracing import span
+
+THUMBNAIL_SIZE = 48
+# The mask is drawn at this multiple of the thumbnail size and scaled down for smooth edges.
+MASK_SUPERSAMPLE = 4
+
+
+class ThumbnailCache:
+    def __init__(self, cache_dir: Optional[str] = None, size=THUMBNAIL_SIZE, max_photos=256):
+        self.cache_dir = cache_dir or os.path.join(user_cache_dir(), "thumbnails")
+        self.size = size
+        self.max_photos = max_photos
+        self._photos = OrderedDict()
+        self._mask = None
+        self._lock = threading.Lock()
+
+    def _png_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}_{self.size}.png")
+
+    def _circle_mask(self):
+        with self._lock:
+            if self._mask is None:
+                big = self.size * MASK_SUPERSAMPLE
+                mask = Image.new('L', (big, big), 0)
+                ImageDraw.Draw(mask).ellipse((0, 0, big - 1, big - 1), fill=255)
+                self._mask = mask.resize((self.size, self.size), Image.LANCZOS)
+            return self._mask
+
+    def render(self, key, source_path) -> Optional[str]:
+        """Renders ``source_path`` into the thumbnail PNG for ``key`` unless an up-to-date one exists.
+
+        Safe to call from worker threads. Returns the PNG path, or None if
+        the source image cannot be read.
+        """
+        if not key or not source_path:
+            return None
+        png_path = self._png_path(key)
+        try:
+            if os.path.getmtime(png_path) >= os.path.getmtime(source_path):
+                return png_path
+        except OSError:
+            pass
+
+        try:
+            with span("thumbnail.render", key=key):
+                with Image.open(source_path) as image:
+                    image.draft('RGB', (self.size * 2, self.size * 2))  # cheap JPEG downscale while decoding
+                    thumbnail = image.convert('RGBA').resize((self.size, self.size), Image.LANCZOS)
+                circular = Image.new('RGBA', (self.size, self.size), (0, 0, 0, 0))
+                circular.paste(thumbnail, (0, 0), self._circle_mask())
+
+                os.makedirs(self.cache_dir, exist_ok=True)
+                tmp_path = f"{png_path}.{threading.get_ident()}.tmp"
+                circular.save(tmp_path, format='PNG')
+                os.replace(tmp_path, png_path)
+            return png_path
+        except (OSError, ValueError):
+            return None
+
+    def photo(self, key, source_path) -> Optional[tk.PhotoImage]:
+        """A ``PhotoImage`` of the circular thumbnail; call from the Tk thread only.
+
+        Loads the PNG written by ``render`` (rendering it first if needed) and
+        reuses it until the PNG changes.
+        """
+        png_path = self.render(key, source_path)
+        if not png_path:
+            return None
+        stamp = os.path.getmtime(png_path)
+        cached = self._photos.get(key)
+        if cached and cached[0] == stamp:
+            self._photos.move_to_end(key)
+            return cached[1]
+
+        photo = tk.PhotoImage(file=png_path)
+        self._photos[key] = (stamp, photo)
+        self._photos.move_to_end(key)
+        while len(self._photos) > self.max_photos:
+            self._photos.popitem(last=False)
+        return photo
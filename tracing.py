@@ -0,0 +1,128 @@
+"""Timing spans for finding slow phases.
+
+``span(name, **args)`` times a block with the monotonic clock and records
+it in the process-wide ``TRACER``; ``start(name)`` returns a span that is
+ended explicitly, for phases that begin and end in different callbacks.
+Recording a span costs two clock reads and an append, so it stays on in
+normal use. ``format_summary`` aggregates spans by name (for the
+``-console`` window) and ``write_chrome_trace`` saves them in the Chrome
+trace event format, which chrome://tracing and https://ui.perfetto.dev
+open directly.
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, List
+
+# Finished spans kept for export; the oldest half is dropped when full.
+MAX_EVENTS = 200_000
+
+
+class Span:
+    __slots__ = ("tracer", "name", "args", "start_ns", "tid")
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+        self.tid = threading.get_ident()
+        self.start_ns = time.perf_counter_ns()
+
+    def end(self, **args):
+        if args:
+            self.args = dict(self.args, **args)
+        self.tracer.record(self.name, self.start_ns, time.perf_counter_ns(), self.args, self.tid)
+
+
+class Tracer:
+    def __init__(self, max_events=MAX_EVENTS):
+        self.max_events = max_events
+        self.origin_ns = time.perf_counter_ns()
+        self._events: List[tuple] = []  # (name, start_ns, end_ns, tid, args)
+        self._dropped = 0
+        self._thread_names: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    # The span name is ``_name`` so that ``name=`` stays free for a span argument.
+    def start(self, _name, **args) -> Span:
+        return Span(self, _name, args)
+
+    @contextmanager
+    def span(self, _name, **args):
+        started = Span(self, _name, args)
+        try:
+            yield started
+        finally:
+            started.end()
+
+    def record(self, name, start_ns, end_ns, args=None, tid=None):
+        tid = tid or threading.get_ident()
+        with self._lock:
+            if tid not in self._thread_names:
+                self._thread_names[tid] = threading.current_thread().name
+            self._events.append((name, start_ns, end_ns, tid, args or {}))
+            if len(self._events) > self.max_events:
+                drop = len(self._events) // 2
+                del self._events[:drop]
+                self._dropped += drop
+
+    def mark(self) -> int:
+        """A position in the span log; pass it to ``summary``/``format_summary`` as ``since``."""
+        with self._lock:
+            return self._dropped + len(self._events)
+
+    def summary(self, since=0) -> List[Dict]:
+        """Per span name: ``count``, ``total``, ``max`` (seconds), slowest total first."""
+        with self._lock:
+            events = self._events[max(0, since - self._dropped):]
+        totals: Dict[str, List] = {}
+        for name, start_ns, end_ns, _, _ in events:
+            duration = (end_ns - start_ns) / 1e9
+            entry = totals.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += duration
+            entry[2] = max(entry[2], duration)
+        return sorted(({'name': name, 'count': count, 'total': total, 'max': longest}
+                       for name, (count, total, longest) in totals.items()),
+                      key=lambda entry: entry['total'], reverse=True)
+
+    def format_summary(self, title, since=0, limit=12) -> str:
+        lines = [f"{title} timings:"]
+        for entry in self.summary(since)[:limit]:
+            lines.append(f"  {entry['name']:<20} {entry['count']:>6}x  total {entry['total'] * 1000:9.1f} ms"
+                         f"  max {entry['max'] * 1000:8.1f} ms")
+        if len(lines) == 1:
+            lines.append("  (no spans recorded)")
+        return "\n".join(lines)
+
+    def write_chrome_trace(self, path):
+        """Writes all recorded spans as a Chrome trace (complete ``X`` events, timestamps in µs)."""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        pid = os.getpid()
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                 for tid, name in thread_names.items()]
+        for name, start_ns, end_ns, tid, args in events:
+            trace.append({
+                'name': name,
+                'cat': name.split(".")[0],
+                'ph': 'X',
+                'ts': (start_ns - self.origin_ns) / 1000,
+                'dur': (end_ns - start_ns) / 1000,
+                'pid': pid,
+                'tid': tid,
+                'args': {key: str(value) for key, value in args.items()},
+            })
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': trace, 'displayTimeUnit': 'ms'}, f)
+        os.replace(tmp_path, path)
+
+
+TRACER = Tracer()
+span = TRACER.span
+start = TRACER.start
+
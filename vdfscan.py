@@ -0,0 +1,147 @@
+"""Targeted scanner for the few localconfig.vdf keys ConfigBridge needs.
+
+``localconfig.vdf`` grows to several MB on long-lived accounts, while
+account discovery only needs the persona name and avatar hash under
+``UserLocalConfigStore/friends``. ``scan_localconfig`` walks the token
+stream and jumps over every other subtree with a single regex per brace
+(nothing is built for it). Repeated blocks are merged like ``vdf.load``
+does, so the whole file is walked.
+"""
+import re
+from typing import Dict
+
+_STRING = r'"[^"\\]*(?:\\.[^"\\]*)*"'
+# One token: whitespace, a // comment, a quoted string, a brace, a [$CONDITION] or a bare word.
+_TOKEN = re.compile(r'\s+|//[^\n]*|"([^"\\]*(?:\\.[^"\\]*)*)"|([{}])|\[[^\]\n]*\]|([^\s{}"\[]+)')
+# Everything up to the next structural brace: text, strings and comments (which may contain braces).
+_SKIP = re.compile(r'(?:[^{}"/]+|' + _STRING + r'|//[^\n]*|/)*')
+_ESCAPES = {'n': '\n', 't': '\t', 'v': '\v', 'b': '\b', 'r': '\r', 'f': '\f', 'a': '\a',
+            '\\': '\\', '?': '?', "'": "'", '"': '"'}
+_ESCAPE = re.compile(r'\\(.)')
+
+STORE_KEY = "UserLocalConfigStore"
+FRIENDS_KEY = "friends"
+
+
+class VdfScanError(ValueError):
+    pass
+
+
+def _unescape(text):
+    if "\\" not in text:
+        return text
+    return _ESCAPE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(0)), text)
+
+
+class _Tokens:
+    """Cursor over VDF text yielding ``('str', text)``, ``('{', None)`` and ``('}', None)``.
+
+    Comments and conditions (``[$WIN32]``) are dropped; strings stay escaped.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.pos = 0
+
+    def next(self):
+        text, pos = self.text, self.pos
+        while pos < len(text):
+            m = _TOKEN.match(text, pos)
+            if m is None:
+                raise VdfScanError(f"Unexpected data near: {text[pos:pos + 40]!r}")
+            pos = m.end()
+            quoted, brace, bare = m.group(1), m.group(2), m.group(3)
+            if quoted is not None or bare is not None:
+                self.pos = pos
+                return 'str', quoted if quoted is not None else bare
+            if brace is not None:
+                self.pos = pos
+                return brace, None
+        self.pos = pos
+        return None, None
+
+    def skip_block(self):
+        """Moves past the ``}`` that closes the block just opened."""
+        text, pos, depth = self.text, self.pos, 1
+        while True:
+            pos = _SKIP.match(text, pos).end()
+            if pos >= len(text):
+                raise VdfScanError("Unterminated block")
+            char = text[pos]
+            if char == '{':
+                depth += 1
+            elif char == '}':
+                depth -= 1
+            else:
+                raise VdfScanError(f"Unterminated string near: {text[pos:pos + 40]!r}")
+            pos += 1
+            if depth == 0:
+                self.pos = pos
+                return
+
+
+def scan_localconfig(f, steam_id) -> Dict:
+    """Extracts account info from an open localconfig.vdf; same result shape as
+    ``engine.parse_localconfig``.
+
+    Like ``vdf.load``, a key seen twice keeps its last value and repeated
+    blocks (a second ``friends``) are merged. Raises VdfScanError on
+    malformed input so callers can fall back to ``vdf``.
+    """
+    tokens = _Tokens(f.read())
+    found = {'has_store': False, 'has_friends': False, 'PersonaName': None, 'Name': None, 'avatar': ''}
+    name_history = {}
+
+    # path holds the keys of the blocks we descended into (only interesting ones).
+    path = []
+    while True:
+        kind, key = tokens.next()
+        if kind is None:
+            if path:
+                raise VdfScanError("Unexpected end of file")
+            break
+        if kind == '}':
+            if not path:
+                raise VdfScanError("Unbalanced '}'")
+            path.pop()
+            continue
+        if kind == '{':
+            raise VdfScanError("Block without a key")
+
+        kind, value = tokens.next()
+        if kind is None or kind == '}':
+            raise VdfScanError("Key without a value")
+
+        key = _unescape(key)
+        depth = len(path)
+        if depth == 1:
+            found['has_store'] = True
+
+        if kind == '{':
+            wanted = (
+                (depth == 0 and key == STORE_KEY)
+                or (depth == 1 and key == FRIENDS_KEY)
+                or (depth == 2 and key == steam_id)
+                or (depth == 3 and key == "NameHistory")
+            )
+            if not wanted:
+                tokens.skip_block()
+                continue
+            path.append(key)
+            if depth == 1:
+                found['has_friends'] = True
+            continue
+
+        if depth == 2 and key == "PersonaName":
+            found['PersonaName'] = _unescape(value)
+        elif depth == 3 and key in ("Name", "avatar"):
+            found[key] = _unescape(value)
+        elif depth == 4:
+            name_history[key] = _unescape(value)
+
+    return {
+        'has_store': found['has_store'],
+        'has_friends': found['has_friends'],
+        'personaname': found['PersonaName'] or found['Name'] or next(iter(name_history.values()), None) or None,
+        'avatar_hash': found['avatar'],
+    }